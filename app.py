@@ -1,7 +1,7 @@
 """
 English Learning Player - Refactored Flask Application
 """
-from flask import Flask, render_template, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, redirect, render_template, request, jsonify, send_file, send_from_directory
 import os
 import json
 import logging
@@ -9,14 +9,23 @@ import threading
 import time
 import uuid
 import re
+import shutil
+import tempfile
+from contextlib import ExitStack
 from datetime import datetime
+from queue import Queue
 from pathlib import Path
 
 # Simple phrase matching system (replacing spaCy, VAD, patterns)
 
 # Import our new modules
-from database import media_repo, chapter_repo, scene_repo, sentence_repo, db_manager, words_repo
+from database import media_repo, chapter_repo, scene_repo, sentence_repo, structure_repo, db_manager, words_repo, maintenance_scheduler
 from file_manager import file_manager
+from clip_cache import clip_cache
+from pcm_cache import pcm_cache
+from ingest_pipeline import ingest_pipeline
+from waveform import waveform_store
+from sentence_audio import sentence_audio_store
 from ffmpeg_processor import ffmpeg_processor, media_extractor, subtitle_processor
 
 # Configure logging
@@ -243,11 +252,13 @@ def get_media_list():
 def get_chapters(media_id):
     """Get chapters for a media with scenes"""
     try:
+        if not media_repo.get_by_id(media_id):
+            return jsonify({'error': 'Media not found'}), 404
         chapters = chapter_repo.get_by_media_id(media_id)
         
         # Add scenes to each chapter
         for chapter in chapters:
-            chapter['scenes'] = scene_repo.get_by_chapter_id(chapter['id'])
+            chapter['scenes'] = scene_repo.get_by_chapter_id(chapter['id'], media_id)
         
         return jsonify(chapters)
     except Exception as e:
@@ -258,12 +269,14 @@ def get_chapters(media_id):
 def get_sentences_grouped(media_id):
     """Get sentences grouped by chapters and scenes with phrase matching"""
     try:
+        if not media_repo.get_by_id(media_id):
+            return jsonify({'error': 'Media not found'}), 404
         chapters = chapter_repo.get_by_media_id(media_id)
         
         for chapter in chapters:
-            scenes = scene_repo.get_by_chapter_id(chapter['id'])
+            scenes = scene_repo.get_by_chapter_id(chapter['id'], media_id)
             for scene in scenes:
-                sentences = sentence_repo.get_by_scene_id(scene['id'])
+                sentences = sentence_repo.get_by_scene_id(scene['id'], media_id)
                 
                 # Apply phrase matching to each sentence
                 for sentence in sentences:
@@ -284,6 +297,8 @@ def get_sentences_grouped(media_id):
 def get_sentences(media_id):
     """Get flat list of sentences for a media with optimized phrase matching"""
     try:
+        if not media_repo.get_by_id(media_id):
+            return jsonify({'error': 'Media not found'}), 404
         sentences = sentence_repo.get_by_media_id(media_id)
         
         # Apply fast phrase matching to each sentence
@@ -305,39 +320,133 @@ def get_sentences(media_id):
 
 @app.route('/api/media/<media_id>', methods=['DELETE'])
 def delete_media(media_id):
-    """Delete media and all related data"""
+    """Delete media: hide it right away and purge files and rows in the background"""
     try:
-        # Get media info first
-        media = media_repo.get_by_id(media_id)
-        if not media:
+        if not media_repo.mark_deleted(media_id):
             return jsonify({'error': 'Media not found'}), 404
         
+        start_media_purge(media_id)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Media deleted successfully'
+        })
+    
+    except Exception as e:
+        logger.error(f"Error deleting media {media_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/media/<media_id>/jobs/<job>/status', methods=['GET'])
+def get_job_status(media_id, job):
+    """Get progress of a background or long-running job (full, compilation, chapter_<id>, ...)"""
+    status = processing_status.get(f"{media_id}_{job}")
+    if not status:
+        return jsonify({'error': 'No such job'}), 404
+    return jsonify(status)
+
+@app.route('/api/media/<media_id>/delete-status', methods=['GET'])
+def get_delete_status(media_id):
+    """Get progress of the background purge of a deleted media"""
+    status = processing_status.get(f"{media_id}_delete")
+    if not status:
+        return jsonify({'error': 'No deletion in progress'}), 404
+    return jsonify(status)
+
+# Rows/files removed per purge step; small steps keep the write lock short
+PURGE_BATCH_SIZE = 500
+
+def start_media_purge(media_id):
+    """Start the background purge of a soft-deleted media"""
+    status = processing_status.get(f"{media_id}_delete")
+    if status and status['stage'] not in ('completed', 'error'):
+        return
+    
+    processing_status[f"{media_id}_delete"] = {
+        'stage': 'starting',
+        'progress': 0,
+        'message': '미디어 삭제를 시작합니다...'
+    }
+    thread = threading.Thread(target=purge_media_background, args=(media_id,))
+    thread.daemon = True
+    thread.start()
+
+def purge_media_background(media_id):
+    """Background removal of the files and rows of a soft-deleted media"""
+    status_key = f"{media_id}_delete"
+    try:
+        media = media_repo.get_by_id(media_id, include_deleted=True)
+        if not media:
+            raise Exception("Media not found")
+        
         # Delete media file
         if media.get('filename'):
+            pcm_source = media['filename'] if media.get('fileType') != 'video' else f"{media_id}.mp3"
+            pcm_path = file_manager.get_media_path(pcm_source)
+            if pcm_path:
+                pcm_cache.discard(pcm_path)
+            waveform_store.delete(media_id)
+            sentence_audio_store.delete(media_id)
             file_manager.delete_media_file(media['filename'])
             
             # Also delete converted MP3 if it's a video
             if media.get('fileType') == 'video':
-                mp3_filename = f"{media_id}.mp3"
-                file_manager.delete_media_file(mp3_filename)
+                file_manager.delete_media_file(f"{media_id}.mp3")
+        
+        # Delete output files in batches (0-50%)
+        total_files = file_manager.count_media_output_files(media_id)
+        removed_files = 0
+        while True:
+            removed = file_manager.cleanup_media_outputs_batch(media_id, PURGE_BATCH_SIZE)
+            if not removed:
+                break
+            removed_files += removed
+            processing_status[status_key] = {
+                'stage': 'files',
+                'progress': int(min(removed_files / max(total_files, 1), 1.0) * 50),
+                'message': f'출력 파일 삭제 중... ({removed_files}/{total_files})'
+            }
         
-        # Delete output files
-        file_manager.cleanup_media_outputs(media_id)
+        # Delete chapters, scenes and sentences in batches (50-95%)
+        removed_rows = 0
+        while True:
+            removed = structure_repo.delete_structure_batch(media_id, PURGE_BATCH_SIZE)
+            if not removed:
+                break
+            removed_rows += removed
+            processing_status[status_key] = {
+                'stage': 'rows',
+                'progress': min(50 + removed_rows // PURGE_BATCH_SIZE, 95),
+                'message': f'데이터베이스 정리 중... ({removed_rows}개 삭제)'
+            }
+            # Let other writers in between batches
+            time.sleep(0.01)
         
-        # Delete from database (cascades to chapters, scenes, sentences)
-        success = media_repo.delete(media_id)
+        media_repo.delete(media_id)
+        if removed_rows >= structure_repo.BULK_WRITE_ROWS:
+            db_manager.checkpoint('TRUNCATE')
+        
+        processing_status[status_key] = {
+            'stage': 'completed',
+            'progress': 100,
+            'message': f'삭제가 완료되었습니다. (파일 {removed_files}개, 데이터 {removed_rows}개)'
+        }
+        logger.info(f"Purged media {media_id}: {removed_files} files, {removed_rows} rows")
         
-        if success:
-            return jsonify({
-                'success': True,
-                'message': 'Media deleted successfully'
-            })
-        else:
-            return jsonify({'error': 'Failed to delete media from database'}), 500
-            
     except Exception as e:
-        logger.error(f"Error deleting media {media_id}: {e}")
-        return jsonify({'error': str(e)}), 500
+        logger.error(f"Purge failed for media {media_id}: {e}")
+        processing_status[status_key] = {
+            'stage': 'error',
+            'progress': 0,
+            'message': f'삭제 중 오류가 발생했습니다: {str(e)}'
+        }
+
+def resume_media_purges():
+    """Restart purges of media that were soft-deleted before a restart"""
+    try:
+        for media in media_repo.get_deleted():
+            start_media_purge(media['id'])
+    except Exception as e:
+        logger.error(f"Failed to resume media purges: {e}")
 
 # =============================================================================
 # FILE UPLOAD ROUTES
@@ -357,30 +466,29 @@ def upload_file():
         # Save file using file manager
         filename, media_id, file_info = file_manager.save_uploaded_file(file)
         
-        # Extract audio if video file
-        if file_info['file_type'] == 'video':
-            video_path = file_manager.get_media_path(filename)
-            audio_filename = f"{media_id}.mp3"
-            audio_path = file_manager.upload_folder / audio_filename
-            
-            if ffmpeg_processor.extract_audio_from_video(video_path, str(audio_path)):
-                file_info['audio_filename'] = audio_filename
-        
-        # Get duration
-        media_path = file_manager.get_media_path(filename)
-        duration = ffmpeg_processor.get_media_duration(media_path)
-        if duration:
-            file_info['duration'] = duration
-        
-        # Save to database
-        media_repo.create(file_info)
+        # Register right away; probing, audio extraction and decoding run in the
+        # background ingest pipeline (progress at /api/media/<id>/ingest-status)
+        media_repo.create({
+            'id': media_id,
+            'filename': filename,
+            'originalFilename': file_info['original_filename'],
+            'fileSize': file_info['file_size'],
+            'fileType': file_info['file_type'],
+            'status': 'ingesting'
+        })
+        ingest_pipeline.submit(
+            media_id, file_info['file_path'], file_info['file_type'],
+            transcribe=request.form.get('transcribe') or None
+        )
         
         return jsonify({
             'success': True,
             'mediaId': media_id,
             'filename': filename,
             'fileType': file_info['file_type'],
-            'duration': duration
+            'duration': None,
+            'status': 'ingesting',
+            'statusUrl': f'/api/media/{media_id}/ingest-status'
         })
     
     except ValueError as e:
@@ -496,75 +604,23 @@ def import_from_sync_directory():
                     subtitle_dest = upload_dir / subtitle_filename
                     shutil.move(str(subtitle_file), str(subtitle_dest))
                 
-                # Process file like in upload_file function
+                # Register like upload_file; the ingest pipeline does the rest
                 file_ext = media_file.suffix.lower()
                 file_type = 'video' if file_ext in {'.mp4', '.mkv', '.avi', '.mov', '.wmv', '.webm', '.m4v'} else 'audio'
                 
-                file_info = {
+                media_repo.create({
                     'id': media_id,
                     'originalFilename': media_file.name,
                     'filename': media_filename,
                     'fileType': file_type,
                     'fileSize': media_dest.stat().st_size,
-                    'status': 'uploaded'
-                }
-                
-                # Extract audio if video file
-                if file_type == 'video':
-                    audio_filename = f"{media_id}.mp3"
-                    audio_path = upload_dir / audio_filename
-                    
-                    if ffmpeg_processor.extract_audio_from_video(str(media_dest), str(audio_path)):
-                        file_info['audio_filename'] = audio_filename
-                
-                # Get duration
-                duration = ffmpeg_processor.get_media_duration(str(media_dest))
-                if duration:
-                    file_info['duration'] = duration
-                
-                # Save to database
-                media_repo.create(file_info)
-                
-                # Process subtitle file if exists
-                if subtitle_filename:
-                    subtitle_path = upload_dir / subtitle_filename
-                    if subtitle_path.exists():
-                        # Import subtitle sentences
-                        try:
-                            # Create default chapter for subtitles
-                            chapter_data = {
-                                'mediaId': media_id,
-                                'title': 'Subtitles',
-                                'startTime': 0.0,
-                                'endTime': duration or 7200.0,  # Default 2 hours if no duration
-                                'order': 1
-                            }
-                            chapter_id = chapter_repo.create(chapter_data)
-                            
-                            # Create default scene for subtitles
-                            scene_data = {
-                                'chapterId': chapter_id,
-                                'title': 'Main Scene',
-                                'startTime': 0.0,
-                                'endTime': duration or 7200.0,
-                                'order': 1
-                            }
-                            scene_id = scene_repo.create(scene_data)
-                            
-                            # Parse and import subtitle sentences
-                            sentences = subtitle_processor.parse_srt_file(str(subtitle_path))
-                            if sentences:
-                                sentence_ids = []
-                                for i, sentence_data in enumerate(sentences):
-                                    sentence_data['sceneId'] = scene_id
-                                    sentence_data['order'] = i + 1
-                                    sentence_id = sentence_repo.create(sentence_data)
-                                    sentence_ids.append(sentence_id)
-                                
-                                # Auto analysis disabled - only using words_db matching
-                                    
-                        except Exception as subtitle_error:
-                            logger.warning(f"Failed to process subtitle file {subtitle_filename}: {subtitle_error}")
+                    'status': 'ingesting'
+                })
+                ingest_pipeline.submit(
+                    media_id, str(media_dest), file_type,
+                    subtitle_path=str(upload_dir / subtitle_filename) if subtitle_filename else None,
+                    transcribe=data.get('transcribe') or None
+                )
                 
                 result['success'] = True
                 result['mediaId'] = media_id
@@ -597,6 +653,7 @@ def get_processing_status(media_id):
         return jsonify({
             'status': media['status'],
             'processing': status,
+            'ingest': ingest_pipeline.status(media_id),
             'hasSubtitles': bool(sentence_repo.get_by_media_id(media_id))
         })
     
@@ -604,12 +661,169 @@ def get_processing_status(media_id):
         logger.error(f"Error getting status for media {media_id}: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/media/<media_id>/ingest-status', methods=['GET'])
+def get_ingest_status(media_id):
+    """Stage-by-stage progress of the background ingest of a media"""
+    try:
+        media = media_repo.get_by_id(media_id)
+        if not media:
+            return jsonify({'error': 'Media not found'}), 404
+        
+        status = ingest_pipeline.status(media_id)
+        if status is None:
+            # Ingested before this server started
+            status = {'stage': 'completed' if media['status'] != 'ingesting' else 'queued'}
+        
+        return jsonify({'status': media['status'], 'ingest': status})
+    
+    except Exception as e:
+        logger.error(f"Error getting ingest status for media {media_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def build_waveform_background(media_id, audio_path):
+    """Decode an older media into the PCM cache and build its waveform peaks"""
+    status_key = f"{media_id}_waveform"
+    try:
+        processing_status[status_key] = {
+            'stage': 'decoding',
+            'progress': 10,
+            'message': '오디오 분석용 디코딩 중...'
+        }
+        pcm_cache.ensure(audio_path)
+        
+        processing_status[status_key] = {
+            'stage': 'building',
+            'progress': 70,
+            'message': '파형 데이터 생성 중...'
+        }
+        waveform_store.build(media_id, audio_path)
+        
+        processing_status[status_key] = {
+            'stage': 'completed',
+            'progress': 100,
+            'message': '파형 데이터가 준비되었습니다.'
+        }
+    except Exception as e:
+        logger.error(f"Waveform build failed for media {media_id}: {e}")
+        processing_status[status_key] = {
+            'stage': 'error',
+            'progress': 0,
+            'message': f'파형 생성 중 오류가 발생했습니다: {str(e)}'
+        }
+
+@app.route('/api/media/<media_id>/waveform', methods=['GET'])
+def get_waveform_meta(media_id):
+    """Zoom levels of the waveform peaks.
+    
+    Peaks are built at ingest. For older media the first request starts a
+    background build and gets 202 with a status URL until the peaks are ready.
+    """
+    try:
+        media = media_repo.get_by_id(media_id)
+        if not media:
+            return jsonify({'error': 'Media not found'}), 404
+        
+        meta = waveform_store.get_meta(media_id)
+        if meta is None:
+            if media['status'] == 'ingesting':
+                # The ingest pipeline builds the peaks
+                return jsonify({
+                    'status': 'building',
+                    'statusUrl': f'/api/media/{media_id}/ingest-status'
+                }), 202
+            
+            status_key = f"{media_id}_waveform"
+            status = processing_status.get(status_key)
+            if status and status['stage'] == 'error':
+                # Report the failure once; the next request tries again
+                processing_status.pop(status_key, None)
+                return jsonify({'error': status['message']}), 500
+            if not status or status['stage'] == 'completed':
+                audio_filename = f"{media_id}.mp3" if media['fileType'] == 'video' else media['filename']
+                audio_path = file_manager.get_media_path(audio_filename)
+                if not audio_path:
+                    return jsonify({'error': 'Audio file not found'}), 404
+                
+                processing_status[status_key] = {
+                    'stage': 'starting',
+                    'progress': 0,
+                    'message': '파형 데이터 생성을 시작합니다...'
+                }
+                thread = threading.Thread(target=build_waveform_background, args=(media_id, audio_path))
+                thread.daemon = True
+                thread.start()
+            
+            return jsonify({
+                'status': 'building',
+                'statusUrl': f'/api/media/{media_id}/jobs/waveform/status'
+            }), 202
+        
+        for level in meta['levels'].values():
+            level['url'] = f"/api/media/{media_id}/waveform/{level['samples_per_bucket']}"
+        return jsonify(dict(meta, format='int8 min/max pairs'))
+    
+    except Exception as e:
+        logger.error(f"Error getting waveform for media {media_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/media/<media_id>/waveform/<int:samples_per_bucket>', methods=['GET'])
+def get_waveform_peaks(media_id, samples_per_bucket):
+    """Peaks of one zoom level.
+    
+    With ``start``/``end`` (seconds) only that window is sent and the index of its
+    first bucket is in X-Waveform-First-Bucket; otherwise the whole level, with
+    HTTP Range support.
+    """
+    try:
+        if samples_per_bucket not in waveform_store.LEVELS:
+            return jsonify({'error': f'Unknown zoom level, use one of {list(waveform_store.LEVELS)}'}), 400
+        if not waveform_store.exists(media_id):
+            return jsonify({'error': 'Waveform not built'}), 404
+        
+        if 'start' in request.args or 'end' in request.args:
+            start_time = request.args.get('start', 0.0, type=float)
+            end_time = request.args.get('end', type=float)
+            first_bucket, peaks = waveform_store.read_window(media_id, samples_per_bucket, start_time, end_time)
+            response = Response(peaks, mimetype='application/octet-stream')
+            response.headers['X-Waveform-First-Bucket'] = str(first_bucket)
+        else:
+            response = send_file(
+                waveform_store.level_path(media_id, samples_per_bucket),
+                mimetype='application/octet-stream', conditional=True
+            )
+        
+        response.headers['X-Waveform-Samples-Per-Bucket'] = str(samples_per_bucket)
+        response.headers['Cache-Control'] = 'public, max-age=86400'
+        return response
+    
+    except Exception as e:
+        logger.error(f"Error serving waveform peaks for media {media_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def resume_media_ingests():
+    """Requeue media whose ingest was interrupted by a restart"""
+    try:
+        for media in media_repo.get_by_status('ingesting'):
+            media_path = file_manager.get_media_path(media['filename'])
+            if not media_path:
+                media_repo.update_status(media['id'], 'error')
+                continue
+            subtitles = sorted(file_manager.upload_folder.glob(f"{media['id']}_*.srt"))
+            metadata = json.loads(media['metadata']) if media.get('metadata') else {}
+            ingest_pipeline.submit(
+                media['id'], media_path, media['fileType'],
+                subtitle_path=str(subtitles[0]) if subtitles else None,
+                transcribe=metadata.get('transcribe')
+            )
+    except Exception as e:
+        logger.error(f"Failed to resume media ingests: {e}")
+
 # =============================================================================
 # WHISPER PROCESSING
 # =============================================================================
 
 def process_with_whisper_background(media_id, template_type):
-    """Background Whisper processing"""
+    """Background Whisper processing; returns whether the transcription succeeded"""
     try:
         processing_status[media_id] = {
             'stage': 'starting',
@@ -680,6 +894,7 @@ def process_with_whisper_background(media_id, template_type):
         })
         
         media_repo.update_status(media_id, 'completed')
+        return True
         
     except Exception as e:
         logger.error(f"Whisper processing failed for media {media_id}: {e}")
@@ -689,11 +904,39 @@ def process_with_whisper_background(media_id, template_type):
             'message': f'처리 중 오류가 발생했습니다: {str(e)}'
         }
         media_repo.update_status(media_id, 'error')
+        return False
+
+def ingest_transcribe(job, report):
+    """Ingest stage: Whisper transcription when the upload asked for it"""
+    if not job.get('transcribe'):
+        return False
+    if not process_with_whisper_background(job['media_id'], job['transcribe']):
+        raise RuntimeError(processing_status[job['media_id']]['message'])
+
+# A failed transcription the upload asked for fails the ingest, as it already marks the media 'error'
+ingest_pipeline.add_stage('transcribe', 'Whisper 처리 중...', ingest_transcribe)
+
+def ingest_sentence_audio(job, report):
+    """Ingest stage: cut the sentences imported or transcribed above"""
+    sentences = sentence_repo.get_by_media_id(job['media_id'])
+    if not sentence_audio_store.at_ingest or not sentences:
+        return False
+    sentence_audio_store.sync(job['media_id'], job['audio_path'], sentences,
+                              lambda done, total: report(done / total))
+
+ingest_pipeline.add_stage('sentence_audio', '문장 오디오 생성 중...', ingest_sentence_audio, required=False)
 
 @app.route('/api/media/<media_id>/process-whisper', methods=['POST'])
 def process_whisper(media_id):
     """Start Whisper processing"""
     try:
+        media = media_repo.get_by_id(media_id)
+        if not media:
+            return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
+        
         data = request.get_json()
         template_type = data.get('template', 'toeic_lc')
         
@@ -730,6 +973,10 @@ def extract_sentence_mp3(media_id, sentence_id):
         media = media_repo.get_by_id(media_id)
         if not media:
             return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
+        load_media_probe(media)
         
         # Prepare file paths
         audio_filename = f"{media_id}.mp3" if media['fileType'] == 'video' else media['filename']
@@ -740,11 +987,17 @@ def extract_sentence_mp3(media_id, sentence_id):
         output_filename = f'sentence_{sentence_id}_{sentence["startTime"]:.1f}s-{sentence["endTime"]:.1f}s.mp3'
         output_file = os.path.join(output_dir, output_filename)
         
-        # Extract audio segment
-        duration = sentence['endTime'] - sentence['startTime']
-        success = ffmpeg_processor.extract_audio_segment(
-            input_file, output_file, sentence['startTime'], duration
-        )
+        # Serve a previous extraction of the same clip, otherwise extract and cache it
+        cache_key = clip_cache.sentence_key(input_file, 'mp3-copy', sentence, volume=ffmpeg_processor.volume_for(input_file))
+        success = clip_cache.fetch(cache_key, output_file)
+        if not success:
+            # Cut the MP3 source losslessly; the volume boost becomes ReplayGain metadata
+            duration = sentence['endTime'] - sentence['startTime']
+            success = ffmpeg_processor.extract_audio_segment(
+                input_file, output_file, sentence['startTime'], duration, stream_copy=True
+            )
+            if success:
+                clip_cache.store(cache_key, output_file)
         
         if success:
             return jsonify({
@@ -759,6 +1012,139 @@ def extract_sentence_mp3(media_id, sentence_id):
         logger.error(f"Error extracting MP3 for sentence {sentence_id}: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Sentence files are immutable under their name; the per-sentence URL only redirects
+SENTENCE_AUDIO_MAX_AGE = 365 * 24 * 3600
+
+def sentence_audio_source(media):
+    """Audio file sentences are cut from, with the stored loudness loaded"""
+    load_media_probe(media)
+    audio_filename = f"{media['id']}.mp3" if media['fileType'] == 'video' else media['filename']
+    return file_manager.get_media_path(audio_filename)
+
+@app.route('/api/sentence/<media_id>/<int:sentence_id>/audio', methods=['GET'])
+def get_sentence_audio(media_id, sentence_id):
+    """Redirect to the pre-cut file of a sentence, cutting it first if needed"""
+    try:
+        sentences = sentence_repo.get_by_media_id(media_id)
+        sentence = next((s for s in sentences if s['id'] == sentence_id), None)
+        if not sentence:
+            return jsonify({'error': 'Sentence not found'}), 404
+        
+        media = media_repo.get_by_id(media_id)
+        if not media:
+            return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
+        input_file = sentence_audio_source(media)
+        if not input_file:
+            return jsonify({'error': 'Media file not found'}), 404
+        
+        filename = sentence_audio_store.ensure(media_id, input_file, sentence)
+        if not filename:
+            return jsonify({'error': 'Extraction failed'}), 500
+        
+        response = redirect(f'/api/media/{media_id}/sentence-audio/{filename}')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    except Exception as e:
+        logger.error(f"Error serving audio for sentence {sentence_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/media/<media_id>/sentence-audio/<filename>', methods=['GET'])
+def serve_sentence_audio(media_id, filename):
+    """Serve a pre-cut sentence file; its name changes whenever its content would"""
+    try:
+        file_path = sentence_audio_store.path(media_id, filename)
+        if not file_path:
+            return jsonify({'error': 'File not found'}), 404
+        
+        response = send_file(file_path, mimetype=sentence_audio_store.MIMETYPE,
+                             conditional=True, max_age=SENTENCE_AUDIO_MAX_AGE)
+        response.headers['Cache-Control'] = f'public, max-age={SENTENCE_AUDIO_MAX_AGE}, immutable'
+        return response
+    
+    except Exception as e:
+        logger.error(f"Error serving sentence audio {filename} of media {media_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/media/<media_id>/sentence-audio', methods=['POST'])
+def sync_sentence_audio(media_id):
+    """Cut every sentence without a current file in the background"""
+    try:
+        media = media_repo.get_by_id(media_id)
+        if not media:
+            return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
+        input_file = sentence_audio_source(media)
+        if not input_file:
+            return jsonify({'error': 'Media file not found'}), 404
+        
+        status_key = f"{media_id}_sentence_audio"
+        if processing_status.get(status_key, {}).get('stage') == 'cutting':
+            return jsonify({'success': True, 'message': '이미 진행 중입니다.', 'status_key': status_key})
+        
+        processing_status[status_key] = {
+            'stage': 'cutting',
+            'progress': 0,
+            'message': '문장 오디오 생성 준비 중...'
+        }
+        thread = threading.Thread(target=sync_sentence_audio_background, args=(media_id, input_file))
+        thread.daemon = True
+        thread.start()
+        
+        return jsonify({'success': True, 'message': '문장 오디오 생성이 시작되었습니다.', 'status_key': status_key})
+    
+    except Exception as e:
+        logger.error(f"Error starting sentence audio for media {media_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def sync_sentence_audio_background(media_id, input_file):
+    """Background sync of the sentence files of a media"""
+    status_key = f"{media_id}_sentence_audio"
+    try:
+        def report(done, total):
+            processing_status[status_key] = {
+                'stage': 'cutting',
+                'progress': int(done / total * 100),
+                'message': f'문장 오디오 생성 중... ({done}/{total})'
+            }
+        
+        counts = sentence_audio_store.sync(media_id, input_file, sentence_repo.get_by_media_id(media_id), report)
+        processing_status[status_key] = {
+            'stage': 'completed',
+            'progress': 100,
+            'message': f"문장 오디오 생성 완료 (새로 생성 {counts['cut']}개, 기존 {counts['kept']}개, 실패 {counts['failed']}개)",
+            'counts': counts
+        }
+    
+    except Exception as e:
+        logger.error(f"Sentence audio sync failed for media {media_id}: {e}")
+        processing_status[status_key] = {
+            'stage': 'error',
+            'progress': 0,
+            'message': f'문장 오디오 생성 중 오류가 발생했습니다: {str(e)}'
+        }
+
+# 'burn' renders subtitles into the picture (re-encode, works everywhere);
+# 'soft' muxes them as selectable mov_text tracks next to stream-copied video
+SUBTITLE_MODES = ('burn', 'soft')
+
+# Largest silence (seconds) between bookmarked sentences that still joins them into one clip
+MAX_COALESCE_GAP = 10.0
+
+def parse_coalesce_gap(value):
+    """coalesce_gap of a request as seconds, or None unless it is a number in 0-MAX_COALESCE_GAP"""
+    try:
+        gap = float(value)
+    except (TypeError, ValueError):
+        return None
+    # NaN fails both comparisons
+    return gap if 0 <= gap <= MAX_COALESCE_GAP else None
+
 @app.route('/api/sentence/<media_id>/<int:sentence_id>/extract-mp4', methods=['POST'])
 def extract_sentence_mp4(media_id, sentence_id):
     """Extract single sentence as MP4 with subtitles"""
@@ -769,6 +1155,9 @@ def extract_sentence_mp4(media_id, sentence_id):
         korean_subtitle = data.get('korean_subtitle', False)
         english_font_size = data.get('english_font_size', 32)
         korean_font_size = data.get('korean_font_size', 24)
+        subtitle_mode = data.get('subtitle_mode', 'burn')
+        if subtitle_mode not in SUBTITLE_MODES:
+            return jsonify({'error': f'Invalid subtitle_mode: {subtitle_mode}'}), 400
         
         # 디버깅: 실제 받은 데이터 로그
         logger.info(f"단일 문장 MP4 추출 요청 데이터: {data}")
@@ -785,10 +1174,14 @@ def extract_sentence_mp4(media_id, sentence_id):
         media = media_repo.get_by_id(media_id)
         if not media:
             return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
         
         # Prepare paths
         is_video = media['fileType'] == 'video'
         input_file = file_manager.get_media_path(media['filename'])
+        load_media_probe(media)
         
         # Debug logging
         logger.info(f"Extracting sentence: is_video={is_video}, input_file={input_file}, file_exists={os.path.exists(input_file) if input_file else False}")
@@ -799,7 +1192,8 @@ def extract_sentence_mp4(media_id, sentence_id):
         # Generate filename with subtitle suffix
         subtitle_suffix = file_manager._get_subtitle_suffix({
             'english': english_subtitle,
-            'korean': korean_subtitle
+            'korean': korean_subtitle,
+            'subtitle_mode': subtitle_mode
         })
         output_filename = f'sentence_{sentence_id}_{sentence["startTime"]:.1f}s-{sentence["endTime"]:.1f}s{subtitle_suffix}.mp4'
         output_file = os.path.join(output_dir, output_filename)
@@ -809,11 +1203,18 @@ def extract_sentence_mp4(media_id, sentence_id):
             'english': english_subtitle,
             'korean': korean_subtitle,
             'english_font_size': english_font_size,
-            'korean_font_size': korean_font_size
+            'korean_font_size': korean_font_size,
+            'subtitle_mode': subtitle_mode
         }
-        success = media_extractor.extract_sentence_with_subtitles(
-            input_file, output_file, sentence, subtitle_options, is_video
-        )
+        clip_kind = 'mp4' if is_video else f'mp4-still-{ffmpeg_processor.still_video_profile}'
+        cache_key = clip_cache.sentence_key(input_file, clip_kind, sentence, subtitle_options, ffmpeg_processor.volume_for(input_file))
+        success = clip_cache.fetch(cache_key, output_file)
+        if not success:
+            success = media_extractor.extract_sentence_with_subtitles(
+                input_file, output_file, sentence, subtitle_options, is_video
+            )
+            if success:
+                clip_cache.store(cache_key, output_file)
         
         if success:
             return jsonify({
@@ -905,7 +1306,7 @@ def translate_sentences_background(media_id):
                 korean_text = translator.translate(sentence['english'])
                 
                 # Update in database
-                sentence_repo.update_translation(sentence['id'], korean_text)
+                sentence_repo.update_translation(sentence['id'], korean_text, media_id)
                 
                 # Small delay to avoid rate limiting
                 time.sleep(0.1)
@@ -1092,34 +1493,13 @@ def parse_srt_content(srt_content):
 def save_sentences_to_db(media_id, sentences_data):
     """Save parsed sentences to database"""
     
-    # Create default chapter and scene structure
-    chapter_data = {
-        'mediaId': media_id,
-        'title': 'Main Content',
-        'startTime': sentences_data[0]['startTime'] if sentences_data else 0,
-        'endTime': sentences_data[-1]['endTime'] if sentences_data else 0,
-        'order': 1
-    }
-    
-    chapter_ids = chapter_repo.create_batch([chapter_data])
-    chapter_id = chapter_ids[0]
-    
-    scene_data = {
-        'chapterId': chapter_id,
-        'title': 'Scene 1',
-        'startTime': chapter_data['startTime'],
-        'endTime': chapter_data['endTime'],
-        'order': 1
-    }
-    
-    scene_ids = scene_repo.create_batch([scene_data])
-    scene_id = scene_ids[0]
+    # Default chapter and scene structure, replaced in a single transaction
+    start_time = sentences_data[0]['startTime'] if sentences_data else 0
+    end_time = sentences_data[-1]['endTime'] if sentences_data else 0
     
-    # Prepare sentences for batch insert
     db_sentences = []
     for sentence in sentences_data:
         db_sentences.append({
-            'sceneId': scene_id,
             'english': sentence['english'],
             'korean': sentence.get('korean'),
             'startTime': sentence['startTime'],
@@ -1128,7 +1508,17 @@ def save_sentences_to_db(media_id, sentences_data):
             'confidence': sentence.get('confidence', 0.95)
         })
     
-    sentence_repo.create_batch(db_sentences)
+    structure_repo.replace_structure(media_id, [{
+        'title': 'Main Content',
+        'startTime': start_time,
+        'endTime': end_time,
+        'scenes': [{
+            'title': 'Scene 1',
+            'startTime': start_time,
+            'endTime': end_time,
+            'sentences': db_sentences
+        }]
+    }])
 
 # =============================================================================
 # BOOKMARK ROUTES
@@ -1138,7 +1528,7 @@ def save_sentences_to_db(media_id, sentences_data):
 def toggle_bookmark(media_id, sentence_id):
     """Toggle bookmark status of a sentence"""
     try:
-        result = sentence_repo.toggle_bookmark(sentence_id)
+        result = sentence_repo.toggle_bookmark(sentence_id, media_id)
         return jsonify({'success': True, **result})
     
     except ValueError as e:
@@ -1194,11 +1584,12 @@ def export_bookmarks(media_id):
 
 @app.route('/api/media/<media_id>/extract-bookmarked', methods=['POST'])
 def extract_bookmarked_mp3(media_id):
-    """Extract all bookmarked sentences as MP3 ZIP"""
+    """Prepare the MP3 ZIP of bookmarked sentences.
+    
+    Nothing is extracted here: the returned download URL streams the archive while
+    the clips are cut, so the download starts right away.
+    """
     try:
-        import zipfile
-        import tempfile
-        
         # Get bookmarked sentences
         bookmarked_sentences = sentence_repo.get_bookmarked_by_media_id(media_id)
         if not bookmarked_sentences:
@@ -1207,58 +1598,123 @@ def extract_bookmarked_mp3(media_id):
         media = media_repo.get_by_id(media_id)
         if not media:
             return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
+        
+        zip_filename = f'bookmarked_sentences_{media_id}.zip'
+        return jsonify({
+            'success': True,
+            'filename': zip_filename,
+            'download_url': f'/api/media/{media_id}/bookmarked-mp3.zip',
+            'count': len(bookmarked_sentences)
+        })
+    
+    except Exception as e:
+        logger.error(f"Error extracting bookmarked MP3 for media {media_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# Clips cut per ffmpeg pass while streaming, small so the first entries go out early
+BOOKMARK_ZIP_PASS_CLIPS = 8
+
+@app.route('/api/media/<media_id>/bookmarked-mp3.zip', methods=['GET'])
+def download_bookmarked_mp3_zip(media_id):
+    """Stream bookmarked sentences as an MP3 ZIP, each entry sent as soon as it is cut"""
+    try:
+        bookmarked_sentences = sentence_repo.get_bookmarked_by_media_id(media_id)
+        if not bookmarked_sentences:
+            return jsonify({'error': 'No bookmarked sentences found'}), 404
+        
+        media = media_repo.get_by_id(media_id)
+        if not media:
+            return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
+        load_media_probe(media)
         
         # Prepare input file
         audio_filename = f"{media_id}.mp3" if media['fileType'] == 'video' else media['filename']
         input_file = file_manager.get_media_path(audio_filename)
+        if not input_file:
+            return jsonify({'error': 'Media file not found'}), 404
         
-        # Create output directory
-        output_dir = file_manager.create_output_directory(media_id, media['filename'])
+        work_dir = tempfile.mkdtemp(prefix='bookmarked_')
+        ready = Queue()
+        stop = threading.Event()
         
-        # Create temporary directory for individual files
-        with tempfile.TemporaryDirectory() as temp_dir:
-            extracted_files = []
-            
-            for sentence in bookmarked_sentences:
-                # Generate filename
-                output_filename = f'bookmarked_{sentence["order"]:04d}_{sentence["startTime"]:.1f}s-{sentence["endTime"]:.1f}s.mp3'
-                output_file = os.path.join(temp_dir, output_filename)
+        def produce():
+            """Cut clips in small passes, handing each one over when it is done"""
+            try:
+                segments = []
+                for sentence in bookmarked_sentences:
+                    output_filename = f'bookmarked_{sentence["order"]:04d}_{sentence["startTime"]:.1f}s-{sentence["endTime"]:.1f}s.mp3'
+                    duration = sentence['endTime'] - sentence['startTime']
+                    segments.append((sentence['startTime'], duration, os.path.join(work_dir, output_filename)))
                 
-                # Extract audio segment
-                duration = sentence['endTime'] - sentence['startTime']
-                success = ffmpeg_processor.extract_audio_segment(
-                    input_file, output_file, sentence['startTime'], duration
-                )
+                # Cached clips go out first, then the rest from shared decodes
+                volume = ffmpeg_processor.volume_for(input_file)
+                cache_keys = [clip_cache.sentence_key(input_file, 'mp3', sentence, volume=volume) for sentence in bookmarked_sentences]
+                missing = []
+                for index, (key, segment) in enumerate(zip(cache_keys, segments)):
+                    if clip_cache.fetch(key, segment[2]):
+                        ready.put(segment[2])
+                    else:
+                        missing.append(index)
                 
-                if success:
-                    extracted_files.append((output_file, output_filename))
-            
-            if not extracted_files:
-                return jsonify({'error': 'Failed to extract any files'}), 500
-            
-            # Create ZIP file
-            zip_filename = f'bookmarked_sentences_{media_id}.zip'
-            zip_path = os.path.join(output_dir, zip_filename)
-            
-            with zipfile.ZipFile(zip_path, 'w') as zip_file:
-                for file_path, filename in extracted_files:
-                    zip_file.write(file_path, filename)
+                for pass_start in range(0, len(missing), BOOKMARK_ZIP_PASS_CLIPS):
+                    if stop.is_set():
+                        return
+                    batch = missing[pass_start:pass_start + BOOKMARK_ZIP_PASS_CLIPS]
+                    extracted = ffmpeg_processor.extract_audio_segments(input_file, [segments[index] for index in batch])
+                    for index, success in zip(batch, extracted):
+                        if success:
+                            clip_cache.store(cache_keys[index], segments[index][2])
+                            ready.put(segments[index][2])
+                        else:
+                            logger.warning(f"Failed to extract bookmarked sentence {bookmarked_sentences[index]['id']}")
+            except Exception as e:
+                logger.error(f"Error extracting bookmarked MP3 for media {media_id}: {e}")
+            finally:
+                ready.put(None)
         
-        return jsonify({
-            'success': True,
-            'filename': zip_filename,
-            'download_url': f'/api/download/{zip_filename}',
-            'count': len(extracted_files)
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        
+        def entries():
+            for clip_path in iter(ready.get, None):
+                yield clip_path, os.path.basename(clip_path)
+        
+        def generate():
+            try:
+                yield from file_manager.stream_zip(entries(), remove_files=True)
+            finally:
+                # Also reached when the client disconnects
+                stop.set()
+                producer.join()
+                shutil.rmtree(work_dir, ignore_errors=True)
+        
+        zip_filename = f'bookmarked_sentences_{media_id}.zip'
+        return Response(generate(), mimetype='application/zip', headers={
+            'Content-Disposition': f'attachment; filename="{zip_filename}"',
+            'Cache-Control': 'no-store'
         })
     
     except Exception as e:
-        logger.error(f"Error extracting bookmarked MP3 for media {media_id}: {e}")
+        logger.error(f"Error streaming bookmarked MP3 for media {media_id}: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/media/<media_id>/extract-bookmarked-mp4', methods=['POST'])
 def extract_bookmarked_mp4(media_id):
     """Extract bookmarked sentences as MP4 with subtitle options"""
     try:
+        media = media_repo.get_by_id(media_id)
+        if not media:
+            return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
+        
         data = request.get_json() or {}
         subtitle_english = data.get('subtitle_english', True)
         subtitle_korean = data.get('subtitle_korean', False)
@@ -1266,6 +1722,15 @@ def extract_bookmarked_mp4(media_id):
         commentary_style = data.get('commentary_style', 'orange')
         english_font_size = data.get('english_font_size', 32)
         korean_font_size = data.get('korean_font_size', 24)
+        subtitle_mode = data.get('subtitle_mode', 'burn')
+        if subtitle_mode not in SUBTITLE_MODES:
+            return jsonify({'error': f'Invalid subtitle_mode: {subtitle_mode}'}), 400
+        coalesce_gap = parse_coalesce_gap(data.get('coalesce_gap', 0))
+        if coalesce_gap is None:
+            return jsonify({'error': f'coalesce_gap must be 0-{MAX_COALESCE_GAP:g} seconds'}), 400
+        coalesce_mode = data.get('coalesce_mode', 'split')
+        if coalesce_mode not in ('split', 'merge'):
+            return jsonify({'error': f'Invalid coalesce_mode: {coalesce_mode}'}), 400
         
         # 디버깅: 실제 받은 데이터 로그
         logger.info(f"북마크 MP4 추출 요청 데이터: {data}")
@@ -1279,7 +1744,7 @@ def extract_bookmarked_mp4(media_id):
         # Start background processing
         thread = threading.Thread(
             target=extract_bulk_mp4_background,
-            args=(media_id, bookmarked_sentences, 'bookmarked', subtitle_english, subtitle_korean, english_font_size, korean_font_size, include_commentary, commentary_style)
+            args=(media_id, bookmarked_sentences, 'bookmarked', subtitle_english, subtitle_korean, english_font_size, korean_font_size, include_commentary, commentary_style, subtitle_mode, coalesce_gap, coalesce_mode)
         )
         thread.daemon = True
         thread.start()
@@ -1294,6 +1759,13 @@ def extract_bookmarked_mp4(media_id):
 def extract_all_sentences_mp4(media_id):
     """Extract all sentences as MP4 with subtitle options"""
     try:
+        media = media_repo.get_by_id(media_id)
+        if not media:
+            return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
+        
         data = request.get_json() or {}
         subtitle_english = data.get('subtitle_english', True)
         subtitle_korean = data.get('subtitle_korean', False)
@@ -1301,6 +1773,15 @@ def extract_all_sentences_mp4(media_id):
         commentary_style = data.get('commentary_style', 'orange')
         english_font_size = data.get('english_font_size', 32)
         korean_font_size = data.get('korean_font_size', 24)
+        subtitle_mode = data.get('subtitle_mode', 'burn')
+        if subtitle_mode not in SUBTITLE_MODES:
+            return jsonify({'error': f'Invalid subtitle_mode: {subtitle_mode}'}), 400
+        coalesce_gap = parse_coalesce_gap(data.get('coalesce_gap', 0))
+        if coalesce_gap is None:
+            return jsonify({'error': f'coalesce_gap must be 0-{MAX_COALESCE_GAP:g} seconds'}), 400
+        coalesce_mode = data.get('coalesce_mode', 'split')
+        if coalesce_mode not in ('split', 'merge'):
+            return jsonify({'error': f'Invalid coalesce_mode: {coalesce_mode}'}), 400
         
         # 디버깅 로그 추가
         logger.info(f"전체 문장 추출 요청 데이터: {data}")
@@ -1335,7 +1816,7 @@ def extract_all_sentences_mp4(media_id):
         # Start background processing
         thread = threading.Thread(
             target=extract_bulk_mp4_background,
-            args=(media_id, all_sentences, 'all', subtitle_english, subtitle_korean, english_font_size, korean_font_size, include_commentary, commentary_style)
+            args=(media_id, all_sentences, 'all', subtitle_english, subtitle_korean, english_font_size, korean_font_size, include_commentary, commentary_style, subtitle_mode, coalesce_gap, coalesce_mode)
         )
         thread.daemon = True
         thread.start()
@@ -1357,6 +1838,9 @@ def extract_all_mp4(media_id):
         media = media_repo.get_by_id(media_id)
         if not media:
             return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
         
         # Get all sentences for subtitles
         sentences = sentence_repo.get_by_media_id(media_id)
@@ -1375,7 +1859,7 @@ def extract_all_mp4(media_id):
         logger.error(f"Error starting full media MP4 extraction for media {media_id}: {e}")
         return jsonify({'error': str(e)}), 500
 
-def extract_bulk_mp4_background(media_id, sentences, extraction_type, subtitle_english, subtitle_korean, english_font_size=32, korean_font_size=24, include_commentary=False, commentary_style='orange'):
+def extract_bulk_mp4_background(media_id, sentences, extraction_type, subtitle_english, subtitle_korean, english_font_size=32, korean_font_size=24, include_commentary=False, commentary_style='orange', subtitle_mode='burn', coalesce_gap=0, coalesce_mode='split'):
     """Background processing for bulk MP4 extraction"""
     try:
         processing_status[f"{media_id}_{extraction_type}"] = {
@@ -1390,6 +1874,7 @@ def extract_bulk_mp4_background(media_id, sentences, extraction_type, subtitle_e
         
         is_video = media['fileType'] == 'video'
         input_file = file_manager.get_media_path(media['filename'])
+        load_media_probe(media)
         
         # Create output directory with subtitle suffix
         subtitle_options = {
@@ -1398,40 +1883,66 @@ def extract_bulk_mp4_background(media_id, sentences, extraction_type, subtitle_e
             'english_font_size': english_font_size,
             'korean_font_size': korean_font_size,
             'include_commentary': include_commentary,
-            'commentary_style': commentary_style
+            'commentary_style': commentary_style,
+            'subtitle_mode': subtitle_mode
         }
         base_dir = file_manager.create_output_directory(media_id, media['filename'])
         output_dir = file_manager.create_extraction_directory(base_dir, extraction_type, subtitle_options)
         
-        total_sentences = len(sentences)
-        for i, sentence in enumerate(sentences):
-            try:
-                # Update progress
-                progress = int((i / total_sentences) * 100)
-                processing_status[f"{media_id}_{extraction_type}"] = {
-                    'stage': 'extracting',
-                    'progress': progress,
-                    'message': f'추출 중... ({i+1}/{total_sentences})'
-                }
-                
-                # Generate output filename with subtitle suffix
-                subtitle_suffix = file_manager._get_subtitle_suffix(subtitle_options)
-                base_filename = f'{sentence["order"]:04d}'
-                output_filename = f'{base_filename}{subtitle_suffix}.mp4'
-                
-                output_file = os.path.join(output_dir, output_filename)
-                
-                # Extract with subtitles
-                success = media_extractor.extract_sentence_with_subtitles(
-                    input_file, output_file, sentence, subtitle_options, is_video
-                )
-                
-                if not success:
-                    logger.warning(f"Failed to extract sentence {sentence['id']}")
-                
-            except Exception as e:
-                logger.error(f"Error extracting sentence {sentence['id']}: {e}")
-                continue
+        # Generate output filenames with subtitle suffix
+        subtitle_suffix = file_manager._get_subtitle_suffix(subtitle_options)
+        jobs = []
+        for sentence in sentences:
+            output_filename = f'{sentence["order"]:04d}{subtitle_suffix}.mp4'
+            jobs.append((os.path.join(output_dir, output_filename), sentence))
+        
+        # Clips extracted before with the same options are linked from the cache
+        clip_kind = 'mp4' if is_video else f'mp4-still-{ffmpeg_processor.still_video_profile}'
+        cache_keys = [clip_cache.sentence_key(input_file, clip_kind, sentence, subtitle_options, ffmpeg_processor.volume_for(input_file)) for _, sentence in jobs]
+        results = [clip_cache.fetch(key, output_file) for key, (output_file, _) in zip(cache_keys, jobs)]
+        missing = [index for index, cached in enumerate(results) if not cached]
+        cached_count = len(jobs) - len(missing)
+        if cached_count:
+            logger.info(f"Clip cache served {cached_count}/{len(jobs)} sentences")
+        
+        def update_progress(done, total):
+            done += cached_count
+            processing_status[f"{media_id}_{extraction_type}"] = {
+                'stage': 'extracting',
+                'progress': int((done / len(jobs)) * 100),
+                'message': f'추출 중... ({done}/{len(jobs)})'
+            }
+        
+        # Optionally let runs of consecutive sentences share one encode
+        missing_jobs = [jobs[index] for index in missing]
+        groups = None
+        if coalesce_gap and media_extractor.can_coalesce(subtitle_options, is_video):
+            groups = media_extractor.plan_coalesced_groups([sentence for _, sentence in missing_jobs], coalesce_gap)
+            logger.info(f"Coalesced {len(missing_jobs)} sentences into {len(groups)} encodes")
+            if coalesce_mode == 'merge':
+                for group in groups:
+                    if len(group) > 1:
+                        first, last = missing_jobs[group[0]][1], missing_jobs[group[-1]][1]
+                        output_filename = f'{first["order"]:04d}-{last["order"]:04d}{subtitle_suffix}.mp4'
+                        missing_jobs[group[0]] = (os.path.join(output_dir, output_filename), first)
+        grouped = {index for group in groups or [] if len(group) > 1 for index in group}
+        
+        # Extract the rest with subtitles on a CPU-bounded worker pool; nearby
+        # sentences of a video share one decode
+        extracted = media_extractor.extract_sentences_parallel(
+            input_file, missing_jobs, subtitle_options, is_video, update_progress,
+            groups=groups, merge_groups=coalesce_mode == 'merge', shared_decode=True
+        )
+        for position, (index, success) in enumerate(zip(missing, extracted)):
+            results[index] = success
+            # Pieces of a shared encode end where the next sentence starts, so they
+            # differ from a single-sentence clip and are not cached
+            if success and position not in grouped:
+                clip_cache.store(cache_keys[index], jobs[index][0])
+        
+        for (_, sentence), success in zip(jobs, results):
+            if not success:
+                logger.warning(f"Failed to extract sentence {sentence['id']}")
         
         processing_status[f"{media_id}_{extraction_type}"] = {
             'stage': 'completed',
@@ -1462,22 +1973,18 @@ def extract_full_media_mp4_background(media_id, sentences, subtitle_english, sub
         
         is_video = media['fileType'] == 'video'
         input_file = file_manager.get_media_path(media['filename'])
+        load_media_probe(media)
         
         # Create output directory
         base_dir = file_manager.create_output_directory(media_id, media['filename'])
         
-        # Create subtitle file if needed
-        subtitle_file = None
+        # Full ASS subtitle with all sentences if needed
+        subtitle_content = None
         if (subtitle_english or subtitle_korean) and sentences:
-            import uuid
-            subtitle_filename = f'full_media_{uuid.uuid4().hex}.ass'
-            subtitle_file = os.path.join(base_dir, subtitle_filename)
-            
-            # Create full ASS file with all sentences
-            create_full_ass_subtitle_file(sentences, subtitle_file, subtitle_english, subtitle_korean)
+            subtitle_content = build_full_ass_subtitle(sentences, subtitle_english, subtitle_korean)
         
         # Generate output filename
-        media_duration = ffmpeg_processor.get_media_duration(input_file)
+        media_duration = media.get('duration') or ffmpeg_processor.get_media_duration(input_file)
         suffix = ''
         if subtitle_english and subtitle_korean:
             suffix = '_engkor'
@@ -1492,23 +1999,21 @@ def extract_full_media_mp4_background(media_id, sentences, subtitle_english, sub
         output_file = os.path.join(base_dir, output_filename)
         
         # Extract full media
-        if is_video and subtitle_file:
-            success = ffmpeg_processor.extract_video_segment(
-                input_file, output_file, 0, media_duration, subtitle_file, timeout=1800
-            )
-        elif not is_video and subtitle_file:
-            success = ffmpeg_processor.create_video_from_audio(
-                input_file, output_file, 0, media_duration, subtitle_file, timeout=1800
-            )
-        else:
-            # Copy without subtitles
-            import shutil
-            shutil.copy2(input_file, output_file)
-            success = True
-        
-        # Clean up subtitle file
-        if subtitle_file and os.path.exists(subtitle_file):
-            os.remove(subtitle_file)
+        report_progress = encoding_progress_reporter(f"{media_id}_full", '전체 미디어')
+        with subtitle_processor.memory_file(subtitle_content) as subtitle_file:
+            if is_video and subtitle_file:
+                success = ffmpeg_processor.extract_video_segment(
+                    input_file, output_file, 0, media_duration, subtitle_file, progress_callback=report_progress
+                )
+            elif not is_video and subtitle_file:
+                success = ffmpeg_processor.create_video_from_audio(
+                    input_file, output_file, 0, media_duration, subtitle_file, progress_callback=report_progress
+                )
+            else:
+                # Copy without subtitles
+                import shutil
+                shutil.copy2(input_file, output_file)
+                success = True
         
         if success:
             processing_status[f"{media_id}_full"] = {
@@ -1527,8 +2032,170 @@ def extract_full_media_mp4_background(media_id, sentences, subtitle_english, sub
             'message': f'추출 중 오류가 발생했습니다: {str(e)}'
         }
 
-def create_full_ass_subtitle_file(sentences, output_path, include_english, include_korean):
-    """Create ASS subtitle file with all sentences"""
+@app.route('/api/media/<media_id>/extract-compilation', methods=['POST'])
+def extract_compilation(media_id):
+    """Join bookmarked (or selected) sentences into one MP4/MP3 with gaps and repeats"""
+    try:
+        media = media_repo.get_by_id(media_id)
+        if not media:
+            return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
+        
+        data = request.get_json() or {}
+        output_format = data.get('format', 'mp4')
+        try:
+            repeat = int(data.get('repeat', 1))
+            gap = float(data.get('gap', 0.5))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'repeat must be 1-10 and gap 0-10 seconds'}), 400
+        subtitle_mode = data.get('subtitle_mode', 'burn')
+        options = {
+            'english': data.get('subtitle_english', True),
+            'korean': data.get('subtitle_korean', False),
+            'subtitle_mode': subtitle_mode
+        }
+        
+        if output_format not in ('mp4', 'mp3'):
+            return jsonify({'error': f'Invalid format: {output_format}'}), 400
+        if not 1 <= repeat <= 10 or not 0 <= gap <= 10:
+            return jsonify({'error': 'repeat must be 1-10 and gap 0-10 seconds'}), 400
+        if subtitle_mode not in SUBTITLE_MODES:
+            return jsonify({'error': f'Invalid subtitle_mode: {subtitle_mode}'}), 400
+        
+        # Selected sentences in the given order, bookmarked ones by default
+        sentence_ids = data.get('sentence_ids')
+        if sentence_ids is not None and not isinstance(sentence_ids, list):
+            return jsonify({'error': 'sentence_ids must be a list'}), 400
+        if sentence_ids:
+            by_id = {s['id']: s for s in sentence_repo.get_by_media_id(media_id)}
+            sentences = [
+                by_id[sentence_id] for sentence_id in sentence_ids
+                if isinstance(sentence_id, int) and sentence_id in by_id
+            ]
+        else:
+            sentences = sentence_repo.get_bookmarked_by_media_id(media_id)
+        if not sentences:
+            return jsonify({'error': 'No sentences to compile'}), 404
+        if len(sentences) > ffmpeg_processor.MAX_COMPILATION_RANGES:
+            return jsonify({
+                'error': f'At most {ffmpeg_processor.MAX_COMPILATION_RANGES} sentences can be compiled at once '
+                         f'({len(sentences)} selected)'
+            }), 400
+        
+        status = processing_status.get(f"{media_id}_compilation")
+        if status and status['stage'] not in ('completed', 'error'):
+            return jsonify({'error': 'Compilation already in progress'}), 409
+        
+        processing_status[f"{media_id}_compilation"] = {
+            'stage': 'starting',
+            'progress': 0,
+            'message': '모음 파일 생성을 시작합니다...'
+        }
+        thread = threading.Thread(
+            target=extract_compilation_background,
+            args=(media_id, sentences, output_format, repeat, gap, options)
+        )
+        thread.daemon = True
+        thread.start()
+        
+        return jsonify({'success': True, 'message': '모음 파일 생성을 시작했습니다.', 'count': len(sentences)})
+    
+    except Exception as e:
+        logger.error(f"Error starting compilation for media {media_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/media/<media_id>/compilation-status', methods=['GET'])
+def get_compilation_status(media_id):
+    """Get progress of the compilation export, with the download URL when done"""
+    status = processing_status.get(f"{media_id}_compilation")
+    if not status:
+        return jsonify({'error': 'No compilation started'}), 404
+    return jsonify(status)
+
+def extract_compilation_background(media_id, sentences, output_format, repeat, gap, options):
+    """Background processing for compilation export"""
+    try:
+        media = media_repo.get_by_id(media_id)
+        if not media:
+            raise Exception("Media not found")
+        
+        is_video = media['fileType'] == 'video'
+        if output_format == 'mp3':
+            audio_filename = f"{media_id}.mp3" if is_video else media['filename']
+            input_file = file_manager.get_media_path(audio_filename)
+        else:
+            input_file = file_manager.get_media_path(media['filename'])
+        
+        load_media_probe(media)
+        output_dir = file_manager.create_output_directory(media_id, media['filename'])
+        suffix = file_manager._get_subtitle_suffix(options) if output_format == 'mp4' else ''
+        output_filename = f'compilation_{len(sentences)}x{repeat}{suffix}.{output_format}'
+        output_file = os.path.join(output_dir, output_filename)
+        
+        ranges = [(s['startTime'], s['endTime']) for s in sentences]
+        timeline = ffmpeg_processor.compilation_timeline(ranges, repeat, gap)
+        
+        # One subtitle track timed to the compilation instead of to the source
+        subtitle_content = None
+        subtitle_tracks = []
+        if output_format == 'mp4' and (options['english'] or options['korean']):
+            if options['subtitle_mode'] == 'soft':
+                cues = []
+                for offset, duration, index in timeline:
+                    lines = [sentences[index].get(key) for key in ('english', 'korean') if options[key]]
+                    text = '\n'.join(line for line in lines if line)
+                    if text:
+                        cues.append((offset, offset + duration, text))
+                subtitle_tracks.append((subtitle_processor.build_timed_srt(cues), 'eng' if options['english'] else 'kor'))
+            else:
+                timed_sentences = [
+                    dict(sentences[index], startTime=offset, endTime=offset + duration)
+                    for offset, duration, index in timeline
+                ]
+                subtitle_content = build_full_ass_subtitle(timed_sentences, options['english'], options['korean'])
+        
+        processing_status[f"{media_id}_compilation"] = {
+            'stage': 'encoding',
+            'progress': 10,
+            'message': f'{len(timeline)}개 구간을 하나의 파일로 인코딩 중...'
+        }
+        
+        # Subtitles reach ffmpeg from memory, never through the output directory
+        with ExitStack() as stack:
+            subtitle_file = stack.enter_context(subtitle_processor.memory_file(subtitle_content))
+            track_files = [
+                (stack.enter_context(subtitle_processor.memory_file(content)), language)
+                for content, language in subtitle_tracks
+            ]
+            success = ffmpeg_processor.create_compilation(
+                input_file, output_file, ranges, repeat, gap, is_video,
+                subtitle_file=subtitle_file, subtitle_tracks=track_files,
+                progress_callback=encoding_progress_reporter(f"{media_id}_compilation", '모음 파일')
+            )
+        
+        if not success:
+            raise Exception("FFmpeg processing failed")
+        
+        processing_status[f"{media_id}_compilation"] = {
+            'stage': 'completed',
+            'progress': 100,
+            'message': '모음 파일 생성이 완료되었습니다.',
+            'filename': output_filename,
+            'download_url': f'/api/download/{output_filename}'
+        }
+    
+    except Exception as e:
+        logger.error(f"Compilation export failed for media {media_id}: {e}")
+        processing_status[f"{media_id}_compilation"] = {
+            'stage': 'error',
+            'progress': 0,
+            'message': f'모음 파일 생성 중 오류가 발생했습니다: {str(e)}'
+        }
+
+def build_full_ass_subtitle(sentences, include_english, include_korean):
+    """ASS subtitle content with all sentences"""
     
     def seconds_to_ass_time(seconds):
         hours = int(seconds // 3600)
@@ -1562,9 +2229,135 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         if include_korean and sentence.get('korean'):
             ass_content += f"Dialogue: 1,{start_time},{end_time},Korean,,0,0,0,,{sentence['korean']}\n"
     
-    # Write file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(ass_content)
+    return ass_content
+
+# =============================================================================
+# ADMIN ROUTES
+# =============================================================================
+
+@app.route('/api/admin/query-stats', methods=['GET'])
+def get_query_stats():
+    """Get the slowest query shapes recorded by the database profiler"""
+    try:
+        profiler = db_manager.profiler
+        if profiler is None:
+            return jsonify({'success': True, 'enabled': False, 'queries': []})
+        
+        limit = request.args.get('limit', 10, type=int)
+        order_by = request.args.get('order_by', 'max_ms')
+        if order_by not in ('max_ms', 'avg_ms', 'total_ms', 'count', 'slow_count'):
+            return jsonify({'error': f'Invalid order_by: {order_by}'}), 400
+        
+        return jsonify({
+            'success': True,
+            'enabled': True,
+            'slow_threshold_ms': profiler.slow_threshold_ms,
+            'buckets_ms': [b if b != float('inf') else None for b in profiler.BUCKETS_MS],
+            'queries': profiler.top(limit, order_by)
+        })
+    except Exception as e:
+        logger.error(f"Error getting query stats: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/query-stats', methods=['POST'])
+def update_query_stats():
+    """Enable, disable or reset database query profiling"""
+    try:
+        data = request.get_json() or {}
+        
+        if data.get('enabled') is False:
+            db_manager.disable_query_profiling()
+        elif data.get('enabled') or 'threshold_ms' in data:
+            db_manager.enable_query_profiling(float(data.get('threshold_ms', 100.0)))
+        
+        if data.get('reset') and db_manager.profiler:
+            db_manager.profiler.reset()
+        
+        return jsonify({
+            'success': True,
+            'enabled': db_manager.profiler is not None,
+            'slow_threshold_ms': db_manager.profiler.slow_threshold_ms if db_manager.profiler else None
+        })
+    except Exception as e:
+        logger.error(f"Error updating query profiling: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/db-stats', methods=['GET'])
+def get_db_stats():
+    """Get database, WAL and free page sizes plus backup/compaction status"""
+    try:
+        return jsonify({
+            'success': True,
+            'storage': db_manager.get_storage_stats(),
+            'maintenance': maintenance_scheduler.status()
+        })
+    except Exception as e:
+        logger.error(f"Error getting database stats: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/clip-cache', methods=['GET'])
+def get_clip_cache_stats():
+    """Get hit rate and size of the extracted clip cache"""
+    try:
+        return jsonify({'success': True, 'cache': clip_cache.stats()})
+    except Exception as e:
+        logger.error(f"Error getting clip cache stats: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/clip-cache', methods=['DELETE'])
+def clear_clip_cache():
+    """Remove every cached clip"""
+    try:
+        clip_cache.clear()
+        return jsonify({'success': True})
+    except Exception as e:
+        logger.error(f"Error clearing clip cache: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/db-maintenance', methods=['POST'])
+def run_db_maintenance():
+    """Run a database backup or compaction now (in the background)"""
+    try:
+        data = request.get_json() or {}
+        action = data.get('action', 'maintenance')
+        if action == 'backup':
+            target = maintenance_scheduler.run_backup
+        elif action == 'maintenance':
+            target = lambda: maintenance_scheduler.run_maintenance(analyze=bool(data.get('analyze')))
+        elif action == 'convert':
+            # Full VACUUM of files not in incremental auto-vacuum mode; blocks writers while it runs
+            target = lambda: maintenance_scheduler.run_maintenance(analyze=bool(data.get('analyze')), convert=True)
+        else:
+            return jsonify({'error': f'Invalid action: {action}'}), 400
+        
+        thread = threading.Thread(target=target)
+        thread.daemon = True
+        thread.start()
+        
+        return jsonify({'success': True, 'message': f'{action} started'})
+    except Exception as e:
+        logger.error(f"Error starting database {data.get('action')}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/media/<media_id>/relocate-shard', methods=['POST'])
+def relocate_media_shard(media_id):
+    """Move the sentence database of a media to another directory (e.g. cold storage)"""
+    try:
+        data = request.get_json() or {}
+        target_dir = data.get('target_dir')
+        if not target_dir or not isinstance(target_dir, str):
+            return jsonify({'error': 'target_dir is required'}), 400
+        
+        if not media_repo.get_by_id(media_id):
+            return jsonify({'error': 'Media not found'}), 404
+        
+        shard_path = db_manager.relocate_media_shard(media_id, target_dir)
+        return jsonify({'success': True, 'path': shard_path})
+    except (ValueError, FileNotFoundError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error relocating shard for media {media_id}: {e}")
+        return jsonify({'error': str(e)}), 500
 
 # =============================================================================
 # FILE SERVING ROUTES
@@ -1603,12 +2396,69 @@ def serve_audio(filename):
 # HELPER FUNCTIONS (TO BE MOVED TO SEPARATE MODULES)
 # =============================================================================
 
+def encoding_progress_reporter(status_key, label):
+    """Progress callback publishing ffmpeg progress and ETA under a job status key"""
+    def report(fraction, eta, speed):
+        percent = int(fraction * 100)
+        message = f'{label} 인코딩 중... {percent}%'
+        if eta is not None:
+            message += f' (약 {int(eta)}초 남음)'
+        processing_status[status_key] = {
+            'stage': 'encoding',
+            'progress': percent,
+            'message': message,
+            'eta': eta,
+            'speed': speed
+        }
+    return report
+
+def ingesting_response(media):
+    """409 for media whose ingest has not produced its audio track and probe yet"""
+    if media['status'] != 'ingesting':
+        return None
+    return jsonify({
+        'error': 'Media is still being processed',
+        'status': 'ingesting',
+        'statusUrl': f"/api/media/{media['id']}/ingest-status"
+    }), 409
+
+def load_media_probe(media):
+    """Hand the probe and loudness stored at ingest to the ffmpeg processor.
+    
+    Media ingested before probes (or keyframe scans) were stored is probed in the
+    background, never in the request; until then extraction probes on demand and
+    cuts without the keyframe index. Without a loudness measurement clips keep
+    the default volume boost.
+    """
+    media_path = file_manager.get_media_path(media['filename'])
+    if not media_path:
+        return None
+    
+    metadata = json.loads(media['metadata']) if media.get('metadata') else {}
+    loudness = metadata.get('loudness')
+    if loudness:
+        audio_path = file_manager.get_media_path(f"{media['id']}.mp3") if media['fileType'] == 'video' else None
+        for media_file in filter(None, (media_path, audio_path)):
+            ffmpeg_processor.remember_loudness(media_file, loudness)
+    
+    probe = metadata.get('probe')
+    if not probe or 'keyframes' not in probe:
+        ingest_pipeline.probe_in_background(media['id'], media_path, probe)
+    if not probe:
+        return None
+    
+    ffmpeg_processor.remember_probe(media_path, probe)
+    return probe
+
 def create_default_structure_for_video(media_id, audio_filename, template_type):
     """Create default chapter/scene structure - this should be moved to a separate module"""
     
-    # Get audio duration
-    audio_path = file_manager.get_media_path(audio_filename)
-    duration = ffmpeg_processor.get_media_duration(audio_path)
+    # Get audio duration (stored at ingest)
+    media = media_repo.get_by_id(media_id)
+    duration = media.get('duration') if media else None
+    if not duration:
+        audio_path = file_manager.get_media_path(audio_filename)
+        duration = ffmpeg_processor.get_media_duration(audio_path)
     
     if not duration:
         raise Exception("Could not get audio duration")
@@ -1635,49 +2485,39 @@ def create_default_structure_for_video(media_id, audio_filename, template_type):
                 'scenes': 5
             })
     
-    # Create chapters and scenes
+    # Build the chapter/scene tree and store it in one transaction
+    chapters = []
     for order, chapter_data in enumerate(chapters_data):
-        chapter = {
-            'mediaId': media_id,
-            'title': chapter_data['title'],
-            'startTime': chapter_data['start'],
-            'endTime': chapter_data['end'],
-            'order': order + 1
-        }
-        
-        chapter_ids = chapter_repo.create_batch([chapter])
-        chapter_id = chapter_ids[0]
-        
-        # Create scenes for this chapter
         scene_duration = (chapter_data['end'] - chapter_data['start']) / chapter_data['scenes']
         scenes = []
         
         for scene_order in range(chapter_data['scenes']):
-            scene_start = chapter_data['start'] + (scene_duration * scene_order)
-            scene_end = chapter_data['start'] + (scene_duration * (scene_order + 1))
-            
             scenes.append({
-                'chapterId': chapter_id,
                 'title': f"Scene {scene_order + 1}",
-                'startTime': scene_start,
-                'endTime': scene_end,
-                'order': scene_order + 1
+                'startTime': chapter_data['start'] + (scene_duration * scene_order),
+                'endTime': chapter_data['start'] + (scene_duration * (scene_order + 1)),
+                'sentences': []
             })
         
-        scene_ids = scene_repo.create_batch(scenes)
-        
-        # Create sample sentences for first scene only (to demonstrate)
-        if order == 0 and scene_ids:
-            sentences = [{
-                'sceneId': scene_ids[0],
+        # Sample sentence in the first scene only (to demonstrate)
+        if order == 0 and scenes:
+            scenes[0]['sentences'].append({
                 'english': "This is a sample sentence for demonstration.",
                 'korean': "이것은 시연을 위한 샘플 문장입니다.",
                 'startTime': chapter_data['start'],
                 'endTime': chapter_data['start'] + 5.0,
                 'order': 1,
                 'confidence': 0.95
-            }]
-            sentence_repo.create_batch(sentences)
+            })
+        
+        chapters.append({
+            'title': chapter_data['title'],
+            'startTime': chapter_data['start'],
+            'endTime': chapter_data['end'],
+            'scenes': scenes
+        })
+    
+    structure_repo.replace_structure(media_id, chapters)
 
 # =============================================================================
 # CHAPTER EXTRACTION ROUTES
@@ -1688,7 +2528,7 @@ def extract_chapter_mp3(media_id, chapter_id):
     """Extract chapter as MP3"""
     try:
         # Get chapter info
-        chapter = chapter_repo.get_by_id(chapter_id)
+        chapter = chapter_repo.get_by_id(chapter_id, media_id)
         if not chapter:
             return jsonify({'error': 'Chapter not found'}), 404
             
@@ -1696,6 +2536,10 @@ def extract_chapter_mp3(media_id, chapter_id):
         media = media_repo.get_by_id(media_id)
         if not media:
             return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
+        load_media_probe(media)
         
         # Get input file path
         input_path = file_manager.get_media_path(media['filename'])
@@ -1740,7 +2584,7 @@ def extract_chapter_mp4(media_id, chapter_id):
         subtitle_options = request.get_json() or {}
         
         # Get chapter info
-        chapter = chapter_repo.get_by_id(chapter_id)
+        chapter = chapter_repo.get_by_id(chapter_id, media_id)
         if not chapter:
             return jsonify({'error': 'Chapter not found'}), 404
             
@@ -1748,6 +2592,10 @@ def extract_chapter_mp4(media_id, chapter_id):
         media = media_repo.get_by_id(media_id)
         if not media:
             return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
+        load_media_probe(media)
         
         # Get input file path
         input_path = file_manager.get_media_path(media['filename'])
@@ -1764,14 +2612,14 @@ def extract_chapter_mp4(media_id, chapter_id):
         output_path = os.path.join(chapter_dir, output_filename)
         
         # Get all sentences for this chapter
-        sentences = sentence_repo.get_by_chapter_id(chapter_id)
+        sentences = sentence_repo.get_by_chapter_id(chapter_id, media_id)
         if not sentences:
             return jsonify({'error': 'No sentences found for chapter'}), 404
         
-        # Create chapter subtitle file if needed
-        subtitle_file = None
+        # Build chapter subtitle content if needed
+        subtitle_content = None
         if any(subtitle_options.values()):
-            subtitle_file = _create_chapter_subtitle_file(chapter, sentences, subtitle_options)
+            subtitle_content = _build_chapter_subtitle(chapter, sentences, subtitle_options)
         
         try:
             # Extract chapter video
@@ -1779,14 +2627,17 @@ def extract_chapter_mp4(media_id, chapter_id):
             duration = chapter['endTime'] - chapter['startTime']
             is_video = file_manager.is_video_file(media['filename'])
             
-            if is_video:
-                success = ffmpeg_processor.extract_video_segment(
-                    input_path, output_path, start_time, duration, subtitle_file, timeout=900
-                )
-            else:
-                success = ffmpeg_processor.create_video_from_audio(
-                    input_path, output_path, start_time, duration, subtitle_file, timeout=900
-                )
+            # Long encode: clients can follow it at /api/media/<id>/jobs/chapter_<id>/status
+            report_progress = encoding_progress_reporter(f"{media_id}_chapter_{chapter_id}", '챕터')
+            with subtitle_processor.memory_file(subtitle_content) as subtitle_file:
+                if is_video:
+                    success = ffmpeg_processor.extract_video_segment(
+                        input_path, output_path, start_time, duration, subtitle_file, progress_callback=report_progress
+                    )
+                else:
+                    success = ffmpeg_processor.create_video_from_audio(
+                        input_path, output_path, start_time, duration, subtitle_file, progress_callback=report_progress
+                    )
             
             if success:
                 return jsonify({
@@ -1798,12 +2649,7 @@ def extract_chapter_mp4(media_id, chapter_id):
                 return jsonify({'error': 'Failed to extract chapter MP4'}), 500
                 
         finally:
-            # Clean up subtitle file
-            if subtitle_file and os.path.exists(subtitle_file):
-                try:
-                    os.remove(subtitle_file)
-                except Exception as e:
-                    logger.warning(f"Failed to remove subtitle file: {e}")
+            processing_status.pop(f"{media_id}_chapter_{chapter_id}", None)
             
     except Exception as e:
         logger.error(f"Error extracting chapter MP4: {e}")
@@ -1818,7 +2664,7 @@ def extract_scene_mp3(media_id, scene_id):
     """Extract scene as MP3"""
     try:
         # Get scene info
-        scene = scene_repo.get_by_id(scene_id)
+        scene = scene_repo.get_by_id(scene_id, media_id)
         if not scene:
             return jsonify({'error': 'Scene not found'}), 404
             
@@ -1826,6 +2672,10 @@ def extract_scene_mp3(media_id, scene_id):
         media = media_repo.get_by_id(media_id)
         if not media:
             return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
+        load_media_probe(media)
         
         # Get input file path
         input_path = file_manager.get_media_path(media['filename'])
@@ -1870,7 +2720,7 @@ def extract_scene_mp4(media_id, scene_id):
         subtitle_options = request.get_json() or {}
         
         # Get scene info
-        scene = scene_repo.get_by_id(scene_id)
+        scene = scene_repo.get_by_id(scene_id, media_id)
         if not scene:
             return jsonify({'error': 'Scene not found'}), 404
             
@@ -1878,6 +2728,10 @@ def extract_scene_mp4(media_id, scene_id):
         media = media_repo.get_by_id(media_id)
         if not media:
             return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
+        load_media_probe(media)
         
         # Get input file path
         input_path = file_manager.get_media_path(media['filename'])
@@ -1894,14 +2748,14 @@ def extract_scene_mp4(media_id, scene_id):
         output_path = os.path.join(scene_dir, output_filename)
         
         # Get all sentences for this scene
-        sentences = sentence_repo.get_by_scene_id(scene_id)
+        sentences = sentence_repo.get_by_scene_id(scene_id, media_id)
         if not sentences:
             return jsonify({'error': 'No sentences found for scene'}), 404
         
-        # Create scene subtitle file if needed
-        subtitle_file = None
+        # Build scene subtitle content if needed
+        subtitle_content = None
         if any(subtitle_options.values()):
-            subtitle_file = _create_scene_subtitle_file(scene, sentences, subtitle_options)
+            subtitle_content = _build_scene_subtitle(scene, sentences, subtitle_options)
         
         try:
             # Extract scene video
@@ -1909,14 +2763,17 @@ def extract_scene_mp4(media_id, scene_id):
             duration = scene['endTime'] - scene['startTime']
             is_video = file_manager.is_video_file(media['filename'])
             
-            if is_video:
-                success = ffmpeg_processor.extract_video_segment(
-                    input_path, output_path, start_time, duration, subtitle_file, timeout=900
-                )
-            else:
-                success = ffmpeg_processor.create_video_from_audio(
-                    input_path, output_path, start_time, duration, subtitle_file, timeout=900
-                )
+            # Long encode: clients can follow it at /api/media/<id>/jobs/scene_<id>/status
+            report_progress = encoding_progress_reporter(f"{media_id}_scene_{scene_id}", '장면')
+            with subtitle_processor.memory_file(subtitle_content) as subtitle_file:
+                if is_video:
+                    success = ffmpeg_processor.extract_video_segment(
+                        input_path, output_path, start_time, duration, subtitle_file, progress_callback=report_progress
+                    )
+                else:
+                    success = ffmpeg_processor.create_video_from_audio(
+                        input_path, output_path, start_time, duration, subtitle_file, progress_callback=report_progress
+                    )
             
             if success:
                 return jsonify({
@@ -1928,83 +2785,146 @@ def extract_scene_mp4(media_id, scene_id):
                 return jsonify({'error': 'Failed to extract scene MP4'}), 500
                 
         finally:
-            # Clean up subtitle file
-            if subtitle_file and os.path.exists(subtitle_file):
-                try:
-                    os.remove(subtitle_file)
-                except Exception as e:
-                    logger.warning(f"Failed to remove subtitle file: {e}")
+            processing_status.pop(f"{media_id}_scene_{scene_id}", None)
             
     except Exception as e:
         logger.error(f"Error extracting scene MP4: {e}")
         return jsonify({'error': str(e)}), 500
 
 # =============================================================================
-# HELPER FUNCTIONS FOR SUBTITLE CREATION
+# BATCH CHAPTER / SCENE EXPORT
 # =============================================================================
 
-def _create_chapter_subtitle_file(chapter, sentences, subtitle_options):
-    """Create subtitle file for chapter with all sentences"""
+EXPORT_LEVELS = ('chapters', 'scenes')
+
+@app.route('/api/media/<media_id>/export-all-<level>', methods=['POST'])
+def export_all_ranges(media_id, level):
+    """Export every chapter or scene as MP3 or MP4 in a background job"""
     try:
-        # Create temporary subtitle file
-        subtitle_filename = f'temp_chapter_{chapter["id"]}_{uuid.uuid4().hex}.ass'
-        subtitle_path = os.path.join(os.path.dirname(__file__), subtitle_filename)
-        
-        # Build ASS content
-        chapter_duration = chapter['endTime'] - chapter['startTime']
-        chapter_start = chapter['startTime']
+        if level not in EXPORT_LEVELS:
+            return jsonify({'error': f'Unknown level, use one of {list(EXPORT_LEVELS)}'}), 404
         
-        # Create combined text for the chapter
-        english_lines = []
-        korean_lines = []
-        
-        for sentence in sentences:
-            if subtitle_options.get('english') and sentence.get('english'):
-                english_lines.append(sentence['english'])
-            if subtitle_options.get('korean') and sentence.get('korean'):
-                korean_lines.append(sentence['korean'])
+        options = request.get_json() or {}
+        output_format = options.pop('format', 'mp3')
+        if output_format not in ('mp3', 'mp4'):
+            return jsonify({'error': 'format must be mp3 or mp4'}), 400
         
-        english_text = ' '.join(english_lines) if english_lines else None
-        korean_text = ' '.join(korean_lines) if korean_lines else None
+        media = media_repo.get_by_id(media_id)
+        if not media:
+            return jsonify({'error': 'Media not found'}), 404
+        busy = ingesting_response(media)
+        if busy:
+            return busy
         
-        return subtitle_processor.create_ass_subtitle_file(
-            english_text, korean_text, chapter_duration, subtitle_path
+        status_key = f"{media_id}_export_{level}"
+        processing_status[status_key] = {
+            'stage': 'starting',
+            'progress': 0,
+            'message': '일괄 내보내기를 시작합니다...'
+        }
+        thread = threading.Thread(
+            target=export_all_ranges_background,
+            args=(media_id, level, output_format, options)
         )
+        thread.daemon = True
+        thread.start()
         
+        return jsonify({
+            'success': True,
+            'message': '일괄 내보내기가 시작되었습니다.',
+            'status_url': f'/api/media/{media_id}/jobs/export_{level}/status'
+        })
+    
     except Exception as e:
-        logger.error(f"Error creating chapter subtitle file: {e}")
-        return None
+        logger.error(f"Error starting {level} export for media {media_id}: {e}")
+        return jsonify({'error': str(e)}), 500
 
-def _create_scene_subtitle_file(scene, sentences, subtitle_options):
-    """Create subtitle file for scene with all sentences"""
+def export_all_ranges_background(media_id, level, output_format, subtitle_options):
+    """Background export of all chapters or scenes, one ffmpeg run per split pass"""
+    status_key = f"{media_id}_export_{level}"
+    label = '챕터' if level == 'chapters' else '장면'
     try:
-        # Create temporary subtitle file
-        subtitle_filename = f'temp_scene_{scene["id"]}_{uuid.uuid4().hex}.ass'
-        subtitle_path = os.path.join(os.path.dirname(__file__), subtitle_filename)
+        media = media_repo.get_by_id(media_id)
+        if not media:
+            raise Exception("Media not found")
+        load_media_probe(media)
+        input_path = file_manager.get_media_path(media['filename'])
+        if not input_path:
+            raise Exception("Media file not found")
         
-        # Build ASS content
-        scene_duration = scene['endTime'] - scene['startTime']
-        scene_start = scene['startTime']
+        # Chapters carry the sentences of all their scenes
+        ranges = []
+        for chapter in structure_repo.get_structure(media_id):
+            if level == 'chapters':
+                ranges.append(dict(chapter, sentences=[s for scene in chapter['scenes'] for s in scene['sentences']]))
+            else:
+                ranges.extend(dict(scene, chapterOrder=chapter['order']) for scene in chapter['scenes'])
+        ranges = [r for r in ranges if r['endTime'] > r['startTime']]
+        if not ranges:
+            raise Exception(f"No {level} to export")
         
-        # Create combined text for the scene
-        english_lines = []
-        korean_lines = []
+        output_dir = file_manager.create_output_directory(media_id, media['filename'])
+        export_dir = file_manager.create_extraction_directory(
+            output_dir, level, subtitle_options if output_format == 'mp4' else None
+        )
+        clean_name = file_manager.get_clean_media_name(media['filename'])
+        # Scene order restarts in every chapter
+        output_filenames = [
+            f"{clean_name}_chapter_{r['order']}.{output_format}" if level == 'chapters'
+            else f"{clean_name}_chapter_{r['chapterOrder']}_scene_{r['order']}.{output_format}"
+            for r in ranges
+        ]
         
-        for sentence in sentences:
-            if subtitle_options.get('english') and sentence.get('english'):
-                english_lines.append(sentence['english'])
-            if subtitle_options.get('korean') and sentence.get('korean'):
-                korean_lines.append(sentence['korean'])
+        results = media_extractor.export_ranges(
+            input_path, ranges, [os.path.join(export_dir, name) for name in output_filenames],
+            subtitle_options, is_video_file=file_manager.is_video_file(media['filename']),
+            as_video=output_format == 'mp4',
+            progress_callback=encoding_progress_reporter(status_key, label)
+        )
         
-        english_text = ' '.join(english_lines) if english_lines else None
-        korean_text = ' '.join(korean_lines) if korean_lines else None
+        exported = [name for name, success in zip(output_filenames, results) if success]
+        if not exported:
+            raise Exception("FFmpeg processing failed")
+        processing_status[status_key] = {
+            'stage': 'completed',
+            'progress': 100,
+            'message': f'{label} {len(exported)}/{len(ranges)}개 내보내기가 완료되었습니다.',
+            'files': [{'filename': name, 'download_url': f'/api/download/{name}'} for name in exported]
+        }
+        logger.info(f"Exported {len(exported)}/{len(ranges)} {level} of media {media_id} as {output_format}")
+    
+    except Exception as e:
+        logger.error(f"Export of all {level} failed for media {media_id}: {e}")
+        processing_status[status_key] = {
+            'stage': 'error',
+            'progress': 0,
+            'message': f'내보내기 중 오류가 발생했습니다: {str(e)}'
+        }
+
+# =============================================================================
+# HELPER FUNCTIONS FOR SUBTITLE CREATION
+# =============================================================================
+
+def _build_chapter_subtitle(chapter, sentences, subtitle_options):
+    """Subtitle content for chapter with one timed event per sentence"""
+    try:
+        return media_extractor.build_timed_subtitle(
+            sentences, chapter['startTime'], chapter['endTime'], subtitle_options
+        )
         
-        return subtitle_processor.create_ass_subtitle_file(
-            english_text, korean_text, scene_duration, subtitle_path
+    except Exception as e:
+        logger.error(f"Error creating chapter subtitle: {e}")
+        return None
+
+def _build_scene_subtitle(scene, sentences, subtitle_options):
+    """Subtitle content for scene with one timed event per sentence"""
+    try:
+        return media_extractor.build_timed_subtitle(
+            sentences, scene['startTime'], scene['endTime'], subtitle_options
         )
         
     except Exception as e:
-        logger.error(f"Error creating scene subtitle file: {e}")
+        logger.error(f"Error creating scene subtitle: {e}")
         return None
 
 
@@ -2047,4 +2967,9 @@ def get_words_stats():
         logger.error(f"Error in auto vocabulary analysis: {e}")
 
 if __name__ == '__main__':
+    # The debug reloader runs this block in a watcher process too; resume only in the server
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        resume_media_purges()
+        resume_media_ingests()
+        maintenance_scheduler.start()
     app.run(debug=True, host='0.0.0.0', port=8000)
\ No newline at end of file
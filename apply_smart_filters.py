@@ -1,41 +1,28 @@
 #!/usr/bin/env python3
-import sqlite3
 import sys
+from database import sentence_repo, structure_repo
 from vad_filters import apply_time_filters, apply_content_filters
 
 def apply_smart_filters_to_media(media_id):
     """미디어에 스마트 필터 적용"""
     
-    # 기존 데이터 로드
-    conn = sqlite3.connect('dev.db')
-    cursor = conn.cursor()
-    
     print(f"미디어 {media_id}에 스마트 필터 적용 중...")
     
     # 기존 문장들 가져오기
-    cursor.execute('''
-        SELECT s.id, s.english, s.korean, s.startTime, s.endTime, s.`order`, s.sceneId
-        FROM Sentence s
-        JOIN Scene sc ON s.sceneId = sc.id
-        JOIN Chapter c ON sc.chapterId = c.id
-        WHERE c.mediaId = ?
-        ORDER BY s.`order`
-    ''', (media_id,))
-    
-    original_sentences = cursor.fetchall()
+    original_sentences = sentence_repo.get_by_media_id(media_id)
     print(f"원본 문장 수: {len(original_sentences)}개")
     
     # 필터 적용을 위한 형식 변환
     sentences_for_filter = []
     for row in original_sentences:
         sentences_for_filter.append({
-            'id': row[0],
-            'english': row[1],
-            'korean': row[2] or '',
-            'start_time': row[3],
-            'end_time': row[4],
-            'order': row[5],
-            'scene_id': row[6]
+            'id': row['id'],
+            'english': row['english'],
+            'korean': row['korean'] or '',
+            'start_time': row['startTime'],
+            'end_time': row['endTime'],
+            'order': row['order'],
+            'scene_id': row['sceneId']
         })
     
     # 1단계: 시간 기반 필터
@@ -51,16 +38,11 @@ def apply_smart_filters_to_media(media_id):
     # 3단계: 길이별 챕터 재구성
     print("3단계: 길이별 챕터 재구성...")
     
-    # 기존 챕터/씬/문장 삭제
-    cursor.execute("DELETE FROM Sentence WHERE sceneId IN (SELECT id FROM Scene WHERE chapterId IN (SELECT id FROM Chapter WHERE mediaId = ?))", (media_id,))
-    cursor.execute("DELETE FROM Scene WHERE chapterId IN (SELECT id FROM Chapter WHERE mediaId = ?)", (media_id,))
-    cursor.execute("DELETE FROM Chapter WHERE mediaId = ?", (media_id,))
-    
     # 4개 챕터로 고정 분할
     total_sentences = len(final_filtered)
     chapter_size = total_sentences // 4  # 전체를 4등분
     remainder = total_sentences % 4  # 나머지
-    chapters_created = 0
+    chapters = []
     
     current_index = 0
     for chapter_num in range(4):
@@ -73,53 +55,33 @@ def apply_smart_filters_to_media(media_id):
         
         if not chapter_sentences:
             continue
-            
-        chapters_created += 1
-        chapter_start = chapter_sentences[0]['start_time']
-        chapter_end = chapter_sentences[-1]['end_time']
-        chapter_title = f"Chapter {chapters_created}"
-        
-        # 챕터 생성
-        cursor.execute(
-            "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (media_id, chapter_title, chapter_start, chapter_end, chapters_created)
-        )
-        chapter_id = cursor.lastrowid
         
         # 각 챕터를 적절한 수의 씬으로 세분화
         sentences_per_scene = max(10, len(chapter_sentences) // 5)  # 최소 10문장, 최대 5개 씬
-        scenes_in_chapter = 0
+        scenes = []
         
         for j in range(0, len(chapter_sentences), sentences_per_scene):
             scene_sentences = chapter_sentences[j:j+sentences_per_scene]
             if not scene_sentences:
                 continue
-                
-            scenes_in_chapter += 1
-            scene_start = scene_sentences[0]['start_time']
-            scene_end = scene_sentences[-1]['end_time']
-            scene_title = f"Scene {scenes_in_chapter}"
-            
-            # 씬 생성
-            cursor.execute(
-                "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                (chapter_id, scene_title, scene_start, scene_end, scenes_in_chapter)
-            )
-            scene_id = cursor.lastrowid
             
-            # 문장들 추가
-            for k, sentence in enumerate(scene_sentences):
-                cursor.execute(
-                    """INSERT INTO Sentence 
-                    (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (scene_id, sentence['english'], sentence['korean'], 
-                     sentence['start_time'], sentence['end_time'], 0, sentence['order'])
-                )
+            scenes.append({
+                'title': f"Scene {len(scenes) + 1}",
+                'start_time': scene_sentences[0]['start_time'],
+                'end_time': scene_sentences[-1]['end_time'],
+                'sentences': scene_sentences
+            })
+        
+        chapters.append({
+            'title': f"Chapter {len(chapters) + 1}",
+            'start_time': chapter_sentences[0]['start_time'],
+            'end_time': chapter_sentences[-1]['end_time'],
+            'scenes': scenes
+        })
     
-    # 커밋
-    conn.commit()
-    conn.close()
+    # 기존 챕터/씬/문장을 한 트랜잭션으로 교체
+    structure_repo.replace_structure(media_id, chapters)
+    chapters_created = len(chapters)
     
     print(f"✅ 완료: {chapters_created}개 챕터, {len(final_filtered)}개 문장")
     return {
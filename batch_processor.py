@@ -1,9 +1,8 @@
 from faster_whisper import WhisperModel
 from deep_translator import GoogleTranslator
-import sqlite3
 import re
-from pydub import AudioSegment
-from pydub.silence import detect_silence
+from database import media_repo, structure_repo
+from pcm_cache import pcm_cache
 
 # Whisper 모델 초기화
 model = None
@@ -127,80 +126,32 @@ def process_audio_batch(filepath, media_id, model_size="medium", template="auto"
 def update_processing_status(media_id, status, current_sentence=''):
     """처리 상태 업데이트"""
     try:
-        conn = sqlite3.connect('dev.db')
-        cursor = conn.cursor()
-        
-        # 먼저 테이블 구조 확인
-        cursor.execute("PRAGMA table_info(Media)")
-        columns = [col[1] for col in cursor.fetchall()]
-        
-        if 'status' in columns and 'current_sentence' in columns:
-            cursor.execute(
-                "UPDATE Media SET status = ?, current_sentence = ? WHERE id = ?",
-                (status, current_sentence, media_id)
-            )
-        else:
-            print(f"Missing columns in Media table. Available: {columns}")
-            
-        conn.commit()
-        conn.close()
+        media_repo.update_status(media_id, status)
+        if current_sentence:
+            print(f"[{media_id}] {current_sentence}")
     except Exception as e:
         print(f"Status update error: {e}")
-        try:
-            conn.close()
-        except:
-            pass
 
 def save_to_database(media_id, duration, sentences):
     """배치로 DB에 저장"""
-    conn = sqlite3.connect('dev.db')
-    cursor = conn.cursor()
+    # 기본 챕터 (전체를 하나의 챕터로), 각 문장마다 개별 씬
+    scenes = [{
+        'title': f"문장 {i+1}",
+        'start_time': s['start_time'],
+        'end_time': s['end_time'],
+        'sentences': [s]
+    } for i, s in enumerate(sentences)]
     
-    try:
-        # 미디어 정보 업데이트
-        cursor.execute(
-            "UPDATE Media SET duration = ?, status = ? WHERE id = ?",
-            (duration, 'organizing', media_id)
-        )
-        
-        # 기본 챕터 생성 (전체를 하나의 챕터로)
-        cursor.execute(
-            "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (media_id, "전체", 0, duration, 1)
-        )
-        chapter_id = cursor.lastrowid
-        
-        # 각 문장마다 개별 씬 생성
-        sentence_data = []
-        for i, s in enumerate(sentences):
-            # 각 문장을 위한 씬 생성
-            scene_title = f"문장 {i+1}"
-            cursor.execute(
-                "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                (chapter_id, scene_title, s['start_time'], s['end_time'], i+1)
-            )
-            scene_id = cursor.lastrowid
-            
-            # 문장 데이터 추가
-            sentence_data.append((scene_id, s['english'], s['korean'], s['start_time'], s['end_time'], 0, s['order']))
-        
-        cursor.executemany(
-            """INSERT INTO Sentence 
-            (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-            VALUES (?, ?, ?, ?, ?, ?, ?)""",
-            sentence_data
-        )
-        
-        # 한번에 커밋
-        conn.commit()
-        print(f"Database batch save completed: {len(sentences)} sentences")
-        
-    except Exception as e:
-        conn.rollback()
-        print(f"Database save error: {e}")
-        raise e
-    finally:
-        conn.close()
+    # 구조를 한 트랜잭션으로 저장한 뒤에만 미디어 정보 업데이트
+    structure_repo.replace_structure(media_id, [{
+        'title': "전체",
+        'start_time': 0,
+        'end_time': duration,
+        'scenes': scenes
+    }])
+    media_repo.update_duration(media_id, duration)
+    media_repo.update_status(media_id, 'organizing')
+    print(f"Database batch save completed: {len(sentences)} sentences")
 
 def split_into_sentences(text):
     """텍스트를 문장 단위로 분리"""
@@ -226,11 +177,12 @@ def split_into_sentences(text):
 def detect_silence_breaks(filepath, min_silence_len=2000, silence_thresh=-40):
     """무음 구간을 감지하여 챕터/씬 분할점을 찾는다"""
     try:
-        audio = AudioSegment.from_file(filepath)
+        # 디코딩은 PCM 캐시에서 한 번만 (이후 memmap으로 읽음)
+        duration = pcm_cache.duration(filepath)
         
         # 무음 구간 감지 (2초 이상, -40dB 이하)
-        silence_ranges = detect_silence(
-            audio, 
+        silence_ranges = pcm_cache.detect_silence(
+            filepath,
             min_silence_len=min_silence_len,  # 최소 2초
             silence_thresh=silence_thresh     # -40dB 이하
         )
@@ -242,7 +194,7 @@ def detect_silence_breaks(filepath, min_silence_len=2000, silence_thresh=-40):
             break_points.append(mid_point)
         
         # 시작과 끝 추가
-        break_points = [0] + break_points + [len(audio) / 1000.0]
+        break_points = [0] + break_points + [duration]
         break_points = sorted(list(set(break_points)))  # 중복 제거 및 정렬
         
         print(f"Detected {len(break_points)-1} segments from silence analysis")
@@ -252,8 +204,7 @@ def detect_silence_breaks(filepath, min_silence_len=2000, silence_thresh=-40):
         print(f"Silence detection error: {e}")
         # 에러시 기본값 반환 (시간 기반 분할)
         try:
-            audio = AudioSegment.from_file(filepath)
-            duration = len(audio) / 1000.0
+            duration = pcm_cache.duration(filepath)
             if duration > 600:  # 10분 이상
                 return [0, duration/4, duration/2, duration*3/4, duration]
             elif duration > 300:  # 5분 이상
@@ -295,101 +246,72 @@ def group_sentences_by_breaks(sentences, break_points):
 def reorganize_chapters_scenes(media_id, filepath, sentences, template="auto"):
     """템플릿 기반 챕터/씬 재구성"""
     try:
-        conn = sqlite3.connect('dev.db')
-        cursor = conn.cursor()
-        
-        # 기존 챕터/씬/문장 삭제
-        cursor.execute("DELETE FROM Sentence WHERE sceneId IN (SELECT id FROM Scene WHERE chapterId IN (SELECT id FROM Chapter WHERE mediaId = ?))", (media_id,))
-        cursor.execute("DELETE FROM Scene WHERE chapterId IN (SELECT id FROM Chapter WHERE mediaId = ?)", (media_id,))
-        cursor.execute("DELETE FROM Chapter WHERE mediaId = ?", (media_id,))
-        
-        # 템플릿별 처리
+        # 템플릿별로 메모리에서 전체 구조를 만든 뒤 한 트랜잭션으로 교체
         if template == "toeic_lc":
             print("Using TOEIC LC template for organization")
-            apply_toeic_lc_template(cursor, media_id, sentences)
+            chapters = apply_toeic_lc_template(media_id, sentences)
         elif template == "toeic_rc":
             print("Using TOEIC RC template for organization")
-            apply_toeic_rc_template(cursor, media_id, sentences)
+            chapters = apply_toeic_rc_template(media_id, sentences)
         elif template == "general":
             print("Using general lecture template for organization")
-            apply_general_template(cursor, media_id, sentences)
+            chapters = apply_general_template(media_id, sentences)
         elif template == "conversation":
             print("Using conversation template for organization")
-            apply_conversation_template(cursor, media_id, sentences)
+            chapters = apply_conversation_template(media_id, sentences)
         elif template == "audiobook":
             print("Using audiobook template for organization")
-            apply_audiobook_template(cursor, media_id, sentences)
+            chapters = apply_audiobook_template(media_id, sentences)
         elif template == "manual":
             print("Using manual setup template for organization")
-            apply_manual_template(cursor, media_id, sentences)
+            chapters = apply_manual_template(media_id, sentences)
         else:  # auto or any unknown template
             print("Using automatic silence-based organization")
-            apply_auto_template(cursor, media_id, filepath, sentences)
+            chapters = apply_auto_template(media_id, filepath, sentences)
         
-        conn.commit()
-        conn.close()
+        structure_repo.replace_structure(media_id, chapters)
         
         print(f"Chapter/Scene reorganization completed using {template} template")
         
     except Exception as e:
+        # 교체는 원자적이므로 실패 시 기존 구조가 그대로 남는다
         print(f"Reorganization error: {e}")
-        # 에러시 기본 구조로 복원
-        try:
-            conn.rollback()
-            conn.close()
-        except:
-            pass
 
-def apply_toeic_lc_template(cursor, media_id, sentences):
+def split_into_scenes(sentences, scene_size, title_format):
+    """문장들을 scene_size개씩 씬으로 분할"""
+    scenes = []
+    for scene_idx in range(0, len(sentences), scene_size):
+        scene_sentences = sentences[scene_idx:scene_idx + scene_size]
+        scenes.append({
+            'title': title_format.format(scene_idx // scene_size + 1),
+            'start_time': scene_sentences[0]['start_time'],
+            'end_time': scene_sentences[-1]['end_time'],
+            'sentences': scene_sentences
+        })
+    return scenes
+
+def apply_toeic_lc_template(media_id, sentences):
     """TOEIC LC 템플릿 적용 - Part 1-4 구조"""
+    total_duration = sentences[-1]['end_time'] if sentences else 60
     try:
-        # 먼저 모든 문장을 DB에 저장
-        conn = sqlite3.connect('dev.db')
-        
-        # 단일 챕터/씬으로 일단 저장
-        cursor.execute(
-            "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (media_id, "임시", 0, sentences[-1]['end_time'] if sentences else 60, 1)
-        )
-        temp_chapter_id = cursor.lastrowid
-        
-        cursor.execute(
-            "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (temp_chapter_id, "임시", 0, sentences[-1]['end_time'] if sentences else 60, 1)
-        )
-        temp_scene_id = cursor.lastrowid
-        
-        # 모든 문장 저장
-        for sentence in sentences:
-            cursor.execute(
-                """INSERT INTO Sentence 
-                (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (temp_scene_id, sentence['english'], sentence['korean'], 
-                 sentence['start_time'], sentence['end_time'], 0, sentence['order'])
-            )
-        
-        conn.commit()
-        conn.close()
-        
-        # TOEIC 템플릿 적용
-        from toeic_smart_template import apply_toeic_smart_template
-        apply_toeic_smart_template(media_id)
+        # 단일 임시 챕터에 모든 문장을 넣고 스마트 템플릿으로 씬 분할
+        from toeic_smart_template import build_toeic_smart_structure
+        chapters = build_toeic_smart_structure([{
+            'title': "임시",
+            'start_time': 0,
+            'end_time': total_duration,
+            'order': 1,
+            'sentences': sentences
+        }])
         print("TOEIC LC template applied successfully")
+        return chapters
         
     except Exception as e:
         print(f"TOEIC template error: {e}")
         print("Using general template as fallback")
-        # 에러 시 임시 데이터 삭제하고 일반 템플릿 적용
-        try:
-            cursor.execute("DELETE FROM Sentence WHERE sceneId IN (SELECT id FROM Scene WHERE chapterId IN (SELECT id FROM Chapter WHERE mediaId = ?))", (media_id,))
-            cursor.execute("DELETE FROM Scene WHERE chapterId IN (SELECT id FROM Chapter WHERE mediaId = ?)", (media_id,))
-            cursor.execute("DELETE FROM Chapter WHERE mediaId = ?", (media_id,))
-            apply_general_template(cursor, media_id, sentences)
-        except:
-            pass
+        return apply_general_template(media_id, sentences)
 
-def apply_toeic_rc_template(cursor, media_id, sentences):
+def apply_toeic_rc_template(media_id, sentences):
     """TOEIC RC 템플릿 적용 - Part 5-7 구조"""
     # TOEIC RC는 일반적으로 Part 5 (문법), Part 6 (빈칸), Part 7 (독해)로 구성
     # 시간 기반으로 3개 파트로 분할
@@ -397,46 +319,26 @@ def apply_toeic_rc_template(cursor, media_id, sentences):
     part_duration = total_duration / 3
     
     parts = ["Part 5 - Grammar", "Part 6 - Text Completion", "Part 7 - Reading Comprehension"]
+    chapters = []
     
     for i, part_title in enumerate(parts):
         start_time = i * part_duration
         end_time = (i + 1) * part_duration
         
-        cursor.execute(
-            "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (media_id, part_title, start_time, end_time, i + 1)
-        )
-        chapter_id = cursor.lastrowid
-        
         # 해당 구간의 문장들 찾기
         part_sentences = [s for s in sentences if start_time <= s['start_time'] < end_time]
         
-        if part_sentences:
+        chapters.append({
+            'title': part_title,
+            'start_time': start_time,
+            'end_time': end_time,
             # 10문장씩 씬으로 분할
-            scene_size = 10
-            for scene_idx in range(0, len(part_sentences), scene_size):
-                scene_sentences = part_sentences[scene_idx:scene_idx + scene_size]
-                scene_title = f"Section {scene_idx // scene_size + 1}"
-                
-                scene_start = scene_sentences[0]['start_time']
-                scene_end = scene_sentences[-1]['end_time']
-                
-                cursor.execute(
-                    "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                    (chapter_id, scene_title, scene_start, scene_end, scene_idx // scene_size + 1)
-                )
-                scene_id = cursor.lastrowid
-                
-                for sentence in scene_sentences:
-                    cursor.execute(
-                        """INSERT INTO Sentence 
-                        (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                        (scene_id, sentence['english'], sentence['korean'], 
-                         sentence['start_time'], sentence['end_time'], 0, sentence['order'])
-                    )
+            'scenes': split_into_scenes(part_sentences, 10, "Section {}")
+        })
+    
+    return chapters
 
-def apply_general_template(cursor, media_id, sentences):
+def apply_general_template(media_id, sentences):
     """일반 강의 템플릿 - 시간 기반 챕터 분할"""
     total_duration = sentences[-1]['end_time'] if sentences else 60
     
@@ -449,140 +351,80 @@ def apply_general_template(cursor, media_id, sentences):
         chapter_count = 2
     
     chapter_duration = total_duration / chapter_count
+    chapters = []
     
     for i in range(chapter_count):
         start_time = i * chapter_duration
         end_time = (i + 1) * chapter_duration
         
-        cursor.execute(
-            "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (media_id, f"강의 {i + 1}", start_time, end_time, i + 1)
-        )
-        chapter_id = cursor.lastrowid
-        
         # 해당 구간의 문장들
         chapter_sentences = [s for s in sentences if start_time <= s['start_time'] < end_time]
         
-        if chapter_sentences:
+        chapters.append({
+            'title': f"강의 {i + 1}",
+            'start_time': start_time,
+            'end_time': end_time,
             # 15문장씩 씬으로 분할
-            scene_size = 15
-            for scene_idx in range(0, len(chapter_sentences), scene_size):
-                scene_sentences = chapter_sentences[scene_idx:scene_idx + scene_size]
-                scene_title = f"섹션 {scene_idx // scene_size + 1}"
-                
-                scene_start = scene_sentences[0]['start_time']
-                scene_end = scene_sentences[-1]['end_time']
-                
-                cursor.execute(
-                    "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                    (chapter_id, scene_title, scene_start, scene_end, scene_idx // scene_size + 1)
-                )
-                scene_id = cursor.lastrowid
-                
-                for sentence in scene_sentences:
-                    cursor.execute(
-                        """INSERT INTO Sentence 
-                        (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                        (scene_id, sentence['english'], sentence['korean'], 
-                         sentence['start_time'], sentence['end_time'], 0, sentence['order'])
-                    )
+            'scenes': split_into_scenes(chapter_sentences, 15, "섹션 {}")
+        })
+    
+    return chapters
 
-def apply_conversation_template(cursor, media_id, sentences):
+def apply_conversation_template(media_id, sentences):
     """대화/인터뷰 템플릿 - 화자 변경 기반"""
     # 간단한 구현: 시간 기반으로 대화 턴 추정
     total_duration = sentences[-1]['end_time'] if sentences else 60
     segment_duration = 300  # 5분 세그먼트
     
     segment_count = max(1, int(total_duration / segment_duration))
+    chapters = []
     
     for i in range(segment_count):
         start_time = i * segment_duration
         end_time = min((i + 1) * segment_duration, total_duration)
         
-        cursor.execute(
-            "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (media_id, f"대화 세그먼트 {i + 1}", start_time, end_time, i + 1)
-        )
-        chapter_id = cursor.lastrowid
-        
         # 해당 구간의 문장들
         segment_sentences = [s for s in sentences if start_time <= s['start_time'] < end_time]
         
-        if segment_sentences:
+        chapters.append({
+            'title': f"대화 세그먼트 {i + 1}",
+            'start_time': start_time,
+            'end_time': end_time,
             # 8문장씩 씬으로 분할 (대화 턴)
-            scene_size = 8
-            for scene_idx in range(0, len(segment_sentences), scene_size):
-                scene_sentences = segment_sentences[scene_idx:scene_idx + scene_size]
-                scene_title = f"턴 {scene_idx // scene_size + 1}"
-                
-                scene_start = scene_sentences[0]['start_time']
-                scene_end = scene_sentences[-1]['end_time']
-                
-                cursor.execute(
-                    "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                    (chapter_id, scene_title, scene_start, scene_end, scene_idx // scene_size + 1)
-                )
-                scene_id = cursor.lastrowid
-                
-                for sentence in scene_sentences:
-                    cursor.execute(
-                        """INSERT INTO Sentence 
-                        (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                        (scene_id, sentence['english'], sentence['korean'], 
-                         sentence['start_time'], sentence['end_time'], 0, sentence['order'])
-                    )
+            'scenes': split_into_scenes(segment_sentences, 8, "턴 {}")
+        })
+    
+    return chapters
 
-def apply_audiobook_template(cursor, media_id, sentences):
+def apply_audiobook_template(media_id, sentences):
     """오디오북 템플릿 - 챕터 기반"""
     total_duration = sentences[-1]['end_time'] if sentences else 60
     chapter_duration = 900  # 15분 챕터
     
     chapter_count = max(1, int(total_duration / chapter_duration))
+    chapters = []
     
     for i in range(chapter_count):
         start_time = i * chapter_duration
         end_time = min((i + 1) * chapter_duration, total_duration)
         
-        cursor.execute(
-            "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (media_id, f"챕터 {i + 1}", start_time, end_time, i + 1)
-        )
-        chapter_id = cursor.lastrowid
-        
         # 해당 구간의 문장들
         chapter_sentences = [s for s in sentences if start_time <= s['start_time'] < end_time]
         
-        if chapter_sentences:
+        chapters.append({
+            'title': f"챕터 {i + 1}",
+            'start_time': start_time,
+            'end_time': end_time,
             # 20문장씩 씬으로 분할
-            scene_size = 20
-            for scene_idx in range(0, len(chapter_sentences), scene_size):
-                scene_sentences = chapter_sentences[scene_idx:scene_idx + scene_size]
-                scene_title = f"섹션 {scene_idx // scene_size + 1}"
-                
-                scene_start = scene_sentences[0]['start_time']
-                scene_end = scene_sentences[-1]['end_time']
-                
-                cursor.execute(
-                    "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                    (chapter_id, scene_title, scene_start, scene_end, scene_idx // scene_size + 1)
-                )
-                scene_id = cursor.lastrowid
-                
-                for sentence in scene_sentences:
-                    cursor.execute(
-                        """INSERT INTO Sentence 
-                        (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                        (scene_id, sentence['english'], sentence['korean'], 
-                         sentence['start_time'], sentence['end_time'], 0, sentence['order'])
-                    )
+            'scenes': split_into_scenes(chapter_sentences, 20, "섹션 {}")
+        })
+    
+    return chapters
 
-def apply_manual_template(cursor, media_id, sentences):
+def apply_manual_template(media_id, sentences):
     """수동 설정 템플릿 - 시간 간격 기반 자동 챕터/씬 분할"""
     if not sentences:
-        return
+        return []
     
     # 시간 간격 분석하여 챕터/씬 분할점 찾기
     chapter_breaks = []  # 큰 간격 (10초 이상)
@@ -611,50 +453,37 @@ def apply_manual_template(cursor, media_id, sentences):
             })
         chapter_start = break_idx
     
-    # 챕터와 씬 생성
+    # 챕터와 씬 구성
+    chapters = []
     for c_idx, chapter_group in enumerate(chapter_groups):
-        cursor.execute(
-            "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (media_id, f"Chapter {c_idx + 1}", chapter_group['start'], chapter_group['end'], c_idx + 1)
-        )
-        chapter_id = cursor.lastrowid
-        
         # 씬 단위로 문장 그룹화
-        scene_groups = []
+        scenes = []
         scene_start = 0
         
         for break_idx in chapter_group['scene_breaks'] + [len(chapter_group['sentences'])]:
             scene_sentences = chapter_group['sentences'][scene_start:break_idx]
             if scene_sentences:
-                scene_groups.append(scene_sentences)
+                scenes.append({
+                    'title': f"Scene {len(scenes) + 1}",
+                    'start_time': scene_sentences[0]['start_time'],
+                    'end_time': scene_sentences[-1]['end_time'],
+                    'sentences': scene_sentences
+                })
             scene_start = break_idx
         
-        # 씬 생성 및 문장 삽입
-        for s_idx, scene_sentences in enumerate(scene_groups):
-            cursor.execute(
-                "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                (chapter_id, f"Scene {s_idx + 1}", 
-                 scene_sentences[0]['start_time'], 
-                 scene_sentences[-1]['end_time'], 
-                 s_idx + 1)
-            )
-            scene_id = cursor.lastrowid
-            
-            # 문장 삽입
-            for sentence in scene_sentences:
-                cursor.execute(
-                    """INSERT INTO Sentence 
-                    (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (scene_id, sentence['english'], sentence['korean'], 
-                     sentence['start_time'], sentence['end_time'], 0, sentence['order'])
-                )
+        chapters.append({
+            'title': f"Chapter {c_idx + 1}",
+            'start_time': chapter_group['start'],
+            'end_time': chapter_group['end'],
+            'scenes': scenes
+        })
     
     print(f"Created {len(chapter_groups)} chapters based on time gaps (10s+ breaks)")
     total_scenes = sum(len(cg['scene_breaks']) + 1 for cg in chapter_groups)
     print(f"Created {total_scenes} scenes based on time gaps (3s+ breaks)")
+    return chapters
 
-def apply_auto_template(cursor, media_id, filepath, sentences):
+def apply_auto_template(media_id, filepath, sentences):
     """자동 감지 템플릿 - 무음 구간 기반"""
     # 기존 무음 구간 분석 로직 사용
     break_points = detect_silence_breaks(filepath)
@@ -664,80 +493,39 @@ def apply_auto_template(cursor, media_id, filepath, sentences):
         print("No groups found, using single chapter/scene")
         # 기본 단일 챕터/씬으로 복원
         duration = sentences[-1]['end_time'] if sentences else 60
-        cursor.execute(
-            "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (media_id, "전체", 0, duration, 1)
-        )
-        chapter_id = cursor.lastrowid
-        
-        cursor.execute(
-            "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (chapter_id, "전체", 0, duration, 1)
-        )
-        scene_id = cursor.lastrowid
-        
-        # 모든 문장을 단일 씬에 추가
-        for sentence in sentences:
-            cursor.execute(
-                """INSERT INTO Sentence 
-                (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (scene_id, sentence['english'], sentence['korean'], 
-                 sentence['start_time'], sentence['end_time'], 0, sentence['order'])
-            )
-    else:
-        # 그룹 기반 챕터/씬 생성
-        for chapter_idx, group in enumerate(groups):
-            chapter_title = f"Chapter {chapter_idx + 1}"
-            
-            cursor.execute(
-                "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                (media_id, chapter_title, group['start_time'], group['end_time'], chapter_idx + 1)
-            )
-            chapter_id = cursor.lastrowid
-            
-            # 큰 그룹은 씬으로 세분화 (문장 20개 이상)
-            if len(group['sentences']) > 20:
-                # 10문장씩 씬으로 분할
-                scene_size = 10
-                for scene_idx in range(0, len(group['sentences']), scene_size):
-                    scene_sentences = group['sentences'][scene_idx:scene_idx + scene_size]
-                    scene_title = f"Scene {scene_idx // scene_size + 1}"
-                    
-                    scene_start = scene_sentences[0]['start_time']
-                    scene_end = scene_sentences[-1]['end_time']
-                    
-                    cursor.execute(
-                        "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                        (chapter_id, scene_title, scene_start, scene_end, scene_idx // scene_size + 1)
-                    )
-                    scene_id = cursor.lastrowid
-                    
-                    # 씬에 문장들 추가
-                    for sentence in scene_sentences:
-                        cursor.execute(
-                            """INSERT INTO Sentence 
-                            (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                            VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                            (scene_id, sentence['english'], sentence['korean'], 
-                             sentence['start_time'], sentence['end_time'], 0, sentence['order'])
-                        )
-            else:
-                # 작은 그룹은 단일 씬으로
-                scene_title = "Scene 1"
-                
-                cursor.execute(
-                    "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                    (chapter_id, scene_title, group['start_time'], group['end_time'], 1)
-                )
-                scene_id = cursor.lastrowid
-                
-                # 모든 문장을 씬에 추가
-                for sentence in group['sentences']:
-                    cursor.execute(
-                        """INSERT INTO Sentence 
-                        (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                        (scene_id, sentence['english'], sentence['korean'], 
-                         sentence['start_time'], sentence['end_time'], 0, sentence['order'])
-                    )
\ No newline at end of file
+        return [{
+            'title': "전체",
+            'start_time': 0,
+            'end_time': duration,
+            'scenes': [{
+                'title': "전체",
+                'start_time': 0,
+                'end_time': duration,
+                'sentences': sentences
+            }]
+        }]
+    
+    # 그룹 기반 챕터/씬 생성
+    chapters = []
+    for chapter_idx, group in enumerate(groups):
+        # 큰 그룹은 씬으로 세분화 (문장 20개 이상)
+        if len(group['sentences']) > 20:
+            # 10문장씩 씬으로 분할
+            scenes = split_into_scenes(group['sentences'], 10, "Scene {}")
+        else:
+            # 작은 그룹은 단일 씬으로
+            scenes = [{
+                'title': "Scene 1",
+                'start_time': group['start_time'],
+                'end_time': group['end_time'],
+                'sentences': group['sentences']
+            }]
+        
+        chapters.append({
+            'title': f"Chapter {chapter_idx + 1}",
+            'start_time': group['start_time'],
+            'end_time': group['end_time'],
+            'scenes': scenes
+        })
+    
+    return chapters
@@ -3,9 +3,10 @@
 Clean subtitle text by removing unwanted elements
 """
 import re
-import sqlite3
 from pathlib import Path
 
+from database import media_repo, structure_repo
+
 def clean_subtitle_text(text):
     """
     Clean subtitle text by removing:
@@ -72,34 +73,38 @@ def clean_subtitle_text(text):
 
 def clean_existing_subtitles():
     """Clean all existing subtitle entries in the database"""
-    db_path = '/home/kang/dev/english/dev.db'
+    cleaned_count = 0
+    deleted_count = 0
     
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        
-        # Get all sentences
-        cursor.execute('SELECT id, english FROM Sentence WHERE english IS NOT NULL AND english != ""')
-        sentences = cursor.fetchall()
-        
-        print(f"Found {len(sentences)} sentences to process...")
+    for media in media_repo.get_all():
+        chapters = structure_repo.get_structure(media['id'])
+        changed = False
         
-        cleaned_count = 0
-        deleted_count = 0
+        for chapter in chapters:
+            for scene in chapter['scenes']:
+                kept = []
+                for sentence in scene['sentences']:
+                    english_text = sentence['english']
+                    cleaned_text = clean_subtitle_text(english_text) if english_text else english_text
+                    
+                    if english_text and not cleaned_text:
+                        # Delete empty sentences
+                        deleted_count += 1
+                        changed = True
+                        continue
+                    if cleaned_text != english_text:
+                        # Update cleaned sentences
+                        sentence['english'] = cleaned_text
+                        cleaned_count += 1
+                        changed = True
+                    kept.append(sentence)
+                scene['sentences'] = kept
         
-        for sentence_id, english_text in sentences:
-            cleaned_text = clean_subtitle_text(english_text)
-            
-            if not cleaned_text:
-                # Delete empty sentences
-                cursor.execute('DELETE FROM Sentence WHERE id = ?', (sentence_id,))
-                deleted_count += 1
-            elif cleaned_text != english_text:
-                # Update cleaned sentences
-                cursor.execute('UPDATE Sentence SET english = ? WHERE id = ?', (cleaned_text, sentence_id))
-                cleaned_count += 1
-        
-        conn.commit()
-        print(f"Cleaned {cleaned_count} sentences, deleted {deleted_count} empty sentences")
+        if changed:
+            # Sentences keep their ids (and bookmarks, translations)
+            structure_repo.replace_structure(media['id'], chapters)
+    
+    print(f"Cleaned {cleaned_count} sentences, deleted {deleted_count} empty sentences")
 
 def test_cleaning():
     """Test the cleaning function with sample data"""
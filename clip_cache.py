@@ -0,0 +1,192 @@
+"""
+Content-addressed cache of extracted clips (MP3/MP4) with size-based LRU eviction
+"""
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+class ClipCache:
+    """Extracted clips keyed by source identity, time range, output kind and options.
+    
+    Hits are served by hard-linking the cached file to the requested output path
+    (copying when the cache lives on another file system), so a repeated export of
+    the same sentence with the same options never reaches ffmpeg.
+    """
+    
+    # Bump when the extraction output changes so stale clips are not served
+    FORMAT_VERSION = 1
+    
+    def __init__(self, cache_dir: str = 'cache/clips', max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> size in bytes, least recently used first
+        self._entries: Optional['OrderedDict[str, int]'] = None
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def make_key(self, source_file: str, kind: str, start_time: float, end_time: float,
+                 options: Optional[Dict[str, Any]] = None) -> str:
+        """Hash of everything that determines the bytes of an extracted clip"""
+        stat = os.stat(source_file)
+        identity = {
+            'version': self.FORMAT_VERSION,
+            'source': [os.path.realpath(source_file), stat.st_size, stat.st_mtime_ns],
+            'kind': kind,
+            'start': round(float(start_time), 3),
+            'end': round(float(end_time), 3),
+            'options': options or {}
+        }
+        payload = json.dumps(identity, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def sentence_key(self, source_file: str, kind: str, sentence: Dict[str, Any],
+                     subtitle_options: Optional[Dict[str, Any]] = None,
+                     volume: Optional[float] = None) -> str:
+        """Key for a sentence clip; subtitle text only counts when it is burned in"""
+        options = dict(subtitle_options or {})
+        if volume is not None:
+            options['volume'] = round(volume, 3)
+        if options.get('english'):
+            options['english_text'] = sentence.get('english')
+        if options.get('korean'):
+            options['korean_text'] = sentence.get('korean')
+        return self.make_key(source_file, kind, sentence['startTime'], sentence['endTime'], options)
+    
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+    
+    def _load_index(self):
+        """Build the LRU index from disk (oldest access first)"""
+        if self._entries is not None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        files = [path for path in self.cache_dir.glob('*/*') if path.is_file() and path.suffix != '.partial']
+        files.sort(key=lambda path: path.stat().st_mtime)
+        self._entries = OrderedDict((path.name, path.stat().st_size) for path in files)
+        self._total_bytes = sum(self._entries.values())
+        logger.info(f"Clip cache loaded: {len(self._entries)} clips, {self._total_bytes} bytes")
+    
+    @staticmethod
+    def _link(source: Path, target: Path):
+        """Hard-link source to target, copying across file systems"""
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+    
+    @staticmethod
+    def release(output_file: str):
+        """Unlink an output path that shares its inode with a cached clip.
+        
+        ffmpeg -y truncates the file in place, which would corrupt the cached copy.
+        """
+        try:
+            if os.stat(output_file).st_nlink > 1:
+                os.unlink(output_file)
+        except FileNotFoundError:
+            pass
+    
+    def fetch(self, key: str, output_file: str) -> bool:
+        """Place the cached clip at output_file; on a miss, prepare the path for ffmpeg"""
+        with self._lock:
+            self._load_index()
+            cached = key in self._entries
+            if cached:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        
+        if not cached:
+            self.release(output_file)
+            return False
+        
+        cached_path = self._path(key)
+        try:
+            if os.path.lexists(output_file):
+                os.unlink(output_file)
+            self._link(cached_path, Path(output_file))
+            # Touch for LRU order across restarts
+            os.utime(cached_path)
+            return True
+        except FileNotFoundError:
+            # Removed behind our back; treat as a miss
+            with self._lock:
+                self._total_bytes -= self._entries.pop(key, 0)
+                self.hits -= 1
+                self.misses += 1
+            return False
+    
+    def store(self, key: str, output_file: str) -> bool:
+        """Add a freshly extracted clip to the cache"""
+        if not os.path.exists(output_file) or os.path.getsize(output_file) == 0:
+            return False
+        
+        cached_path = self._path(key)
+        try:
+            cached_path.parent.mkdir(parents=True, exist_ok=True)
+            partial_path = cached_path.with_name(cached_path.name + '.partial')
+            self._link(Path(output_file), partial_path)
+            os.replace(partial_path, cached_path)
+        except OSError as e:
+            logger.warning(f"Could not cache clip {output_file}: {e}")
+            return False
+        
+        size = cached_path.stat().st_size
+        with self._lock:
+            self._load_index()
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+        return True
+    
+    def _evict(self):
+        """Drop least recently used clips until the cache fits (lock held)"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                self._path(key).unlink()
+            except FileNotFoundError:
+                pass
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and size of the cache"""
+        with self._lock:
+            self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes
+            }
+    
+    def clear(self):
+        """Remove every cached clip"""
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self._entries = None
+            self._total_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+# Singleton instance
+clip_cache = ClipCache(
+    cache_dir=os.environ.get('CLIP_CACHE_DIR', 'cache/clips'),
+    max_bytes=int(float(os.environ.get('CLIP_CACHE_MAX_MB', 2048)) * 1024 ** 2)
+)
@@ -1,36 +1,192 @@
 """
 Database operations and models for English Learning Player
 """
+import os
+import json
+import re
+import shutil
 import sqlite3
 import logging
 import threading
+import time
+from collections import OrderedDict
 from contextlib import contextmanager
 from typing import Dict, List, Optional, Any
 from queue import Queue, Empty
 
 logger = logging.getLogger(__name__)
 
+class QueryProfiler:
+    """Per-statement latency histograms and slow-query log with query plans"""
+    
+    # Histogram bucket upper bounds in milliseconds
+    BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, float('inf'))
+    
+    _LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+    _EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+    
+    def __init__(self, slow_threshold_ms: float = 100.0):
+        self.slow_threshold_ms = slow_threshold_ms
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict] = {}
+    
+    @classmethod
+    def normalize(cls, sql: str) -> str:
+        """Reduce a statement to its shape (whitespace and literals folded)"""
+        return ' '.join(cls._LITERAL_PATTERN.sub('?', sql).split())
+    
+    def record(self, conn: sqlite3.Connection, sql: str, params: Any, elapsed_ms: float,
+               many: bool = False) -> None:
+        """Record one statement execution"""
+        shape = self.normalize(sql)
+        with self._lock:
+            entry = self._stats.get(shape)
+            if entry is None:
+                entry = self._stats[shape] = {
+                    'query': shape,
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'slow_count': 0,
+                    'histogram': [0] * len(self.BUCKETS_MS),
+                    'plan': None
+                }
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            for index, bound in enumerate(self.BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    entry['histogram'][index] += 1
+                    break
+            is_slow = elapsed_ms >= self.slow_threshold_ms
+            if is_slow:
+                entry['slow_count'] += 1
+            needs_plan = is_slow and entry['plan'] is None
+        
+        if not is_slow:
+            return
+        
+        plan = entry['plan']
+        if needs_plan and not many:
+            plan = self.explain(conn, sql, params)
+            with self._lock:
+                entry['plan'] = plan
+        logger.warning(
+            f"Slow query ({elapsed_ms:.1f}ms >= {self.slow_threshold_ms}ms): {shape}"
+            + (f"\n  QUERY PLAN: {'; '.join(plan)}" if plan else '')
+        )
+    
+    def explain(self, conn: sqlite3.Connection, sql: str, params: Any) -> Optional[List[str]]:
+        """Capture EXPLAIN QUERY PLAN for a statement"""
+        if not sql.lstrip().upper().startswith(self._EXPLAINABLE):
+            return None
+        try:
+            # Plain cursor so the EXPLAIN itself is not profiled
+            cursor = sqlite3.Cursor(conn)
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params or ())
+            return [row[-1] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.debug(f"EXPLAIN QUERY PLAN failed for {sql}: {e}")
+            return None
+    
+    def top(self, limit: int = 10, order_by: str = 'max_ms') -> List[Dict]:
+        """Get the slowest query shapes"""
+        with self._lock:
+            entries = [dict(entry, histogram=list(entry['histogram'])) for entry in self._stats.values()]
+        for entry in entries:
+            entry['avg_ms'] = entry['total_ms'] / entry['count'] if entry['count'] else 0.0
+        entries.sort(key=lambda entry: entry.get(order_by, 0), reverse=True)
+        return entries[:limit]
+    
+    def reset(self) -> None:
+        """Clear collected statistics"""
+        with self._lock:
+            self._stats.clear()
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor that reports statement latency to the connection's profiler"""
+    
+    def execute(self, sql, parameters=()):
+        profiler = self.connection.profiler
+        if profiler is None:
+            return super().execute(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            profiler.record(self.connection, sql, parameters, (time.perf_counter() - started) * 1000)
+    
+    def executemany(self, sql, seq_of_parameters):
+        profiler = self.connection.profiler
+        if profiler is None:
+            return super().executemany(sql, seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            profiler.record(self.connection, sql, None, (time.perf_counter() - started) * 1000, many=True)
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection whose cursors are profiled while a profiler is attached"""
+    
+    profiler: Optional[QueryProfiler] = None
+    
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
 class DatabaseManager:
     """Centralized database operations manager with connection pooling"""
     
-    def __init__(self, db_path: str = 'dev.db', pool_size: int = 10):
+    # Chapter -> Media cascade (media shards have no Media table to point at)
+    CHAPTER_MEDIA_FOREIGN_KEY = ',\n                FOREIGN KEY (mediaId) REFERENCES Media (id) ON DELETE CASCADE'
+    
+    # Tables this database holds indexes for (None means all of them)
+    INDEXED_TABLES: Optional[tuple] = None
+    
+    # Upper bound on media shard files kept open at once (least recently used are closed)
+    MAX_OPEN_SHARDS = 64
+    
+    _SHARD_NAME_PATTERN = re.compile(r'^[\w-][\w.-]*$')
+    
+    def __init__(self, db_path: str = 'dev.db', pool_size: int = 10,
+                 slow_query_ms: Optional[float] = None, shard_dir: Optional[str] = None,
+                 cold_storage_dirs: Optional[List[str]] = None):
         self.db_path = db_path
         self.pool_size = pool_size
         self._pool = Queue(maxsize=pool_size)
         self._lock = threading.Lock()
+        # Query profiling is opt-in; None keeps cursors on the fast path
+        self.profiler: Optional[QueryProfiler] = None
+        if slow_query_ms is not None:
+            self.profiler = QueryProfiler(slow_query_ms)
+        # Per-media shard files are opt-in; None keeps every table in db_path
+        self.shard_dir = shard_dir
+        self._shards: 'OrderedDict[str, MediaShard]' = OrderedDict()
+        self._shard_lock = threading.Lock()
+        # Shards may only be relocated below these roots
+        self.cold_storage_dirs = [os.path.realpath(d) for d in (cold_storage_dirs or []) if d]
+        if shard_dir:
+            os.makedirs(shard_dir, exist_ok=True)
         self._initialize_pool()
         self.init_database()
     
+    def _create_connection(self):
+        """Open a configured connection"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=ProfiledConnection)
+        conn.row_factory = sqlite3.Row
+        # Lets maintenance reclaim free pages in small steps; only takes effect for
+        # new files, existing ones are converted by an explicit maintenance run
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        # Enable WAL mode for better concurrency
+        conn.execute('PRAGMA journal_mode=WAL')
+        # Enable foreign key constraints
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+    
     def _initialize_pool(self):
         """Initialize connection pool"""
         for _ in range(self.pool_size):
-            conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            conn.row_factory = sqlite3.Row
-            # Enable WAL mode for better concurrency
-            conn.execute('PRAGMA journal_mode=WAL')
-            # Enable foreign key constraints
-            conn.execute('PRAGMA foreign_keys=ON')
-            self._pool.put(conn)
+            self._pool.put(self._create_connection())
         logger.info(f"Database connection pool initialized with {self.pool_size} connections")
     
     def _get_connection_from_pool(self):
@@ -40,11 +196,21 @@ class DatabaseManager:
         except Empty:
             # Pool exhausted, create temporary connection
             logger.warning("Connection pool exhausted, creating temporary connection")
-            conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            conn.row_factory = sqlite3.Row
-            conn.execute('PRAGMA journal_mode=WAL')
-            conn.execute('PRAGMA foreign_keys=ON')
-            return conn
+            return self._create_connection()
+    
+    def enable_query_profiling(self, slow_query_ms: float = 100.0) -> QueryProfiler:
+        """Start recording statement latencies and logging slow queries"""
+        if self.profiler is None:
+            self.profiler = QueryProfiler(slow_query_ms)
+        else:
+            self.profiler.slow_threshold_ms = slow_query_ms
+        logger.info(f"Query profiling enabled (slow threshold {slow_query_ms}ms)")
+        return self.profiler
+    
+    def disable_query_profiling(self) -> None:
+        """Stop recording statement latencies (collected stats are dropped)"""
+        self.profiler = None
+        logger.info("Query profiling disabled")
     
     def _return_connection_to_pool(self, conn):
         """Return connection to pool"""
@@ -54,10 +220,19 @@ class DatabaseManager:
             # Pool is full, close the connection
             conn.close()
     
+    def close(self):
+        """Close every pooled connection"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except Empty:
+                break
+    
     @contextmanager
     def get_connection(self):
         """Context manager for pooled database connections"""
         conn = self._get_connection_from_pool()
+        conn.profiler = self.profiler
         try:
             yield conn
         except Exception as e:
@@ -67,6 +242,284 @@ class DatabaseManager:
         finally:
             self._return_connection_to_pool(conn)
     
+    @contextmanager
+    def get_media_connection(self, media_id: Optional[str] = None, create: bool = False):
+        """Connection to the database holding the chapters, scenes and sentences of a media.
+        
+        Without a shard directory this is the main database. With sharding enabled
+        every media lives in its own file, so ``media_id`` is required. Only calls
+        that add rows pass ``create``; until a media has a shard file every other
+        call runs against the main database, which holds its rows from before
+        sharding (or none), so reads of unknown or purged media leave no files.
+        """
+        if not self.shard_dir:
+            with self.get_connection() as conn:
+                yield conn
+            return
+        if media_id is None:
+            raise ValueError("media_id is required when media sharding is enabled")
+        shard = self._get_shard(str(media_id), create)
+        if shard is None:
+            with self.get_connection() as conn:
+                yield conn
+            return
+        shard.profiler = self.profiler
+        with shard.get_connection() as conn:
+            yield conn
+    
+    def shard_path(self, media_id: str) -> str:
+        """Path of the shard file of a media"""
+        media_id = str(media_id)
+        if not self._SHARD_NAME_PATTERN.match(media_id):
+            raise ValueError(f"Invalid media id for shard file: {media_id!r}")
+        return os.path.join(self.shard_dir, f"{media_id}.db")
+    
+    def _get_shard(self, media_id: str, create: bool = True) -> Optional['MediaShard']:
+        """Open (or reuse) the shard of a media; a missing one is created only with ``create``"""
+        with self._shard_lock:
+            shard = self._shards.get(media_id)
+            if shard is not None:
+                self._shards.move_to_end(media_id)
+                return shard
+            
+            path = self.shard_path(media_id)
+            is_new = not os.path.exists(path)
+            if is_new and not create:
+                return None
+            shard = MediaShard(path)
+            if is_new:
+                self._adopt_catalog_rows(shard, media_id)
+            
+            self._shards[media_id] = shard
+            while len(self._shards) > self.MAX_OPEN_SHARDS:
+                _, evicted = self._shards.popitem(last=False)
+                evicted.close()
+            return shard
+    
+    def _adopt_catalog_rows(self, shard: 'MediaShard', media_id: str):
+        """Move the rows a media still has in the main database into its new shard"""
+        with shard.get_connection() as conn:
+            cursor = conn.cursor()
+            # Tables are qualified so a stale schema never resolves them to the catalog
+            cursor.execute("ATTACH DATABASE ? AS catalog", (self.db_path,))
+            try:
+                cursor.execute('''
+                    INSERT INTO main.Chapter (id, mediaId, title, startTime, endTime, `order`)
+                    SELECT id, mediaId, title, startTime, endTime, `order`
+                    FROM catalog.Chapter WHERE mediaId = ?
+                ''', (media_id,))
+                chapters = cursor.rowcount
+                cursor.execute('''
+                    INSERT INTO main.Scene (id, chapterId, title, startTime, endTime, `order`)
+                    SELECT id, chapterId, title, startTime, endTime, `order`
+                    FROM catalog.Scene WHERE chapterId IN (SELECT id FROM main.Chapter)
+                ''')
+                cursor.execute('''
+                    INSERT INTO main.Sentence (id, sceneId, english, korean, startTime, endTime, `order`,
+                                          isBookmarked, confidence, detectedVerbs)
+                    SELECT id, sceneId, english, korean, startTime, endTime, `order`,
+                           isBookmarked, confidence, detectedVerbs
+                    FROM catalog.Sentence WHERE sceneId IN (SELECT id FROM main.Scene)
+                ''')
+                conn.commit()
+            finally:
+                cursor.execute("DETACH DATABASE catalog")
+        
+        if chapters > 0:
+            # Chapter deletion cascades to the scenes and sentences in the main database
+            with self.get_connection() as conn:
+                conn.execute("DELETE FROM Chapter WHERE mediaId = ?", (media_id,))
+                conn.commit()
+            logger.info(f"Moved {chapters} chapters of media {media_id} into its shard")
+    
+    def drop_media_shard(self, media_id: str) -> bool:
+        """Delete the shard file of a media; cost does not depend on its row count"""
+        if not self.shard_dir:
+            return False
+        media_id = str(media_id)
+        with self._shard_lock:
+            shard = self._shards.pop(media_id, None)
+            if shard is not None:
+                shard.close()
+            path = self.shard_path(media_id)
+            if not os.path.lexists(path):
+                return False
+            real_path = os.path.realpath(path)
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(real_path + suffix):
+                    os.unlink(real_path + suffix)
+            if os.path.lexists(path):
+                os.unlink(path)
+            logger.info(f"Dropped shard of media {media_id}")
+            return True
+    
+    def relocate_media_shard(self, media_id: str, target_dir: str) -> str:
+        """Move the shard file of a media (e.g. to colder storage), leaving a symlink behind"""
+        if not self.shard_dir:
+            raise ValueError("Media sharding is not enabled")
+        target_dir = self._resolve_cold_storage_dir(target_dir)
+        media_id = str(media_id)
+        with self._shard_lock:
+            path = self.shard_path(media_id)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No shard for media {media_id}")
+            shard = self._shards.pop(media_id, None)
+            if shard is not None:
+                shard.close()
+            
+            real_path = os.path.realpath(path)
+            os.makedirs(target_dir, exist_ok=True)
+            target_path = os.path.abspath(os.path.join(target_dir, os.path.basename(real_path)))
+            if target_path == real_path:
+                return target_path
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(real_path + suffix):
+                    shutil.move(real_path + suffix, target_path + suffix)
+            if os.path.lexists(path):
+                os.unlink(path)
+            os.symlink(target_path, path)
+            logger.info(f"Relocated shard of media {media_id} to {target_path}")
+            return target_path
+    
+    def _resolve_cold_storage_dir(self, target_dir: str) -> str:
+        """Resolve a relocation target, refusing anything outside the configured cold-storage roots"""
+        if not self.cold_storage_dirs:
+            raise ValueError("No cold-storage directories are configured")
+        resolved = os.path.realpath(target_dir)
+        for root in self.cold_storage_dirs:
+            if os.path.commonpath([root, resolved]) == root:
+                return resolved
+        raise ValueError(f"target_dir must be inside one of the cold-storage directories: {self.cold_storage_dirs}")
+    
+    def media_db_path(self, media_id: str) -> str:
+        """Path of the database file holding the structure rows of a media"""
+        return self.shard_path(media_id) if self.shard_dir else self.db_path
+    
+    def shard_paths(self) -> List[str]:
+        """Paths of all media shard files"""
+        if not self.shard_dir:
+            return []
+        return sorted(
+            os.path.join(self.shard_dir, name) for name in os.listdir(self.shard_dir)
+            if name.endswith('.db')
+        )
+    
+    def backup(self, target_path: str, source_path: Optional[str] = None,
+               pages_per_step: int = 256, step_sleep: float = 0.05) -> Dict[str, Any]:
+        """Online backup of a database file using the SQLite backup API.
+        
+        Pages are copied ``pages_per_step`` at a time with a ``step_sleep`` pause
+        after every step, so writers are only blocked for one short step at a time.
+        The copy is written next to ``target_path`` and renamed into place when
+        complete.
+        """
+        source_path = source_path or self.db_path
+        os.makedirs(os.path.dirname(os.path.abspath(target_path)), exist_ok=True)
+        partial_path = target_path + '.partial'
+        started = time.perf_counter()
+        steps = 0
+        
+        def on_progress(status, remaining, total):
+            nonlocal steps
+            steps += 1
+            # The backup API itself only sleeps after busy or locked steps
+            if remaining and step_sleep:
+                time.sleep(step_sleep)
+        
+        source = sqlite3.connect(source_path)
+        destination = sqlite3.connect(partial_path)
+        try:
+            source.backup(destination, pages=pages_per_step, progress=on_progress, sleep=step_sleep)
+        finally:
+            destination.close()
+            source.close()
+        os.replace(partial_path, target_path)
+        
+        return {
+            'path': target_path,
+            'bytes': os.path.getsize(target_path),
+            'steps': steps,
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+    
+    def checkpoint(self, mode: str = 'PASSIVE', db_path: Optional[str] = None) -> Dict[str, int]:
+        """Checkpoint the WAL (TRUNCATE also shrinks the -wal file back to zero)"""
+        if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+            raise ValueError(f"Invalid checkpoint mode: {mode}")
+        conn = sqlite3.connect(db_path or self.db_path)
+        try:
+            busy, log_pages, checkpointed = conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+        finally:
+            conn.close()
+        return {'busy': busy, 'log_pages': log_pages, 'checkpointed': checkpointed}
+    
+    def optimize(self, analyze: bool = False, vacuum_pages: int = 2000,
+                 db_path: Optional[str] = None, convert: bool = False) -> Dict[str, Any]:
+        """Refresh planner statistics and hand free pages back to the file system.
+        
+        Free pages are released at most ``vacuum_pages`` at a time. A file that is
+        not in incremental auto-vacuum mode yet can only be converted with a full
+        VACUUM, which blocks every writer until it is done, so that happens only
+        when ``convert`` is asked for; otherwise the file is reported as convertible.
+        """
+        result = {'analyzed': analyze, 'vacuumed_pages': 0, 'converted': False, 'convertible': False}
+        conn = sqlite3.connect(db_path or self.db_path)
+        try:
+            if analyze:
+                conn.execute('ANALYZE')
+            conn.execute('PRAGMA optimize')
+            
+            page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+            freelist_before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            auto_vacuum = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+            if auto_vacuum == 2:
+                # executescript steps the pragma to completion (execute frees a single page)
+                conn.executescript(f'PRAGMA incremental_vacuum({int(vacuum_pages)});')
+            elif convert:
+                conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                conn.execute('VACUUM')
+                result['converted'] = True
+            else:
+                result['convertible'] = True
+            conn.commit()
+            
+            freelist_after = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            result['vacuumed_pages'] = freelist_before - freelist_after
+        finally:
+            conn.close()
+        return result
+    
+    def get_storage_stats(self) -> Dict[str, Any]:
+        """Sizes of the database file, its WAL and free pages"""
+        with self.get_connection() as conn:
+            page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+            page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+            freelist_count = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            auto_vacuum = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+        
+        wal_path = self.db_path + '-wal'
+        stats = {
+            'db_path': self.db_path,
+            'db_bytes': os.path.getsize(self.db_path),
+            'wal_bytes': os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+            'page_size': page_size,
+            'page_count': page_count,
+            'freelist_count': freelist_count,
+            'freelist_bytes': freelist_count * page_size,
+            'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(auto_vacuum, str(auto_vacuum))
+        }
+        if self.shard_dir:
+            shard_paths = self.shard_paths()
+            stats['shards'] = {
+                'count': len(shard_paths),
+                'bytes': sum(os.path.getsize(path) for path in shard_paths),
+                'wal_bytes': sum(
+                    os.path.getsize(path + '-wal') for path in shard_paths
+                    if os.path.exists(path + '-wal')
+                )
+            }
+        return stats
+    
     def init_database(self):
         """Initialize database with required tables"""
         with self.get_connection() as conn:
@@ -83,68 +536,21 @@ class DatabaseManager:
                     duration REAL,
                     status TEXT DEFAULT 'uploaded',
                     createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    metadata TEXT
+                    metadata TEXT,
+                    deletedAt TIMESTAMP
                 )
             ''')
             
-            # Chapter table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS Chapter (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    mediaId TEXT NOT NULL,
-                    title TEXT NOT NULL,
-                    startTime REAL NOT NULL,
-                    endTime REAL NOT NULL,
-                    `order` INTEGER NOT NULL,
-                    FOREIGN KEY (mediaId) REFERENCES Media (id) ON DELETE CASCADE
-                )
-            ''')
-            
-            # Scene table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS Scene (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    chapterId INTEGER NOT NULL,
-                    title TEXT NOT NULL,
-                    startTime REAL NOT NULL,
-                    endTime REAL NOT NULL,
-                    `order` INTEGER NOT NULL,
-                    FOREIGN KEY (chapterId) REFERENCES Chapter (id) ON DELETE CASCADE
-                )
-            ''')
-            
-            # Sentence table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS Sentence (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    sceneId INTEGER NOT NULL,
-                    english TEXT NOT NULL,
-                    korean TEXT,
-                    startTime REAL NOT NULL,
-                    endTime REAL NOT NULL,
-                    `order` INTEGER NOT NULL,
-                    isBookmarked BOOLEAN DEFAULT 0,
-                    confidence REAL,
-                    detectedVerbs TEXT,
-                    FOREIGN KEY (sceneId) REFERENCES Scene (id) ON DELETE CASCADE
-                )
-            ''')
-            
-            # Add detectedVerbs column if it doesn't exist (migration)
+            # Add deletedAt column if it doesn't exist (migration)
             try:
-                cursor.execute('ALTER TABLE Sentence ADD COLUMN detectedVerbs TEXT')
+                cursor.execute('ALTER TABLE Media ADD COLUMN deletedAt TIMESTAMP')
                 conn.commit()
             except Exception:
                 # Column already exists or other error - ignore
                 pass
             
-            # Add isBookmarked column if it doesn't exist (migration)
-            try:
-                cursor.execute('ALTER TABLE Sentence ADD COLUMN isBookmarked BOOLEAN DEFAULT 0')
-                conn.commit()
-            except Exception:
-                # Column already exists or other error - ignore
-                pass
+            # Chapter, Scene and Sentence tables
+            self._create_structure_tables(conn, cursor)
             
             # Create WordDifficulty cache table
             cursor.execute('''
@@ -172,6 +578,66 @@ class DatabaseManager:
             conn.commit()
             logger.info("Database initialized successfully")
     
+    def _create_structure_tables(self, conn, cursor):
+        """Create the Chapter, Scene and Sentence tables"""
+        # Chapter table
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS Chapter (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                mediaId TEXT NOT NULL,
+                title TEXT NOT NULL,
+                startTime REAL NOT NULL,
+                endTime REAL NOT NULL,
+                `order` INTEGER NOT NULL{self.CHAPTER_MEDIA_FOREIGN_KEY}
+            )
+        ''')
+        
+        # Scene table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS Scene (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chapterId INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                startTime REAL NOT NULL,
+                endTime REAL NOT NULL,
+                `order` INTEGER NOT NULL,
+                FOREIGN KEY (chapterId) REFERENCES Chapter (id) ON DELETE CASCADE
+            )
+        ''')
+        
+        # Sentence table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS Sentence (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sceneId INTEGER NOT NULL,
+                english TEXT NOT NULL,
+                korean TEXT,
+                startTime REAL NOT NULL,
+                endTime REAL NOT NULL,
+                `order` INTEGER NOT NULL,
+                isBookmarked BOOLEAN DEFAULT 0,
+                confidence REAL,
+                detectedVerbs TEXT,
+                FOREIGN KEY (sceneId) REFERENCES Scene (id) ON DELETE CASCADE
+            )
+        ''')
+        
+        # Add detectedVerbs column if it doesn't exist (migration)
+        try:
+            cursor.execute('ALTER TABLE Sentence ADD COLUMN detectedVerbs TEXT')
+            conn.commit()
+        except Exception:
+            # Column already exists or other error - ignore
+            pass
+        
+        # Add isBookmarked column if it doesn't exist (migration)
+        try:
+            cursor.execute('ALTER TABLE Sentence ADD COLUMN isBookmarked BOOLEAN DEFAULT 0')
+            conn.commit()
+        except Exception:
+            # Column already exists or other error - ignore
+            pass
+    
     def _create_indexes(self, cursor):
         """Create indexes for performance optimization"""
         indexes = [
@@ -203,6 +669,8 @@ class DatabaseManager:
         ]
         
         for index_sql in indexes:
+            if self.INDEXED_TABLES and re.search(r' ON (\w+)\(', index_sql).group(1) not in self.INDEXED_TABLES:
+                continue
             try:
                 cursor.execute(index_sql)
                 logger.debug(f"Created index: {index_sql}")
@@ -211,27 +679,79 @@ class DatabaseManager:
         
         logger.info("Database indexes created successfully")
 
+class MediaShard(DatabaseManager):
+    """Chapters, scenes and sentences of a single media in their own SQLite file"""
+    
+    CHAPTER_MEDIA_FOREIGN_KEY = ''
+    INDEXED_TABLES = ('Chapter', 'Scene', 'Sentence')
+    
+    def __init__(self, db_path: str, pool_size: int = 2):
+        self._closed = False
+        super().__init__(db_path, pool_size)
+    
+    def init_database(self):
+        """Initialize the shard with the structure tables only"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._create_structure_tables(conn, cursor)
+            self._create_indexes(cursor)
+            conn.commit()
+    
+    def _return_connection_to_pool(self, conn):
+        """Return connection to pool, closing it if the shard was closed meanwhile"""
+        if self._closed:
+            conn.close()
+        else:
+            super()._return_connection_to_pool(conn)
+    
+    def close(self):
+        """Close the shard; connections still in use are closed when returned"""
+        self._closed = True
+        super().close()
+
 class MediaRepository:
     """Repository for Media operations"""
     
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
+        # Ingest stages and background probes update metadata of the same media concurrently
+        self._metadata_lock = threading.Lock()
     
     def get_all(self) -> List[Dict]:
-        """Get all media files"""
+        """Get all media files (soft-deleted media excluded)"""
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM Media ORDER BY createdAt DESC")
+            cursor.execute("SELECT * FROM Media WHERE deletedAt IS NULL ORDER BY createdAt DESC")
             return [dict(row) for row in cursor.fetchall()]
     
-    def get_by_id(self, media_id: str) -> Optional[Dict]:
-        """Get media by ID"""
+    def get_by_id(self, media_id: str, include_deleted: bool = False) -> Optional[Dict]:
+        """Get media by ID (soft-deleted media only when include_deleted)"""
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT * FROM Media WHERE id = ?", (media_id,))
+            if include_deleted:
+                cursor.execute("SELECT * FROM Media WHERE id = ?", (media_id,))
+            else:
+                cursor.execute("SELECT * FROM Media WHERE id = ? AND deletedAt IS NULL", (media_id,))
             row = cursor.fetchone()
             return dict(row) if row else None
     
+    def get_by_status(self, status: str) -> List[Dict]:
+        """Get media in a given processing status (soft-deleted media excluded)"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT * FROM Media WHERE status = ? AND deletedAt IS NULL ORDER BY createdAt",
+                (status,)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_deleted(self) -> List[Dict]:
+        """Get soft-deleted media still waiting to be purged"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM Media WHERE deletedAt IS NOT NULL ORDER BY deletedAt")
+            return [dict(row) for row in cursor.fetchall()]
+    
     def create(self, media_data: Dict) -> str:
         """Create new media entry"""
         with self.db.get_connection() as conn:
@@ -255,13 +775,51 @@ class MediaRepository:
             conn.commit()
             return cursor.rowcount > 0
     
+    def update_duration(self, media_id: str, duration: float) -> bool:
+        """Set the media duration once it is known"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE Media SET duration = ? WHERE id = ?", (duration, media_id))
+            conn.commit()
+            return cursor.rowcount > 0
+    
+    def update_metadata(self, media_id: str, values: Dict) -> bool:
+        """Set top-level keys of the JSON metadata of a media (ingest probe results etc.), keeping the others"""
+        with self._metadata_lock, self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT metadata FROM Media WHERE id = ?", (media_id,))
+            row = cursor.fetchone()
+            if not row:
+                return False
+            metadata = json.loads(row['metadata']) if row['metadata'] else {}
+            metadata.update(values)
+            cursor.execute(
+                "UPDATE Media SET metadata = ? WHERE id = ?",
+                (json.dumps(metadata), media_id)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+    
+    def mark_deleted(self, media_id: str) -> bool:
+        """Soft-delete media: hide it everywhere until the purger removes it"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE Media SET deletedAt = CURRENT_TIMESTAMP WHERE id = ? AND deletedAt IS NULL",
+                (media_id,)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+    
     def delete(self, media_id: str) -> bool:
         """Delete media and all related data"""
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM Media WHERE id = ?", (media_id,))
             conn.commit()
-            return cursor.rowcount > 0
+            deleted = cursor.rowcount > 0
+        self.db.drop_media_shard(media_id)
+        return deleted
 
 class ChapterRepository:
     """Repository for Chapter operations"""
@@ -271,7 +829,7 @@ class ChapterRepository:
     
     def get_by_media_id(self, media_id: str) -> List[Dict]:
         """Get chapters with scene counts"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT c.*, 
@@ -282,17 +840,19 @@ class ChapterRepository:
             ''', (media_id,))
             return [dict(row) for row in cursor.fetchall()]
     
-    def get_by_id(self, chapter_id: int) -> Optional[Dict]:
+    def get_by_id(self, chapter_id: int, media_id: Optional[str] = None) -> Optional[Dict]:
         """Get chapter by ID"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM Chapter WHERE id = ?", (chapter_id,))
             row = cursor.fetchone()
             return dict(row) if row else None
     
     def create_batch(self, chapters: List[Dict]) -> List[int]:
-        """Create multiple chapters"""
-        with self.db.get_connection() as conn:
+        """Create multiple chapters (all of the same media)"""
+        if not chapters:
+            return []
+        with self.db.get_media_connection(chapters[0]['mediaId'], create=True) as conn:
             cursor = conn.cursor()
             chapter_ids = []
             for chapter in chapters:
@@ -313,9 +873,9 @@ class SceneRepository:
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
     
-    def get_by_chapter_id(self, chapter_id: int) -> List[Dict]:
+    def get_by_chapter_id(self, chapter_id: int, media_id: Optional[str] = None) -> List[Dict]:
         """Get scenes with sentence counts"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT sc.*, 
@@ -326,17 +886,17 @@ class SceneRepository:
             ''', (chapter_id,))
             return [dict(row) for row in cursor.fetchall()]
     
-    def get_by_id(self, scene_id: int) -> Optional[Dict]:
+    def get_by_id(self, scene_id: int, media_id: Optional[str] = None) -> Optional[Dict]:
         """Get scene by ID"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM Scene WHERE id = ?", (scene_id,))
             row = cursor.fetchone()
             return dict(row) if row else None
     
-    def create_batch(self, scenes: List[Dict]) -> List[int]:
+    def create_batch(self, scenes: List[Dict], media_id: Optional[str] = None) -> List[int]:
         """Create multiple scenes"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id, create=True) as conn:
             cursor = conn.cursor()
             scene_ids = []
             for scene in scenes:
@@ -359,7 +919,7 @@ class SentenceRepository:
     
     def get_by_media_id(self, media_id: str) -> List[Dict]:
         """Get all sentences for a media"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT s.*, sc.chapterId, sc.title as sceneTitle, c.title as chapterTitle
@@ -371,17 +931,17 @@ class SentenceRepository:
             ''', (media_id,))
             return [dict(row) for row in cursor.fetchall()]
     
-    def get_by_id(self, sentence_id: int) -> Optional[Dict]:
+    def get_by_id(self, sentence_id: int, media_id: Optional[str] = None) -> Optional[Dict]:
         """Get sentence by ID"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM Sentence WHERE id = ?", (sentence_id,))
             row = cursor.fetchone()
             return dict(row) if row else None
     
-    def get_by_scene_id(self, scene_id: int) -> List[Dict]:
+    def get_by_scene_id(self, scene_id: int, media_id: Optional[str] = None) -> List[Dict]:
         """Get sentences by scene ID"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT * FROM Sentence 
@@ -390,9 +950,9 @@ class SentenceRepository:
             ''', (scene_id,))
             return [dict(row) for row in cursor.fetchall()]
     
-    def get_by_chapter_id(self, chapter_id: int) -> List[Dict]:
+    def get_by_chapter_id(self, chapter_id: int, media_id: Optional[str] = None) -> List[Dict]:
         """Get sentences by chapter ID"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT s.* FROM Sentence s
@@ -404,7 +964,7 @@ class SentenceRepository:
     
     def get_bookmarked_by_media_id(self, media_id: str) -> List[Dict]:
         """Get bookmarked sentences for a media"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT s.*, sc.chapterId, sc.title as sceneTitle, c.title as chapterTitle
@@ -416,9 +976,9 @@ class SentenceRepository:
             ''', (media_id,))
             return [dict(row) for row in cursor.fetchall()]
     
-    def toggle_bookmark(self, sentence_id: int) -> Dict:
+    def toggle_bookmark(self, sentence_id: int, media_id: Optional[str] = None) -> Dict:
         """Toggle bookmark status"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             
             # Get current status
@@ -433,17 +993,17 @@ class SentenceRepository:
             
             return {'bookmarked': new_status}
     
-    def update_translation(self, sentence_id: int, korean_text: str) -> bool:
+    def update_translation(self, sentence_id: int, korean_text: str, media_id: Optional[str] = None) -> bool:
         """Update Korean translation"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute("UPDATE Sentence SET korean = ? WHERE id = ?", (korean_text, sentence_id))
             conn.commit()
             return cursor.rowcount > 0
     
-    def update_verbs(self, sentence_id: int, verbs_json: str) -> bool:
+    def update_verbs(self, sentence_id: int, verbs_json: str, media_id: Optional[str] = None) -> bool:
         """Update detected verbs"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute("UPDATE Sentence SET detectedVerbs = ? WHERE id = ?", (verbs_json, sentence_id))
             conn.commit()
@@ -451,7 +1011,7 @@ class SentenceRepository:
     
     def get_sentences_without_verbs(self, media_id: str) -> List[Dict]:
         """Get sentences that need verb analysis"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT s.* FROM Sentence s
@@ -462,9 +1022,9 @@ class SentenceRepository:
             ''', (media_id,))
             return [dict(row) for row in cursor.fetchall()]
     
-    def create_batch(self, sentences: List[Dict]) -> List[int]:
+    def create_batch(self, sentences: List[Dict], media_id: Optional[str] = None) -> List[int]:
         """Create multiple sentences"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id, create=True) as conn:
             cursor = conn.cursor()
             sentence_ids = []
             for sentence in sentences:
@@ -482,7 +1042,7 @@ class SentenceRepository:
     
     def delete_by_media_id(self, media_id: str) -> bool:
         """Delete all sentences for a media"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 DELETE FROM Sentence 
@@ -495,9 +1055,10 @@ class SentenceRepository:
             conn.commit()
             return cursor.rowcount > 0
     
-    def update_highlighted_english(self, sentence_id: int, highlighted_english: str) -> bool:
+    def update_highlighted_english(self, sentence_id: int, highlighted_english: str,
+                                   media_id: Optional[str] = None) -> bool:
         """Update highlighted_english for a sentence"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "UPDATE Sentence SET highlighted_english = ? WHERE id = ?",
@@ -508,7 +1069,7 @@ class SentenceRepository:
     
     def get_sentences_without_highlights(self, media_id: str) -> List[Dict]:
         """Get sentences that don't have highlighted_english yet"""
-        with self.db.get_connection() as conn:
+        with self.db.get_media_connection(media_id) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT s.*, sc.chapterId, sc.title as sceneTitle, c.title as chapterTitle
@@ -520,6 +1081,249 @@ class SentenceRepository:
             ''', (media_id,))
             return [dict(row) for row in cursor.fetchall()]
 
+class StructureRepository:
+    """Repository for whole chapter/scene/sentence trees of a media"""
+
+    # Rewrites touching at least this many sentences checkpoint the WAL afterwards
+    BULK_WRITE_ROWS = 1000
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db = db_manager
+
+    @staticmethod
+    def _value(item: Dict, key: str, alt_key: str, default: Any = None) -> Any:
+        """Read a field by its column name, falling back to the template-style key"""
+        if key in item:
+            return item[key]
+        return item.get(alt_key, default)
+
+    @staticmethod
+    def _identity(english: Optional[str], start_time: float) -> tuple:
+        """Identity of a sentence that survives re-insertion"""
+        return ((english or '').strip(), round(float(start_time), 3))
+
+    def get_structure(self, media_id: str) -> List[Dict]:
+        """Get the full chapter -> scene -> sentence tree for a media"""
+        with self.db.get_media_connection(media_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM Chapter WHERE mediaId = ? ORDER BY `order`", (media_id,))
+            chapters = [dict(row) for row in cursor.fetchall()]
+
+            cursor.execute('''
+                SELECT sc.* FROM Scene sc
+                JOIN Chapter c ON sc.chapterId = c.id
+                WHERE c.mediaId = ?
+                ORDER BY sc.`order`
+            ''', (media_id,))
+            scenes_by_chapter: Dict[int, List[Dict]] = {}
+            scenes_by_id: Dict[int, Dict] = {}
+            for row in cursor.fetchall():
+                scene = dict(row)
+                scene['sentences'] = []
+                scenes_by_chapter.setdefault(scene['chapterId'], []).append(scene)
+                scenes_by_id[scene['id']] = scene
+
+            cursor.execute('''
+                SELECT s.* FROM Sentence s
+                JOIN Scene sc ON s.sceneId = sc.id
+                JOIN Chapter c ON sc.chapterId = c.id
+                WHERE c.mediaId = ?
+                ORDER BY s.`order`
+            ''', (media_id,))
+            for row in cursor.fetchall():
+                sentence = dict(row)
+                scenes_by_id[sentence['sceneId']]['sentences'].append(sentence)
+
+            for chapter in chapters:
+                chapter['scenes'] = scenes_by_chapter.get(chapter['id'], [])
+            return chapters
+
+    def replace_structure(self, media_id: str, chapters: List[Dict]) -> Dict[str, int]:
+        """Replace the whole chapter/scene/sentence tree of a media in one transaction.
+
+        ``chapters`` is a list of chapter dicts, each with a ``scenes`` list whose
+        items carry a ``sentences`` list. Times may be given as ``startTime``/``endTime``
+        or as the template-style ``start_time``/``end_time``; ``order`` defaults to the
+        position in the list (sentences keep their own ``order``).
+
+        Bookmarks, translations and detected verbs of existing sentences are carried
+        over by sentence identity: the ``id`` when given, otherwise the English text
+        and start time. Matched sentences keep their id, new ones get ids in bulk.
+        """
+        with self.db.get_media_connection(media_id, create=True) as conn:
+            if conn.in_transaction:
+                conn.commit()
+            cursor = conn.cursor()
+            # Take the write lock up front so id allocation below cannot race
+            cursor.execute('BEGIN IMMEDIATE')
+
+            cursor.execute('''
+                SELECT s.id, s.english, s.korean, s.startTime, s.isBookmarked, s.detectedVerbs
+                FROM Sentence s
+                JOIN Scene sc ON s.sceneId = sc.id
+                JOIN Chapter c ON sc.chapterId = c.id
+                WHERE c.mediaId = ?
+            ''', (media_id,))
+            existing_by_id = {}
+            existing_by_identity = {}
+            for row in cursor.fetchall():
+                previous = dict(row)
+                existing_by_id[previous['id']] = previous
+                existing_by_identity.setdefault(
+                    self._identity(previous['english'], previous['startTime']), previous
+                )
+
+            cursor.execute('''
+                DELETE FROM Sentence WHERE sceneId IN (
+                    SELECT sc.id FROM Scene sc
+                    JOIN Chapter c ON sc.chapterId = c.id
+                    WHERE c.mediaId = ?
+                )
+            ''', (media_id,))
+            cursor.execute(
+                "DELETE FROM Scene WHERE chapterId IN (SELECT id FROM Chapter WHERE mediaId = ?)",
+                (media_id,)
+            )
+            cursor.execute("DELETE FROM Chapter WHERE mediaId = ?", (media_id,))
+
+            next_chapter_id = self._next_id(cursor, 'Chapter')
+            next_scene_id = self._next_id(cursor, 'Scene')
+            next_sentence_id = self._next_id(cursor, 'Sentence')
+
+            chapter_rows, scene_rows, sentence_rows = [], [], []
+            preserved = 0
+
+            for chapter_index, chapter in enumerate(chapters):
+                chapter_id = next_chapter_id
+                next_chapter_id += 1
+                chapter_rows.append((
+                    chapter_id, media_id, chapter['title'],
+                    self._value(chapter, 'startTime', 'start_time', 0),
+                    self._value(chapter, 'endTime', 'end_time', 0),
+                    chapter.get('order', chapter_index + 1)
+                ))
+
+                for scene_index, scene in enumerate(chapter.get('scenes', [])):
+                    scene_id = next_scene_id
+                    next_scene_id += 1
+                    scene_rows.append((
+                        scene_id, chapter_id, scene['title'],
+                        self._value(scene, 'startTime', 'start_time', 0),
+                        self._value(scene, 'endTime', 'end_time', 0),
+                        scene.get('order', scene_index + 1)
+                    ))
+
+                    for sentence in scene.get('sentences', []):
+                        start_time = self._value(sentence, 'startTime', 'start_time')
+                        previous = existing_by_id.pop(sentence.get('id'), None)
+                        if previous is None:
+                            previous = existing_by_identity.get(
+                                self._identity(sentence.get('english'), start_time)
+                            )
+                            if previous is not None and previous['id'] not in existing_by_id:
+                                previous = None
+                            elif previous is not None:
+                                existing_by_id.pop(previous['id'])
+
+                        korean = sentence.get('korean')
+                        bookmarked = bool(self._value(sentence, 'isBookmarked', 'bookmark', False))
+                        verbs = sentence.get('detectedVerbs')
+                        if previous is not None:
+                            sentence_id = previous['id']
+                            korean = korean or previous['korean']
+                            bookmarked = bookmarked or bool(previous['isBookmarked'])
+                            verbs = verbs or previous['detectedVerbs']
+                            preserved += 1
+                        else:
+                            sentence_id = next_sentence_id
+                            next_sentence_id += 1
+
+                        sentence_rows.append((
+                            sentence_id, scene_id, sentence['english'], korean,
+                            start_time, self._value(sentence, 'endTime', 'end_time'),
+                            sentence['order'], bookmarked, sentence.get('confidence'), verbs
+                        ))
+
+            cursor.executemany('''
+                INSERT INTO Chapter (id, mediaId, title, startTime, endTime, `order`)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', chapter_rows)
+            cursor.executemany('''
+                INSERT INTO Scene (id, chapterId, title, startTime, endTime, `order`)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', scene_rows)
+            cursor.executemany('''
+                INSERT INTO Sentence (id, sceneId, english, korean, startTime, endTime, `order`,
+                                      isBookmarked, confidence, detectedVerbs)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', sentence_rows)
+            conn.commit()
+
+            logger.info(
+                f"Replaced structure for media {media_id}: {len(chapter_rows)} chapters, "
+                f"{len(scene_rows)} scenes, {len(sentence_rows)} sentences ({preserved} preserved)"
+            )
+        
+        if len(sentence_rows) + len(existing_by_id) >= self.BULK_WRITE_ROWS:
+            # Big rewrites leave a large WAL behind; fold it back while nothing else is pending
+            self.db.checkpoint('TRUNCATE', self.db.media_db_path(media_id))
+        
+        return {
+            'chapters': len(chapter_rows),
+            'scenes': len(scene_rows),
+            'sentences': len(sentence_rows),
+            'preserved': preserved
+        }
+
+    def delete_structure_batch(self, media_id: str, batch_size: int = 500) -> int:
+        """Delete up to ``batch_size`` structure rows of a media, sentences first.
+        
+        Keeps each write transaction short so a large media can be purged without
+        blocking other writers. Returns the number of rows deleted; 0 means none are
+        left. With media shards this is a no-op, the shard file goes with the media.
+        """
+        if self.db.shard_dir:
+            return 0
+        with self.db.get_media_connection(media_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                DELETE FROM Sentence WHERE id IN (
+                    SELECT s.id FROM Sentence s
+                    JOIN Scene sc ON s.sceneId = sc.id
+                    JOIN Chapter c ON sc.chapterId = c.id
+                    WHERE c.mediaId = ?
+                    LIMIT ?
+                )
+            ''', (media_id, batch_size))
+            deleted = cursor.rowcount
+            if deleted == 0:
+                cursor.execute('''
+                    DELETE FROM Scene WHERE id IN (
+                        SELECT sc.id FROM Scene sc
+                        JOIN Chapter c ON sc.chapterId = c.id
+                        WHERE c.mediaId = ?
+                        LIMIT ?
+                    )
+                ''', (media_id, batch_size))
+                deleted = cursor.rowcount
+            if deleted == 0:
+                cursor.execute(
+                    "DELETE FROM Chapter WHERE id IN (SELECT id FROM Chapter WHERE mediaId = ? LIMIT ?)",
+                    (media_id, batch_size)
+                )
+                deleted = cursor.rowcount
+            conn.commit()
+            return deleted
+    
+    @staticmethod
+    def _next_id(cursor, table: str) -> int:
+        """First free id of an AUTOINCREMENT table (caller must hold the write lock)"""
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+        row = cursor.fetchone()
+        sequence = row[0] if row else 0
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+        return max(sequence, cursor.fetchone()[0]) + 1
+
 class WordsRepository:
     """Repository for Words operations"""
     
@@ -600,10 +1404,148 @@ class WordsRepository:
             cursor.execute("SELECT COUNT(*) FROM Words")
             return cursor.fetchone()[0]
 
+class MaintenanceScheduler:
+    """Periodic online backups and compaction of the database files"""
+    
+    def __init__(self, db_manager: DatabaseManager, backup_dir: str = 'backups',
+                 backup_interval_hours: float = 24.0, maintenance_interval_minutes: float = 60.0,
+                 keep_backups: int = 7):
+        self.db = db_manager
+        self.backup_dir = backup_dir
+        self.backup_interval = backup_interval_hours * 3600
+        self.maintenance_interval = maintenance_interval_minutes * 60
+        self.keep_backups = keep_backups
+        self.last_backup: Optional[Dict] = None
+        self.last_maintenance: Optional[Dict] = None
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Start the scheduler thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Database maintenance scheduled (backup every {self.backup_interval / 3600:g}h, "
+            f"compaction every {self.maintenance_interval / 60:g}min)"
+        )
+    
+    def stop(self):
+        """Stop the scheduler thread"""
+        self._stop.set()
+    
+    def _run(self):
+        next_backup = time.time() + self.backup_interval
+        next_maintenance = time.time() + self.maintenance_interval
+        while not self._stop.wait(60):
+            try:
+                now = time.time()
+                if now >= next_backup:
+                    self.run_backup()
+                    # Full statistics refresh alongside the (rarer) backup
+                    self.run_maintenance(analyze=True)
+                    next_backup = now + self.backup_interval
+                    next_maintenance = now + self.maintenance_interval
+                elif now >= next_maintenance:
+                    self.run_maintenance()
+                    next_maintenance = now + self.maintenance_interval
+            except Exception as e:
+                logger.error(f"Scheduled database maintenance failed: {e}")
+    
+    def _database_files(self) -> List[str]:
+        return [self.db.db_path] + self.db.shard_paths()
+    
+    def run_backup(self) -> Dict[str, Any]:
+        """Back up the main database (and media shards) into a timestamped directory"""
+        with self._run_lock:
+            started = time.time()
+            target_dir = os.path.join(self.backup_dir, time.strftime('%Y%m%d-%H%M%S'))
+            files = []
+            for path in self._database_files():
+                relative = os.path.relpath(path, self.db.shard_dir) if path != self.db.db_path else None
+                target = (os.path.join(target_dir, 'shards', relative) if relative
+                          else os.path.join(target_dir, os.path.basename(path)))
+                files.append(self.db.backup(target, source_path=path))
+            
+            self._prune_backups()
+            self.last_backup = {
+                'path': target_dir,
+                'files': len(files),
+                'bytes': sum(item['bytes'] for item in files),
+                'seconds': round(time.time() - started, 3),
+                'finishedAt': time.strftime('%Y-%m-%dT%H:%M:%S')
+            }
+            logger.info(f"Database backup written to {target_dir} ({len(files)} files)")
+            return self.last_backup
+    
+    def _prune_backups(self):
+        """Keep only the newest ``keep_backups`` backup directories"""
+        backups = sorted(
+            name for name in os.listdir(self.backup_dir)
+            if os.path.isdir(os.path.join(self.backup_dir, name))
+        )
+        for name in backups[:-self.keep_backups]:
+            shutil.rmtree(os.path.join(self.backup_dir, name), ignore_errors=True)
+    
+    def run_maintenance(self, analyze: bool = False, convert: bool = False) -> Dict[str, Any]:
+        """Optimize, incrementally vacuum and checkpoint every database file.
+        
+        ``convert`` rewrites files not in incremental auto-vacuum mode yet with a
+        full VACUUM; the scheduler never asks for it, only an admin run does.
+        """
+        with self._run_lock:
+            started = time.time()
+            vacuumed_pages = 0
+            converted = 0
+            convertible = 0
+            for path in self._database_files():
+                result = self.db.optimize(analyze=analyze, db_path=path, convert=convert)
+                vacuumed_pages += result['vacuumed_pages']
+                converted += int(result['converted'])
+                convertible += int(result['convertible'])
+                self.db.checkpoint('TRUNCATE', db_path=path)
+            
+            self.last_maintenance = {
+                'analyzed': analyze,
+                'vacuumed_pages': vacuumed_pages,
+                'converted': converted,
+                'convertible': convertible,
+                'seconds': round(time.time() - started, 3),
+                'finishedAt': time.strftime('%Y-%m-%dT%H:%M:%S')
+            }
+            logger.info(f"Database maintenance done: {self.last_maintenance}")
+            return self.last_maintenance
+    
+    def status(self) -> Dict[str, Any]:
+        """Schedule and results of the last runs"""
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'backup_dir': self.backup_dir,
+            'backup_interval_hours': self.backup_interval / 3600,
+            'maintenance_interval_minutes': self.maintenance_interval / 60,
+            'last_backup': self.last_backup,
+            'last_maintenance': self.last_maintenance
+        }
+
 # Singleton instances
-db_manager = DatabaseManager()
+_slow_query_ms = os.environ.get('DB_SLOW_QUERY_MS')
+db_manager = DatabaseManager(
+    slow_query_ms=float(_slow_query_ms) if _slow_query_ms else None,
+    shard_dir=os.environ.get('DB_MEDIA_SHARD_DIR') or None,
+    cold_storage_dirs=os.environ.get('DB_SHARD_COLD_STORAGE_DIRS', '').split(os.pathsep)
+)
 media_repo = MediaRepository(db_manager)
 chapter_repo = ChapterRepository(db_manager)
 scene_repo = SceneRepository(db_manager)
 sentence_repo = SentenceRepository(db_manager)
-words_repo = WordsRepository(db_manager)
\ No newline at end of file
+structure_repo = StructureRepository(db_manager)
+words_repo = WordsRepository(db_manager)
+maintenance_scheduler = MaintenanceScheduler(
+    db_manager,
+    backup_dir=os.environ.get('DB_BACKUP_DIR', 'backups'),
+    backup_interval_hours=float(os.environ.get('DB_BACKUP_INTERVAL_HOURS', 24)),
+    maintenance_interval_minutes=float(os.environ.get('DB_MAINTENANCE_INTERVAL_MINUTES', 60))
+)
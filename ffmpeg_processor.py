@@ -2,14 +2,30 @@
 FFmpeg processing utilities for audio/video extraction and subtitle handling
 """
 import os
+import json
+import math
 import subprocess
 import uuid
 import logging
 import shutil
-from typing import Dict, List, Optional, Tuple, Union
+import tempfile
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache
+from queue import Queue, Empty
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 from pathlib import Path
 from enum import Enum
 
+from pcm_cache import pcm_cache
+
+# progress_callback(fraction done, ETA in seconds or None, speed factor or None)
+ProgressCallback = Callable[[float, Optional[float], Optional[float]], None]
+
 class FFmpegError(Exception):
     """Custom exception for FFmpeg operations"""
     pass
@@ -28,10 +44,46 @@ logger = logging.getLogger(__name__)
 class FFmpegProcessor:
     """Centralized FFmpeg operations processor"""
     
-    def __init__(self, fonts_dir: str = "fonts"):
+    # Clips written per ffmpeg process in extract_audio_segments (bounds open files
+    # and filter graph size)
+    MAX_CLIPS_PER_PASS = 64
+    
+    # Ranges joined by create_compilation (each one is its own seeked input)
+    MAX_COMPILATION_RANGES = 64
+    
+    # Seconds without encoding progress before an ffmpeg run is treated as hung
+    STALL_TIMEOUT = 60
+    
+    # The keyframe scan reads every packet of the file, which takes minutes on a long movie
+    KEYFRAME_SCAN_TIMEOUT = 1800
+    
+    # Re-encode settings of audio clips unless a caller passes its own
+    MP3_ENCODE_ARGS = ['-c:a', 'mp3', '-b:a', '128k']
+    
+    # Output extension -> source audio codec that can be stream-copied into it
+    COPYABLE_AUDIO_CODECS = {'.mp3': 'mp3', '.m4a': 'aac'}
+    
+    # Gain for media without a loudness measurement (the old fixed boost)
+    DEFAULT_VOLUME = 3.0
+    # Loudness clips are brought to (LUFS), without pushing true peaks past the limit (dBTP)
+    LOUDNESS_TARGET = -16.0
+    TRUE_PEAK_LIMIT = -1.0
+    
+    def __init__(self, fonts_dir: str = "fonts", still_size: str = "1920x1080",
+                 still_fps: float = 2, background_dir: str = "cache/backgrounds"):
         self.fonts_dir = fonts_dir
+        # Audio-only sources are rendered on a still background; subtitles of a
+        # sentence clip only change at event boundaries, so a couple of frames per
+        # second is enough
+        self.still_size = still_size
+        self.still_fps = still_fps
+        self.background_dir = background_dir
+        self._background_lock = threading.Lock()
         self.default_timeout = 120  # seconds
         self.chapter_timeout = 900  # seconds for longer operations
+        self._audio_codecs = {}  # (path, mtime) -> codec name
+        self._probes = {}  # (path, mtime) -> probe_media() result stored at ingest
+        self._volumes = {}  # (path, mtime) -> gain from the loudness measured at ingest
         self._validate_environment()
     
     def _validate_environment(self):
@@ -79,11 +131,329 @@ class FFmpegProcessor:
         duration_factor = max(1.0, duration / 60.0)  # At least 1x, more for longer content
         return int(base_timeout * duration_factor * 1.5)  # 50% buffer
     
+    def _run_with_progress(self, cmd: List[str], duration: float,
+                           progress_callback: Optional[ProgressCallback] = None,
+                           timeout: Optional[int] = None) -> subprocess.CompletedProcess:
+        """Run ffmpeg with ``-progress pipe:1`` and follow the encode as it goes.
+        
+        ``progress_callback`` is called with the fraction of ``duration`` encoded,
+        the ETA from the reported speed, and the speed itself. Instead of a guessed
+        wall-clock limit the run is killed when the output time stops advancing for
+        STALL_TIMEOUT seconds; ``timeout`` is an optional hard limit on top. Both
+        raise subprocess.TimeoutExpired, like subprocess.run.
+        """
+        cmd = [cmd[0], '-progress', 'pipe:1', '-nostats', *cmd[1:]]
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        
+        lines = Queue()
+        stderr_tail = deque(maxlen=200)
+        
+        def pump(stream, sink):
+            for line in stream:
+                sink(line)
+        
+        stdout_thread = threading.Thread(target=pump, args=(process.stdout, lines.put), daemon=True)
+        stderr_thread = threading.Thread(target=pump, args=(process.stderr, stderr_tail.append), daemon=True)
+        stdout_thread.start()
+        stderr_thread.start()
+        
+        started = last_advance = time.monotonic()
+        out_time, speed = 0.0, None
+        try:
+            while True:
+                try:
+                    line = lines.get(timeout=1)
+                except Empty:
+                    line = None
+                now = time.monotonic()
+                
+                if line is not None:
+                    key, _, value = line.strip().partition('=')
+                    # out_time_ms is in microseconds too (historical name)
+                    if key in ('out_time_us', 'out_time_ms') and value.isdigit():
+                        position = int(value) / 1_000_000
+                        if position > out_time:
+                            out_time, last_advance = position, now
+                    elif key == 'speed':
+                        try:
+                            speed = float(value.rstrip('x')) or None
+                        except ValueError:
+                            speed = None
+                    elif key == 'progress':
+                        if progress_callback and duration:
+                            remaining = max(0.0, duration - out_time)
+                            progress_callback(min(1.0, out_time / duration),
+                                              remaining / speed if speed else None, speed)
+                        if value == 'end':
+                            break
+                elif process.poll() is not None and not stdout_thread.is_alive():
+                    break
+                
+                if now - last_advance > self.STALL_TIMEOUT or (timeout and now - started > timeout):
+                    logger.error(f"FFmpeg made no progress for {now - last_advance:.0f}s at {out_time:.1f}s, killing it")
+                    process.kill()
+                    raise subprocess.TimeoutExpired(cmd, now - started)
+            
+            returncode = process.wait()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        
+        stderr_thread.join(timeout=5)
+        return subprocess.CompletedProcess(cmd, returncode, '', ''.join(stderr_tail))
+    
+    def probe_media(self, media_file: str, timeout: int = 60, keyframes: bool = True) -> Optional[Dict]:
+        """Probe duration, stream layout and video keyframe times of a media file
+        
+        Meant to run once at ingest: the result is stored with the media and handed
+        back through ``remember_probe``, so extraction does not probe again. The
+        keyframe scan has its own ``KEYFRAME_SCAN_TIMEOUT``; if it fails the probe
+        is still returned with ``keyframes`` None. With ``keyframes=False`` the scan
+        is left out (the key is missing) so it can run later via ``probe_keyframes``.
+        """
+        try:
+            result = subprocess.run([
+                'ffprobe', '-v', 'error',
+                '-print_format', 'json',
+                '-show_format', '-show_streams',
+                media_file
+            ], capture_output=True, text=True, timeout=timeout)
+            if result.returncode != 0:
+                logger.error(f"FFprobe error: {result.stderr}")
+                return None
+            data = json.loads(result.stdout)
+            
+            streams = []
+            for stream in data.get('streams', []):
+                info = {
+                    'index': stream['index'],
+                    'type': stream.get('codec_type'),
+                    'codec': stream.get('codec_name'),
+                    'language': stream.get('tags', {}).get('language')
+                }
+                if info['type'] == 'audio':
+                    info['sample_rate'] = int(stream.get('sample_rate') or 0) or None
+                    info['channels'] = stream.get('channels')
+                elif info['type'] == 'video':
+                    # Cover art of audio files is a video stream too
+                    info['attached_pic'] = bool(stream.get('disposition', {}).get('attached_pic'))
+                    info['width'] = stream.get('width')
+                    info['height'] = stream.get('height')
+                    info['frame_rate'] = stream.get('avg_frame_rate')
+                streams.append(info)
+            
+            audio = next((s for s in streams if s['type'] == 'audio'), None)
+            video = next((s for s in streams if s['type'] == 'video' and not s['attached_pic']), None)
+            probe = {
+                'duration': float(data['format']['duration']) if 'duration' in data['format'] else None,
+                'format': data['format'].get('format_name'),
+                'bit_rate': int(data['format'].get('bit_rate') or 0) or None,
+                'audio_codec': audio['codec'] if audio else None,
+                'sample_rate': audio['sample_rate'] if audio else None,
+                'channels': audio['channels'] if audio else None,
+                'video_codec': video['codec'] if video else None,
+                'width': video['width'] if video else None,
+                'height': video['height'] if video else None,
+                'streams': streams
+            }
+            if not video:
+                probe['keyframes'] = []
+            elif keyframes:
+                probe['keyframes'] = self.probe_keyframes(media_file, probe)
+            logger.info(f"Probed {media_file}: {probe['duration']}s, {len(probe.get('keyframes') or [])} keyframes")
+            return probe
+        
+        except subprocess.TimeoutExpired:
+            logger.error(f"FFprobe timeout probing {media_file}")
+            return None
+        except Exception as e:
+            logger.error(f"Error probing media {media_file}: {e}")
+            return None
+    
+    def probe_keyframes(self, media_file: str, probe: Dict) -> Optional[List[float]]:
+        """Keyframe timestamps of the video stream of a probe, read from packet flags (no decoding)
+        
+        None when the scan fails or exceeds ``KEYFRAME_SCAN_TIMEOUT``.
+        """
+        video = next((s for s in probe.get('streams', [])
+                      if s['type'] == 'video' and not s.get('attached_pic')), None)
+        if not video:
+            return []
+        try:
+            result = subprocess.run([
+                'ffprobe', '-v', 'error',
+                '-select_streams', str(video['index']),
+                '-show_entries', 'packet=pts_time,flags',
+                '-of', 'csv=p=0',
+                media_file
+            ], capture_output=True, text=True, timeout=self.KEYFRAME_SCAN_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            logger.warning(f"Keyframe scan of {media_file} timed out")
+            return None
+        except OSError as e:
+            logger.warning(f"Could not scan keyframes of {media_file}: {e}")
+            return None
+        if result.returncode != 0:
+            logger.warning(f"Could not read keyframes of {media_file}: {result.stderr.strip()}")
+            return None
+        
+        keyframes = []
+        for line in result.stdout.splitlines():
+            pts_time, _, flags = line.partition(',')
+            if 'K' in flags and pts_time not in ('', 'N/A'):
+                keyframes.append(round(float(pts_time), 3))
+        return sorted(keyframes)
+    
+    def remember_probe(self, media_file: str, probe: Dict):
+        """Use a stored probe_media() result for this file instead of running ffprobe"""
+        cache_key = (os.path.realpath(media_file), os.path.getmtime(media_file))
+        self._probes[cache_key] = probe
+    
+    def get_probe(self, media_file: str) -> Optional[Dict]:
+        """Probe handed over with remember_probe, if any"""
+        try:
+            return self._probes.get((os.path.realpath(media_file), os.path.getmtime(media_file)))
+        except OSError:
+            return None
+    
+    def keyframe_before(self, media_file: str, time: float) -> Optional[float]:
+        """Last video keyframe at or before ``time``, when the keyframe index is known"""
+        probe = self.get_probe(media_file)
+        if not probe or not probe.get('keyframes'):
+            return None
+        position = bisect_right(probe['keyframes'], time + 0.001)
+        return probe['keyframes'][position - 1] if position else None
+    
+    def measure_loudness(self, media_file: str, duration: Optional[float] = None,
+                         progress_callback: Optional[ProgressCallback] = None) -> Optional[Dict]:
+        """EBU R128 integrated loudness, true peak and loudness range of the whole file.
+        
+        One analysis pass of the ``loudnorm`` filter (nothing is written); the result
+        is meant to be stored with the media and turned into a clip gain by
+        ``loudness_gain``.
+        """
+        cmd = [
+            'ffmpeg',
+            '-i', media_file,
+            '-vn',
+            '-af', f'loudnorm=I={self.LOUDNESS_TARGET}:TP={self.TRUE_PEAK_LIMIT}:print_format=json',
+            '-f', 'null', '-'
+        ]
+        try:
+            result = self._run_with_progress(cmd, duration or 0, progress_callback)
+        except subprocess.TimeoutExpired:
+            logger.error(f"FFmpeg stalled measuring loudness of {media_file}")
+            return None
+        
+        if result.returncode != 0:
+            logger.error(f"FFmpeg error measuring loudness of {media_file}: {result.stderr[-500:]}")
+            return None
+        
+        # The measurement is the last JSON object printed by loudnorm
+        report = result.stderr[result.stderr.rfind('{'):result.stderr.rfind('}') + 1]
+        try:
+            values = json.loads(report)
+            loudness = {
+                'integrated': float(values['input_i']),
+                'true_peak': float(values['input_tp']),
+                'range': float(values['input_lra']),
+                'threshold': float(values['input_thresh'])
+            }
+        except (ValueError, KeyError) as e:
+            logger.error(f"Could not read loudness of {media_file}: {e}")
+            return None
+        
+        logger.info(f"Loudness of {media_file}: {loudness['integrated']} LUFS, {loudness['true_peak']} dBTP")
+        return loudness
+    
+    @classmethod
+    def loudness_gain(cls, loudness: Dict) -> float:
+        """Volume factor bringing a measured media to LOUDNESS_TARGET, peak-limited"""
+        # Silence measures -inf (or -70) LUFS; leave such files alone
+        if not math.isfinite(loudness['integrated']) or loudness['integrated'] <= -70:
+            return 1.0
+        gain_db = cls.LOUDNESS_TARGET - loudness['integrated']
+        if math.isfinite(loudness['true_peak']):
+            gain_db = min(gain_db, cls.TRUE_PEAK_LIMIT - loudness['true_peak'])
+        return min(10.0, max(0.1, 10 ** (gain_db / 20)))
+    
+    def remember_loudness(self, media_file: str, loudness: Dict):
+        """Apply the gain of a stored measurement to every clip of this file"""
+        cache_key = (os.path.realpath(media_file), os.path.getmtime(media_file))
+        self._volumes[cache_key] = self.loudness_gain(loudness)
+    
+    def volume_for(self, media_file: str) -> float:
+        """Gain for clips of media_file: from its loudness if known, else DEFAULT_VOLUME"""
+        try:
+            cache_key = (os.path.realpath(media_file), os.path.getmtime(media_file))
+        except OSError:
+            return self.DEFAULT_VOLUME
+        return self._volumes.get(cache_key, self.DEFAULT_VOLUME)
+    
+    def get_audio_codec(self, media_file: str) -> Optional[str]:
+        """Get codec name of the first audio stream (cached per file version)"""
+        probe = self.get_probe(media_file)
+        if probe:
+            return probe.get('audio_codec')
+        
+        cache_key = (os.path.realpath(media_file), os.path.getmtime(media_file))
+        if cache_key in self._audio_codecs:
+            return self._audio_codecs[cache_key]
+        
+        codec = None
+        try:
+            result = subprocess.run([
+                'ffprobe', '-v', 'error',
+                '-select_streams', 'a:0',
+                '-show_entries', 'stream=codec_name',
+                '-of', 'csv=p=0',
+                media_file
+            ], capture_output=True, text=True, timeout=30)
+            if result.returncode == 0:
+                codec = result.stdout.strip() or None
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Could not probe audio codec of {media_file}: {e}")
+            # Without ffprobe, trust the extension
+            codec = self.COPYABLE_AUDIO_CODECS.get(Path(media_file).suffix.lower())
+        
+        self._audio_codecs[cache_key] = codec
+        return codec
+    
+    def can_stream_copy_audio(self, input_file: str, output_file: str) -> bool:
+        """Check whether the source audio can be cut into output_file without re-encoding"""
+        wanted = self.COPYABLE_AUDIO_CODECS.get(Path(output_file).suffix.lower())
+        return wanted is not None and self.get_audio_codec(input_file) == wanted
+    
+    @staticmethod
+    def _replaygain_args(volume: float, output_file: str) -> List[str]:
+        """ReplayGain tag carrying a volume factor, for players to apply at playback"""
+        if volume <= 0 or volume == 1.0:
+            return []
+        gain_db = 20 * math.log10(volume)
+        args = ['-metadata', f'REPLAYGAIN_TRACK_GAIN={gain_db:+.2f} dB']
+        if Path(output_file).suffix.lower() == '.mp3':
+            args += ['-id3v2_version', '3']
+        else:
+            # MP4 only keeps custom keys as freeform tags with this flag
+            args += ['-movflags', 'use_metadata_tags']
+        return args
+    
     def extract_audio_segment(self, input_file: str, output_file: str, 
                             start_time: float, duration: float, 
-                            volume: float = 3.0, timeout: int = None) -> bool:
-        """Extract audio segment from media file with comprehensive error handling"""
+                            volume: Optional[float] = None, timeout: int = None,
+                            stream_copy: bool = False,
+                            encode_args: Optional[List[str]] = None) -> bool:
+        """Extract audio segment from media file with comprehensive error handling
+        
+        With ``stream_copy`` the segment is cut without re-encoding when the source
+        codec matches the output format; ``volume`` is then written as ReplayGain
+        metadata instead of being applied by a filter. Otherwise (or if the copy
+        fails) the segment is re-encoded with the volume filter, to MP3 unless
+        ``encode_args`` gives other codec settings.
+        """
         try:
+            volume = self.volume_for(input_file) if volume is None else volume
             # Validate inputs
             self._validate_input_file(input_file)
             self._validate_output_path(output_file)
@@ -97,14 +467,20 @@ class FFmpegProcessor:
             # Calculate appropriate timeout
             actual_timeout = timeout or self._calculate_timeout(duration)
             
+            copy_audio = stream_copy and self.can_stream_copy_audio(input_file, output_file)
+            if copy_audio:
+                # Lossless cut of whole frames; drop source tags and cover art
+                codec_args = ['-map', '0:a:0', '-c:a', 'copy', '-map_metadata', '-1']
+                codec_args += self._replaygain_args(volume, output_file)
+            else:
+                codec_args = ['-af', f'volume={volume}'] + (encode_args or self.MP3_ENCODE_ARGS)
+            
             cmd = [
                 'ffmpeg',
                 '-ss', str(start_time),
                 '-i', input_file,
                 '-t', str(duration),
-                '-af', f'volume={volume}',
-                '-c:a', 'mp3',
-                '-b:a', '128k',
+                *codec_args,
                 '-avoid_negative_ts', 'make_zero',  # Handle negative timestamps
                 '-y',
                 output_file
@@ -127,6 +503,12 @@ class FFmpegProcessor:
                 return True
             else:
                 error_msg = result.stderr.strip() if result.stderr else "Unknown FFmpeg error"
+                if copy_audio:
+                    logger.warning(f"Stream copy failed, re-encoding {output_file}: {error_msg}")
+                    return self.extract_audio_segment(
+                        input_file, output_file, start_time, duration, volume, timeout,
+                        encode_args=encode_args
+                    )
                 logger.error(f"FFmpeg failed with return code {result.returncode}: {error_msg}")
                 raise FFmpegError(f"FFmpeg processing failed: {error_msg}")
                 
@@ -152,12 +534,173 @@ class FFmpegProcessor:
         
         return False
     
+    def split_audio_segment(self, input_file: str, output_pattern: str,
+                            start_time: float, duration: float, segment_times: List[float],
+                            volume: Optional[float] = None, timeout: int = None,
+                            progress_callback: Optional[ProgressCallback] = None) -> bool:
+        """Encode one stretch of audio to MP3 and split it with the segment muxer
+        
+        ``segment_times`` are seconds from ``start_time``; ``output_pattern`` names
+        the pieces, e.g. ``part_%03d.mp3`` (a plain file name without cut points).
+        The stretch is decoded once however many pieces it is cut into.
+        """
+        try:
+            volume = self.volume_for(input_file) if volume is None else volume
+            self._validate_input_file(input_file)
+            self._validate_output_path(output_pattern)
+            
+            cmd = [
+                'ffmpeg',
+                '-ss', str(start_time),
+                '-i', input_file,
+                '-t', str(duration),
+                '-vn',
+                '-af', f'volume={volume}',
+                *self.MP3_ENCODE_ARGS
+            ]
+            if segment_times:
+                cmd.extend([
+                    '-f', 'segment',
+                    '-segment_times', ','.join(f'{t:.3f}' for t in segment_times),
+                    '-reset_timestamps', '1'
+                ])
+            cmd.extend(['-y', output_pattern])
+            
+            result = self._run_with_progress(cmd, duration, progress_callback, timeout)
+            
+            if result.returncode == 0:
+                logger.info(f"Audio split into {len(segment_times) + 1} pieces: {output_pattern}")
+                return True
+            else:
+                logger.error(f"FFmpeg error: {result.stderr}")
+                return False
+        
+        except subprocess.TimeoutExpired:
+            logger.error(f"FFmpeg timeout splitting audio")
+            return False
+        except Exception as e:
+            logger.error(f"Error splitting audio: {e}")
+            return False
+    
+    def extract_audio_segments(self, input_file: str,
+                               segments: List[Tuple[float, float, str]],
+                               volume: Optional[float] = None,
+                               encode_args: Optional[List[str]] = None) -> List[bool]:
+        """Extract many audio segments with a single decode of the source.
+        
+        ``segments`` is a list of ``(start_time, duration, output_file)``. Segments are
+        cut from one decoded stream through an ``asplit``/``atrim`` filter graph, one
+        ffmpeg process per ``MAX_CLIPS_PER_PASS`` clips instead of one per clip. If a
+        pass fails, its clips are retried one at a time. Returns the success of every
+        segment in input order. Clips are MP3 unless ``encode_args`` gives other codec
+        settings.
+        
+        When the full-rate PCM cache of the source exists, every segment is a slice of
+        it and ffmpeg only encodes.
+        """
+        self._validate_input_file(input_file)
+        results = [False] * len(segments)
+        volume = self.volume_for(input_file) if volume is None else volume
+        encode_args = encode_args or self.MP3_ENCODE_ARGS
+        
+        if pcm_cache.has_full_rate(input_file):
+            output_args = ['-af', f'volume={volume}'] + encode_args
+            for i, (start_time, duration, output_file) in enumerate(segments):
+                if start_time < 0 or duration <= 0:
+                    logger.error(f"Invalid time parameters: start={start_time}, duration={duration}")
+                    continue
+                self._validate_output_path(output_file)
+                results[i] = pcm_cache.encode_clip(input_file, output_file, start_time, duration, output_args)
+            logger.info(f"Encoded {sum(results)}/{len(segments)} audio segments from the PCM cache of {input_file}")
+            return results
+        
+        order = sorted(range(len(segments)), key=lambda index: segments[index][0])
+        for chunk_start in range(0, len(order), self.MAX_CLIPS_PER_PASS):
+            chunk = order[chunk_start:chunk_start + self.MAX_CLIPS_PER_PASS]
+            try:
+                chunk_results = self._extract_audio_pass(input_file, [segments[i] for i in chunk],
+                                                         volume, encode_args)
+            except FFmpegError as e:
+                logger.warning(f"Single-pass extraction failed, retrying {len(chunk)} clips one by one: {e}")
+                chunk_results = []
+                for i in chunk:
+                    start_time, duration, output_file = segments[i]
+                    try:
+                        chunk_results.append(
+                            self.extract_audio_segment(input_file, output_file, start_time, duration, volume,
+                                                       encode_args=encode_args)
+                        )
+                    except FFmpegError as clip_error:
+                        logger.error(f"Failed to extract {output_file}: {clip_error}")
+                        chunk_results.append(False)
+            
+            for i, success in zip(chunk, chunk_results):
+                results[i] = success
+        
+        logger.info(f"Extracted {sum(results)}/{len(segments)} audio segments from {input_file}")
+        return results
+    
+    def _extract_audio_pass(self, input_file: str, segments: List[Tuple[float, float, str]],
+                            volume: float, encode_args: List[str]) -> List[bool]:
+        """Write segments (sorted by start) from one ffmpeg process"""
+        for start_time, duration, output_file in segments:
+            if start_time < 0 or duration <= 0:
+                raise FFmpegError(f"Invalid time parameters: start={start_time}, duration={duration}")
+            self._validate_output_path(output_file)
+        
+        # Seek the input to the first clip; trims are relative to that point
+        seek = segments[0][0]
+        span = max(start + duration for start, duration, _ in segments) - seek
+        
+        labels = ''.join(f'[s{i}]' for i in range(len(segments)))
+        filters = [f'[0:a]asplit={len(segments)}{labels}' if len(segments) > 1 else '[0:a]anull[s0]']
+        output_args = []
+        for i, (start_time, duration, output_file) in enumerate(segments):
+            filters.append(
+                f'[s{i}]atrim=start={start_time - seek:.3f}:duration={duration:.3f},'
+                f'asetpts=PTS-STARTPTS,volume={volume}[a{i}]'
+            )
+            output_args.extend(['-map', f'[a{i}]'] + encode_args + [output_file])
+        
+        cmd = [
+            'ffmpeg',
+            '-ss', str(seek),
+            '-i', input_file,
+            '-vn',
+            '-filter_complex', ';'.join(filters),
+            '-y'
+        ] + output_args
+        
+        actual_timeout = self._calculate_timeout(span)
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=actual_timeout)
+        except subprocess.TimeoutExpired:
+            raise FFmpegError(f"FFmpeg timeout ({actual_timeout}s) extracting {len(segments)} audio segments")
+        
+        if result.returncode != 0:
+            error_msg = result.stderr.strip() if result.stderr else "Unknown FFmpeg error"
+            raise FFmpegError(f"FFmpeg processing failed: {error_msg[-500:]}")
+        
+        return [
+            os.path.exists(output_file) and os.path.getsize(output_file) > 0
+            for _, _, output_file in segments
+        ]
+    
     def extract_video_segment(self, input_file: str, output_file: str,
                             start_time: float, duration: float,
                             subtitle_file: Optional[str] = None,
-                            volume: float = 3.0, timeout: int = None) -> bool:
-        """Extract video segment with optional subtitles"""
+                            volume: Optional[float] = None, timeout: int = None,
+                            threads: Optional[int] = None,
+                            segment_times: Optional[List[float]] = None,
+                            progress_callback: Optional[ProgressCallback] = None) -> bool:
+        """Extract video segment with optional subtitles
+        
+        With ``segment_times`` (seconds from ``start_time``) the encode is split at
+        those points into several files: keyframes are forced there so the split
+        is exact, and ``output_file`` must be a pattern such as ``part_%03d.mp4``.
+        """
         try:
+            volume = self.volume_for(input_file) if volume is None else volume
             cmd = [
                 'ffmpeg',
                 '-ss', str(start_time),
@@ -176,10 +719,209 @@ class FFmpegProcessor:
                 '-crf', '23',
                 '-pix_fmt', 'yuv420p',
                 '-c:a', 'aac',
-                '-b:a', '128k',
-                '-y',
-                output_file
+                '-b:a', '128k'
             ])
+            if threads:
+                cmd.extend(['-threads', str(threads)])
+            if segment_times:
+                times = ','.join(f'{t:.3f}' for t in segment_times)
+                cmd.extend([
+                    '-force_key_frames', times,
+                    '-f', 'segment',
+                    '-segment_times', times,
+                    '-reset_timestamps', '1'
+                ])
+            cmd.extend(['-y', output_file])
+            
+            result = self._run_with_progress(cmd, duration, progress_callback, timeout)
+            
+            if result.returncode == 0:
+                logger.info(f"Video segment extracted: {output_file}")
+                return True
+            else:
+                logger.error(f"FFmpeg error: {result.stderr}")
+                return False
+                
+        except subprocess.TimeoutExpired:
+            logger.error(f"FFmpeg timeout extracting video segment")
+            return False
+        except Exception as e:
+            logger.error(f"Error extracting video segment: {e}")
+            return False
+    
+    def extract_video_segments(self, input_file: str,
+                               segments: List[Tuple[float, float, str, Optional[str]]],
+                               volume: Optional[float] = None, threads: Optional[int] = None) -> List[bool]:
+        """Extract several nearby video segments with a single decode of the source.
+        
+        ``segments`` is a list of ``(start_time, duration, output_file, subtitle_file)``.
+        The window covering all segments is decoded once and fanned out through
+        ``split``/``asplit``; every branch is trimmed, gets its own subtitle overlay and
+        its own encoder. Segments may overlap. Callers should keep the window short
+        (see ``MediaExtractor.plan_decode_windows``) since gaps are decoded too. If the
+        pass fails, its segments are retried one at a time. Returns the success of
+        every segment in input order.
+        """
+        self._validate_input_file(input_file)
+        if not segments:
+            return []
+        volume = self.volume_for(input_file) if volume is None else volume
+        
+        order = sorted(range(len(segments)), key=lambda index: segments[index][0])
+        try:
+            sorted_results = self._extract_video_pass(input_file, [segments[i] for i in order], volume, threads)
+        except FFmpegError as e:
+            logger.warning(f"Shared-decode extraction failed, retrying {len(segments)} clips one by one: {e}")
+            sorted_results = [
+                self.extract_video_segment(input_file, output_file, start_time, duration,
+                                           subtitle_file, volume, threads=threads)
+                for start_time, duration, output_file, subtitle_file in (segments[i] for i in order)
+            ]
+        
+        results = [False] * len(segments)
+        for i, success in zip(order, sorted_results):
+            results[i] = success
+        return results
+    
+    def _extract_video_pass(self, input_file: str,
+                            segments: List[Tuple[float, float, str, Optional[str]]],
+                            volume: float, threads: Optional[int]) -> List[bool]:
+        """Write segments (sorted by start) from one ffmpeg process"""
+        for start_time, duration, output_file, _ in segments:
+            if start_time < 0 or duration <= 0:
+                raise FFmpegError(f"Invalid time parameters: start={start_time}, duration={duration}")
+            self._validate_output_path(output_file)
+        
+        # Seek the input to the first clip and stop decoding after the last one;
+        # trims are relative to the seek point
+        seek = segments[0][0]
+        span = max(start + duration for start, duration, _, _ in segments) - seek
+        
+        count = len(segments)
+        video_labels = ''.join(f'[v{i}]' for i in range(count))
+        audio_labels = ''.join(f'[s{i}]' for i in range(count))
+        filters = [
+            f'[0:v]split={count}{video_labels}' if count > 1 else '[0:v]null[v0]',
+            f'[0:a]asplit={count}{audio_labels}' if count > 1 else '[0:a]anull[s0]'
+        ]
+        output_args = []
+        for i, (start_time, duration, output_file, subtitle_file) in enumerate(segments):
+            trim = f'start={start_time - seek:.3f}:duration={duration:.3f}'
+            video_chain = f'[v{i}]trim={trim},setpts=PTS-STARTPTS'
+            if subtitle_file:
+                video_chain += f',subtitles={subtitle_file}:fontsdir={self.fonts_dir}'
+            filters.append(f'{video_chain}[vo{i}]')
+            filters.append(f'[s{i}]atrim={trim},asetpts=PTS-STARTPTS,volume={volume}[ao{i}]')
+            
+            output_args.extend([
+                '-map', f'[vo{i}]', '-map', f'[ao{i}]',
+                '-c:v', 'libx264',
+                '-preset', 'fast',
+                '-crf', '23',
+                '-pix_fmt', 'yuv420p',
+                '-c:a', 'aac',
+                '-b:a', '128k'
+            ])
+            if threads:
+                output_args.extend(['-threads', str(threads)])
+            output_args.append(output_file)
+        
+        cmd = [
+            'ffmpeg',
+            '-ss', str(seek),
+            '-t', f'{span:.3f}',
+            '-i', input_file,
+            '-filter_complex', ';'.join(filters),
+            '-y'
+        ] + output_args
+        
+        try:
+            result = self._run_with_progress(cmd, span)
+        except subprocess.TimeoutExpired:
+            raise FFmpegError(f"FFmpeg stalled extracting {count} video segments")
+        
+        if result.returncode != 0:
+            error_msg = result.stderr.strip() if result.stderr else "Unknown FFmpeg error"
+            raise FFmpegError(f"FFmpeg processing failed: {error_msg[-500:]}")
+        
+        logger.info(f"Extracted {count} video segments with one decode from {input_file}")
+        return [
+            os.path.exists(output_file) and os.path.getsize(output_file) > 0
+            for _, _, output_file, _ in segments
+        ]
+    
+    @property
+    def still_video_profile(self) -> str:
+        """Settings that determine the picture of audio-to-video clips"""
+        return f"{self.still_size}@{self.still_fps}"
+    
+    def get_still_background(self, color: str = 'black') -> str:
+        """Path of a pre-rendered background image, rendered once per color and size"""
+        background = os.path.join(self.background_dir, f"{color}_{self.still_size}.png")
+        with self._background_lock:
+            if not os.path.exists(background):
+                os.makedirs(self.background_dir, exist_ok=True)
+                partial = f"{background}.partial.png"
+                result = subprocess.run([
+                    'ffmpeg',
+                    '-f', 'lavfi',
+                    '-i', f'color={color}:size={self.still_size}',
+                    '-frames:v', '1',
+                    '-y', partial
+                ], capture_output=True, text=True, timeout=30)
+                if result.returncode != 0:
+                    raise FFmpegError(f"Failed to render background: {result.stderr.strip()}")
+                os.replace(partial, background)
+                logger.info(f"Rendered still background: {background}")
+        return background
+    
+    @staticmethod
+    def _soft_subtitle_args(subtitle_tracks: List[Tuple[str, str]],
+                            first_input: int) -> Tuple[List[str], List[str]]:
+        """Input and output arguments muxing subtitle files as mov_text tracks.
+        
+        ``subtitle_tracks`` is a list of ``(subtitle_file, language)``; the files
+        become inputs ``first_input`` onwards.
+        """
+        input_args, output_args = [], []
+        for index, (subtitle_file, language) in enumerate(subtitle_tracks):
+            input_args.extend(['-i', subtitle_file])
+            output_args.extend([
+                '-map', f'{first_input + index}:0',
+                f'-metadata:s:s:{index}', f'language={language}'
+            ])
+        if subtitle_tracks:
+            output_args.extend(['-c:s', 'mov_text', '-disposition:s:0', 'default'])
+        return input_args, output_args
+    
+    def extract_video_segment_soft(self, input_file: str, output_file: str,
+                                   start_time: float, duration: float,
+                                   subtitle_tracks: Optional[List[Tuple[str, str]]] = None,
+                                   volume: Optional[float] = None, timeout: int = None) -> bool:
+        """Cut a video segment without re-encoding, with soft subtitle tracks
+        
+        Video and audio are stream-copied. Decoding starts at the keyframe before
+        ``start_time`` and the MP4 edit list hides the lead-in, so playback starts
+        at ``start_time`` and the subtitle tracks (timed from 0) stay in sync.
+        ``volume`` is written as ReplayGain metadata since the audio is not touched.
+        """
+        try:
+            volume = self.volume_for(input_file) if volume is None else volume
+            subtitle_inputs, subtitle_outputs = self._soft_subtitle_args(subtitle_tracks or [], 1)
+            cmd = [
+                'ffmpeg',
+                '-ss', str(start_time),
+                '-i', input_file,
+                *subtitle_inputs,
+                '-t', str(duration),
+                '-map', '0:v:0',
+                '-map', '0:a:0?',
+                *subtitle_outputs,
+                '-c:v', 'copy',
+                '-c:a', 'copy',
+                *self._replaygain_args(volume, output_file),
+                '-y', output_file
+            ]
             
             result = subprocess.run(
                 cmd,
@@ -189,31 +931,46 @@ class FFmpegProcessor:
             )
             
             if result.returncode == 0:
-                logger.info(f"Video segment extracted: {output_file}")
+                logger.info(f"Video segment copied with soft subtitles: {output_file}")
                 return True
             else:
                 logger.error(f"FFmpeg error: {result.stderr}")
                 return False
-                
+        
         except subprocess.TimeoutExpired:
-            logger.error(f"FFmpeg timeout extracting video segment")
+            logger.error(f"FFmpeg timeout copying video segment")
             return False
         except Exception as e:
-            logger.error(f"Error extracting video segment: {e}")
+            logger.error(f"Error copying video segment: {e}")
             return False
     
     def create_video_from_audio(self, audio_file: str, output_file: str,
                               start_time: float, duration: float,
                               subtitle_file: Optional[str] = None,
-                              volume: float = 3.0, timeout: int = None) -> bool:
-        """Create video with black background from audio file"""
+                              volume: Optional[float] = None, timeout: int = None,
+                              threads: Optional[int] = None,
+                              subtitle_tracks: Optional[List[Tuple[str, str]]] = None,
+                              progress_callback: Optional[ProgressCallback] = None,
+                              segment_times: Optional[List[float]] = None) -> bool:
+        """Create video with black background from audio file
+        
+        The cached background image is looped at ``still_fps`` and encoded with
+        still-image tuning, so almost all of the work is the audio encode.
+        ``subtitle_file`` is burned in; ``subtitle_tracks`` are muxed as soft
+        subtitles (see ``_soft_subtitle_args``). ``segment_times`` splits the
+        output like in ``extract_video_segment``.
+        """
         try:
+            volume = self.volume_for(audio_file) if volume is None else volume
+            subtitle_inputs, subtitle_outputs = self._soft_subtitle_args(subtitle_tracks or [], 2)
             cmd = [
                 'ffmpeg',
-                '-f', 'lavfi',
-                '-i', f'color=black:size=1920x1080:duration={duration}:rate=30',
+                '-loop', '1',
+                '-framerate', str(self.still_fps),
+                '-i', self.get_still_background(),
                 '-ss', str(start_time),
                 '-i', audio_file,
+                *subtitle_inputs,
                 '-t', str(duration)
             ]
             
@@ -226,26 +983,35 @@ class FFmpegProcessor:
                 ])
             else:
                 cmd.extend(['-map', '0:v', '-map', '1:a'])
+            cmd.extend(subtitle_outputs)
             
             cmd.extend([
                 '-af', f'volume={volume}',
                 '-c:v', 'libx264',
-                '-preset', 'fast',
+                '-preset', 'veryfast',
+                '-tune', 'stillimage',
                 '-crf', '23',
+                '-r', str(self.still_fps),
                 '-pix_fmt', 'yuv420p',
                 '-c:a', 'aac',
                 '-b:a', '128k',
-                '-shortest',
-                '-y',
-                output_file
+                '-shortest'
             ])
+            if threads:
+                cmd.extend(['-threads', str(threads)])
+            if segment_times:
+                times = ','.join(f'{t:.3f}' for t in segment_times)
+                cmd.extend([
+                    # At still_fps the B-frame delay would shift the first piece by a second
+                    '-bf', '0',
+                    '-force_key_frames', times,
+                    '-f', 'segment',
+                    '-segment_times', times,
+                    '-reset_timestamps', '1'
+                ])
+            cmd.extend(['-y', output_file])
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout or self.default_timeout
-            )
+            result = self._run_with_progress(cmd, duration, progress_callback, timeout)
             
             if result.returncode == 0:
                 logger.info(f"Video from audio created: {output_file}")
@@ -261,8 +1027,155 @@ class FFmpegProcessor:
             logger.error(f"Error creating video from audio: {e}")
             return False
     
-    def extract_audio_from_video(self, video_file: str, audio_file: str) -> bool:
-        """Extract audio track from video file"""
+    @staticmethod
+    def compilation_timeline(ranges: List[Tuple[float, float]], repeat: int = 1,
+                             gap: float = 0.0) -> List[Tuple[float, float, int]]:
+        """Position of every piece of a compilation as ``(offset, duration, range_index)``"""
+        timeline = []
+        offset = 0.0
+        for index, (start, end) in enumerate(ranges):
+            duration = end - start
+            for _ in range(repeat):
+                timeline.append((offset, duration, index))
+                offset += duration + gap
+        return timeline
+    
+    def create_compilation(self, input_file: str, output_file: str,
+                           ranges: List[Tuple[float, float]], repeat: int = 1,
+                           gap: float = 0.0, is_video_file: bool = True,
+                           subtitle_file: Optional[str] = None,
+                           subtitle_tracks: Optional[List[Tuple[str, str]]] = None,
+                           volume: Optional[float] = None, timeout: int = None,
+                           progress_callback: Optional[ProgressCallback] = None) -> bool:
+        """Join time ranges of one source into a single file in one ffmpeg pass
+        
+        Each range is read through its own input seek, followed by ``gap`` seconds
+        of silence (and black for video), split ``repeat`` times and joined with
+        the concat filter. An .mp3 output is audio only; other outputs are MP4,
+        on the still background for audio sources. ``subtitle_file`` is burned in
+        and ``subtitle_tracks`` are muxed as soft tracks; both must be timed to the
+        compilation (see ``compilation_timeline``).
+        """
+        try:
+            if not ranges or repeat < 1:
+                raise FFmpegError("Nothing to compile")
+            if len(ranges) > self.MAX_COMPILATION_RANGES:
+                raise FFmpegError(f"Too many ranges to compile: {len(ranges)} > {self.MAX_COMPILATION_RANGES}")
+            volume = self.volume_for(input_file) if volume is None else volume
+            self._validate_input_file(input_file)
+            self._validate_output_path(output_file)
+            
+            audio_only = Path(output_file).suffix.lower() == '.mp3'
+            with_video = is_video_file and not audio_only
+            total = self.compilation_timeline(ranges, repeat, gap)[-1]
+            total_duration = total[0] + total[1] + gap
+            
+            cmd = ['ffmpeg']
+            filters = []
+            pieces = []
+            for index, (start, end) in enumerate(ranges):
+                cmd.extend(['-ss', str(start), '-t', str(end - start), '-i', input_file])
+                
+                audio_chain = f'[{index}:a]asetpts=PTS-STARTPTS,volume={volume}'
+                if gap > 0:
+                    audio_chain += f',apad=pad_dur={gap}'
+                video_chain = f'[{index}:v]setpts=PTS-STARTPTS'
+                if gap > 0:
+                    video_chain += f',tpad=stop_mode=add:stop_duration={gap}:color=black'
+                
+                labels = [f'{index}_{copy}' for copy in range(repeat)]
+                chains = [('a', audio_chain, 'asplit')]
+                if with_video:
+                    chains.insert(0, ('v', video_chain, 'split'))
+                for kind, chain, split in chains:
+                    if repeat > 1:
+                        chain += f",{split}={repeat}" + ''.join(f'[{kind}{label}]' for label in labels)
+                    else:
+                        chain += f'[{kind}{labels[0]}]'
+                    filters.append(chain)
+                for label in labels:
+                    pieces.append(f'[v{label}][a{label}]' if with_video else f'[a{label}]')
+            
+            # concat wants the pieces in output order: range by range, copy by copy
+            filters.append(
+                ''.join(pieces) +
+                f"concat=n={len(pieces)}:v={1 if with_video else 0}:a=1" +
+                ('[vcat]' if with_video else '') + '[aout]'
+            )
+            
+            video_label = None
+            if with_video:
+                video_label = '[vcat]'
+            elif not audio_only:
+                # Audio source rendered as video: one looped still for the whole length
+                background_input = len(ranges)
+                cmd.extend([
+                    '-loop', '1',
+                    '-framerate', str(self.still_fps),
+                    '-t', str(total_duration),
+                    '-i', self.get_still_background()
+                ])
+                video_label = f'[{background_input}:v]'
+            
+            if video_label and subtitle_file:
+                filters.append(f"{video_label}subtitles={subtitle_file}:fontsdir={self.fonts_dir}[vout]")
+                video_label = '[vout]'
+            elif video_label and not with_video:
+                # A bracketed -map names a filtergraph output, so the still goes through the graph
+                filters.append(f"{video_label}null[vout]")
+                video_label = '[vout]'
+            
+            subtitle_inputs, subtitle_outputs = [], []
+            if video_label:
+                first_subtitle_input = len(ranges) + (0 if with_video else 1)
+                subtitle_inputs, subtitle_outputs = self._soft_subtitle_args(
+                    subtitle_tracks or [], first_subtitle_input
+                )
+            cmd.extend(subtitle_inputs)
+            cmd.extend(['-filter_complex', ';'.join(filters)])
+            
+            if audio_only:
+                cmd.extend(['-map', '[aout]', '-c:a', 'mp3', '-b:a', '128k'])
+            else:
+                cmd.extend(['-map', video_label, '-map', '[aout]', *subtitle_outputs])
+                if with_video:
+                    cmd.extend(['-c:v', 'libx264', '-preset', 'fast', '-crf', '23'])
+                else:
+                    cmd.extend([
+                        '-c:v', 'libx264', '-preset', 'veryfast', '-tune', 'stillimage',
+                        '-crf', '23', '-r', str(self.still_fps)
+                    ])
+                cmd.extend(['-pix_fmt', 'yuv420p', '-c:a', 'aac', '-b:a', '128k'])
+            cmd.extend(['-t', str(total_duration), '-y', output_file])
+            
+            logger.info(f"Compiling {len(ranges)} ranges x{repeat} ({total_duration:.1f}s) into {output_file}")
+            result = self._run_with_progress(cmd, total_duration, progress_callback, timeout)
+            
+            if result.returncode == 0:
+                logger.info(f"Compilation created: {output_file}")
+                return True
+            else:
+                logger.error(f"FFmpeg error: {result.stderr}")
+                return False
+        
+        except subprocess.TimeoutExpired:
+            logger.error(f"FFmpeg timeout creating compilation {output_file}")
+            return False
+        except FFmpegError as e:
+            logger.error(f"Error creating compilation: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"Error creating compilation: {e}")
+            return False
+    
+    def extract_audio_from_video(self, video_file: str, audio_file: str,
+                                 duration: Optional[float] = None,
+                                 progress_callback: Optional[ProgressCallback] = None) -> bool:
+        """Extract audio track from video file
+        
+        Runs as long as ffmpeg keeps making progress, so long movies are not cut off
+        by a fixed timeout; ``duration`` (from the probe) enables progress reports.
+        """
         try:
             cmd = [
                 'ffmpeg',
@@ -275,12 +1188,7 @@ class FFmpegProcessor:
                 audio_file
             ]
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=self.default_timeout
-            )
+            result = self._run_with_progress(cmd, duration or 0, progress_callback)
             
             if result.returncode == 0:
                 logger.info(f"Audio extracted from video: {audio_file}")
@@ -290,14 +1198,18 @@ class FFmpegProcessor:
                 return False
                 
         except subprocess.TimeoutExpired:
-            logger.error(f"FFmpeg timeout extracting audio from video")
+            logger.error(f"FFmpeg stalled extracting audio from video")
             return False
         except Exception as e:
             logger.error(f"Error extracting audio from video: {e}")
             return False
     
-    def get_media_duration(self, media_file: str) -> Optional[float]:
+    def get_media_duration(self, media_file: str, timeout: int = 30) -> Optional[float]:
         """Get duration of media file"""
+        probe = self.get_probe(media_file)
+        if probe and probe.get('duration'):
+            return probe['duration']
+        
         try:
             cmd = [
                 'ffprobe',
@@ -307,10 +1219,9 @@ class FFmpegProcessor:
                 media_file
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
             
             if result.returncode == 0:
-                import json
                 data = json.loads(result.stdout)
                 return float(data['format']['duration'])
             else:
@@ -449,11 +1360,41 @@ class SubtitleProcessor:
         return line_break.join(wrapped_paragraphs)
     
     @staticmethod
-    def create_ass_subtitle_file(english_text: Optional[str], korean_text: Optional[str], 
-                               duration: float, output_path: str, 
-                               english_font_size: int = 32, korean_font_size: int = 24,
-                               include_commentary: bool = False, commentary_style: str = 'orange') -> str:
-        """Create ASS format subtitle file with English and Korean support"""
+    @lru_cache(maxsize=64)
+    def _ass_header(english_font_size: int, korean_font_size: int, english_margin_v: int,
+                    korean_margin_v: int, has_english: bool, has_korean: bool,
+                    commentary_ass_style: str) -> str:
+        """Script info, styles and event format of a clip's ASS subtitle.
+        
+        A bulk export renders thousands of clips with the same options, so the header
+        is built once per combination and reused.
+        """
+        styles = ''
+        if has_english:
+            styles += f"Style: English,Noto Sans KR,{english_font_size},&Hffffff,&Hffffff,&H0,&H80000000,1,0,0,0,100,100,0,0,1,2,0,2,5,5,{english_margin_v},1\n"
+        if has_korean:
+            # A Korean-only subtitle sits a little higher
+            margin_v = korean_margin_v if has_english else 50
+            styles += f"Style: Korean,Noto Sans KR,{korean_font_size},&Hffffff,&Hffffff,&H0,&H80000000,1,0,0,0,100,100,0,0,1,2,0,2,5,5,{margin_v},1\n"
+        
+        return f"""[Script Info]
+Title: Subtitle
+ScriptType: v4.00+
+WrapStyle: 0
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+{styles}{commentary_ass_style}
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+    
+    @staticmethod
+    def build_ass_subtitle(english_text: Optional[str], korean_text: Optional[str],
+                           duration: float,
+                           english_font_size: int = 32, korean_font_size: int = 24,
+                           include_commentary: bool = False, commentary_style: str = 'orange') -> str:
+        """ASS subtitle of one clip with English and Korean support"""
         
         def seconds_to_ass_time(seconds: float) -> str:
             hours = int(seconds // 3600)
@@ -599,46 +1540,10 @@ class SubtitleProcessor:
             # Alignment: 9 = 상단 우측, MarginV: 20 (상단 여백), MarginR: 30 (우측 여백)
             commentary_ass_style = f"Style: Commentary,Noto Sans KR,28,{colors['english']},{colors['english']},&H000000,&H80000000,1,0,0,0,100,100,0,0,1,2,1,9,20,30,20,1\n"
         
-        if english_text and korean_text:
-            ass_content = f"""[Script Info]
-Title: Subtitle
-ScriptType: v4.00+
-WrapStyle: 0
-
-[V4+ Styles]
-Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: English,Noto Sans KR,{english_font_size},&Hffffff,&Hffffff,&H0,&H80000000,1,0,0,0,100,100,0,0,1,2,0,2,5,5,{english_margin_v},1
-Style: Korean,Noto Sans KR,{korean_font_size},&Hffffff,&Hffffff,&H0,&H80000000,1,0,0,0,100,100,0,0,1,2,0,2,5,5,{korean_margin_v},1
-{commentary_ass_style}
-[Events]
-Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-"""
-        elif korean_text:
-            ass_content = f"""[Script Info]
-Title: Subtitle
-ScriptType: v4.00+
-WrapStyle: 0
-
-[V4+ Styles]
-Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: Korean,Noto Sans KR,{korean_font_size},&Hffffff,&Hffffff,&H0,&H80000000,1,0,0,0,100,100,0,0,1,2,0,2,5,5,50,1
-{commentary_ass_style}
-[Events]
-Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-"""
-        elif english_text:
-            ass_content = f"""[Script Info]
-Title: Subtitle
-ScriptType: v4.00+
-WrapStyle: 0
-
-[V4+ Styles]
-Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: English,Noto Sans KR,{english_font_size},&Hffffff,&Hffffff,&H0,&H80000000,1,0,0,0,100,100,0,0,1,2,0,2,5,5,{english_margin_v},1
-{commentary_ass_style}
-[Events]
-Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-"""
+        ass_content = SubtitleProcessor._ass_header(
+            english_font_size, korean_font_size, english_margin_v, korean_margin_v,
+            bool(english_text), bool(korean_text), commentary_ass_style
+        )
         
         start_time = "0:00:00.00"
         end_time = seconds_to_ass_time(duration)
@@ -656,75 +1561,556 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         elif korean_text:
             ass_content += f"Dialogue: 1,{start_time},{end_time},Korean,,0,0,0,,{korean_text}\n"
         
-        # Write file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(ass_content)
-        
-        return output_path
+        return ass_content
     
     @staticmethod
     def create_srt_subtitle_file(text: str, duration: float, output_path: str) -> str:
         """Create SRT format subtitle file"""
         wrapped_text = SubtitleProcessor.wrap_text(text, max_chars_per_line=40)
         
-        duration_formatted = f"{int(duration//3600):02d}:{int((duration%3600)//60):02d}:{duration%60:06.3f}"
+        duration_formatted = f"{int(duration//3600):02d}:{int((duration%3600)//60):02d}:{duration%60:06.3f}".replace('.', ',')
         
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write(f"1\n00:00:00,000 --> {duration_formatted}\n{wrapped_text}\n\n")
         
         return output_path
 
+    @staticmethod
+    def merge_ass_subtitles(parts: List[Tuple[str, float]]) -> str:
+        """Combine single-clip ASS subtitles into one, shifting each one's events by its offset
+        
+        ``parts`` is a list of ``(ass_content, offset_seconds)``. Script info comes from
+        the first part; a style whose definition differs from an earlier one of the
+        same name (e.g. margins that depend on the Korean line) is renamed for the
+        events of its part.
+        """
+        def ass_time_to_seconds(value: str) -> float:
+            hours, minutes, secs = value.split(':')
+            return int(hours) * 3600 + int(minutes) * 60 + float(secs)
+        
+        def seconds_to_ass_time(seconds: float) -> str:
+            hours = int(seconds // 3600)
+            minutes = int((seconds % 3600) // 60)
+            secs = seconds % 60
+            return f"{hours}:{minutes:02d}:{secs:05.2f}"
+        
+        script_info, style_format, event_format = [], None, None
+        styles, events = {}, []
+        for index, (ass_content, offset) in enumerate(parts):
+            section = None
+            renames = {}
+            for line in ass_content.splitlines():
+                if line.startswith('['):
+                    section = line.strip()
+                elif section == '[Script Info]':
+                    if index == 0 and line.strip():
+                        script_info.append(line)
+                elif section == '[V4+ Styles]':
+                    if line.startswith('Format:'):
+                        style_format = style_format or line
+                    elif line.startswith('Style:'):
+                        name, definition = line[len('Style:'):].split(',', 1)
+                        name = name.strip()
+                        if name in styles and styles[name] != f"Style: {name},{definition}":
+                            renames[name] = f"{name}{index}"
+                            name = renames[name]
+                        styles.setdefault(name, f"Style: {name},{definition}")
+                elif section == '[Events]':
+                    if line.startswith('Format:'):
+                        event_format = event_format or line
+                    elif line.startswith('Dialogue:'):
+                        fields = line.split(',', 9)
+                        fields[1] = seconds_to_ass_time(ass_time_to_seconds(fields[1]) + offset)
+                        fields[2] = seconds_to_ass_time(ass_time_to_seconds(fields[2]) + offset)
+                        fields[3] = renames.get(fields[3], fields[3])
+                        events.append(','.join(fields))
+        
+        return ('[Script Info]\n' + '\n'.join(script_info) + '\n\n'
+                + '[V4+ Styles]\n' + style_format + '\n' + '\n'.join(styles.values()) + '\n\n'
+                + '[Events]\n' + event_format + '\n' + '\n'.join(events) + '\n')
+    
+    @staticmethod
+    def build_timed_srt(cues: List[Tuple[float, float, str]]) -> str:
+        """SRT subtitle with one cue per ``(start, end, text)``"""
+        def seconds_to_srt_time(seconds: float) -> str:
+            millis = int(round(seconds * 1000))
+            return f"{millis // 3600000:02d}:{millis // 60000 % 60:02d}:{millis // 1000 % 60:02d},{millis % 1000:03d}"
+        
+        srt_content = ''
+        for number, (start, end, text) in enumerate(cues, 1):
+            wrapped_text = SubtitleProcessor.wrap_text(text, max_chars_per_line=40)
+            srt_content += f"{number}\n{seconds_to_srt_time(start)} --> {seconds_to_srt_time(end)}\n{wrapped_text}\n\n"
+        return srt_content
+    
+    @staticmethod
+    @contextmanager
+    def memory_file(content: Optional[str]) -> Iterator[Optional[str]]:
+        """Path ffmpeg can read subtitle content from, valid inside the ``with`` block.
+        
+        On Linux the content lives in an anonymous memfd that the ffmpeg child opens
+        through ``/proc/<pid>/fd``: no directory is touched and nothing is left behind
+        if the app dies. Elsewhere it falls back to a file in the system temp
+        directory. ``None`` content yields ``None``, so callers need no branch.
+        """
+        if content is None:
+            yield None
+            return
+        
+        data = content.encode('utf-8')
+        if hasattr(os, 'memfd_create'):
+            fd = os.memfd_create('subtitle')
+            try:
+                with os.fdopen(fd, 'wb', closefd=False) as f:
+                    f.write(data)
+                yield f'/proc/{os.getpid()}/fd/{fd}'
+            finally:
+                os.close(fd)
+        else:
+            fd, path = tempfile.mkstemp(prefix='subtitle_')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                yield path
+            finally:
+                os.remove(path)
+
 class MediaExtractor:
     """High-level media extraction operations"""
     
+    # Encoder threads per ffmpeg process when running several in parallel
+    THREADS_PER_ENCODE = 2
+    # Shared-decode windows: longest gap worth decoding through, and most
+    # encoders fed by one decode
+    SHARED_DECODE_MAX_GAP = 5.0
+    SHARED_DECODE_MAX_CLIPS = 8
+    # Longest visible lead-in (seconds) a soft-subtitle clip may start early to begin on a keyframe
+    SOFT_MAX_LEAD_IN = 0.5
+    
     def __init__(self, ffmpeg_processor: FFmpegProcessor, subtitle_processor: SubtitleProcessor):
         self.ffmpeg = ffmpeg_processor
         self.subtitle = subtitle_processor
     
     def extract_sentence_with_subtitles(self, input_file: str, output_file: str,
                                       sentence_data: Dict, subtitle_options: Dict,
-                                      is_video_file: bool = True) -> bool:
+                                      is_video_file: bool = True,
+                                      threads: Optional[int] = None) -> bool:
         """Extract single sentence with subtitle options"""
         start_time = sentence_data['startTime']
         end_time = sentence_data['endTime'] 
         duration = end_time - start_time + 0.5  # 0.5초 정지 추가
         
-        # Create subtitle file if needed
-        subtitle_file = None
+        if subtitle_options.get('subtitle_mode') == 'soft':
+            return self._extract_sentence_soft(
+                input_file, output_file, sentence_data, subtitle_options,
+                duration, is_video_file, threads
+            )
+        
+        # Build subtitle content if needed; ffmpeg reads it from memory
+        subtitle_content = None
         if any(subtitle_options.values()):
-            subtitle_file = self._create_subtitle_file(sentence_data, duration, subtitle_options)
+            subtitle_content = self._build_subtitle(sentence_data, duration, subtitle_options)
         
-        try:
+        with self.subtitle.memory_file(subtitle_content) as subtitle_file:
             # Extract based on file type
             logger.info(f"Extracting: is_video_file={is_video_file}, input_file={input_file}")
             if is_video_file:
                 logger.info("Using extract_video_segment")
                 success = self.ffmpeg.extract_video_segment(
-                    input_file, output_file, start_time, duration, subtitle_file
+                    input_file, output_file, start_time, duration, subtitle_file, threads=threads
                 )
             else:
                 logger.info("Using create_video_from_audio")
                 success = self.ffmpeg.create_video_from_audio(
-                    input_file, output_file, start_time, duration, subtitle_file
+                    input_file, output_file, start_time, duration, subtitle_file, threads=threads
                 )
             
             return success
+    
+    def _extract_sentence_soft(self, input_file: str, output_file: str,
+                               sentence_data: Dict, subtitle_options: Dict,
+                               duration: float, is_video_file: bool,
+                               threads: Optional[int] = None) -> bool:
+        """Extract a sentence with English/Korean as selectable mov_text tracks
+        
+        When the keyframe before the sentence is at most ``SOFT_MAX_LEAD_IN`` early,
+        the copy starts exactly there (no edit list needed) and the subtitles are
+        delayed by the lead-in. Otherwise, or without a keyframe index, the clip is
+        cut at the sentence and the edit list hides the frames before it.
+        """
+        start_time = sentence_data['startTime']
+        if is_video_file:
+            keyframe = self.ffmpeg.keyframe_before(input_file, start_time)
+            if keyframe is not None and start_time - keyframe <= self.SOFT_MAX_LEAD_IN:
+                start_time = keyframe
+        lead_in = sentence_data['startTime'] - start_time
+        
+        with ExitStack() as stack:
+            subtitle_tracks = []
+            for option, language in (('english', 'eng'), ('korean', 'kor')):
+                text = sentence_data.get(option) if subtitle_options.get(option) else None
+                if text and text.strip():
+                    srt_content = self.subtitle.build_timed_srt([(lead_in, lead_in + duration, text)])
+                    subtitle_tracks.append((stack.enter_context(self.subtitle.memory_file(srt_content)), language))
             
+            if is_video_file:
+                return self.ffmpeg.extract_video_segment_soft(
+                    input_file, output_file, start_time, lead_in + duration, subtitle_tracks
+                )
+            return self.ffmpeg.create_video_from_audio(
+                input_file, output_file, sentence_data['startTime'], duration,
+                threads=threads, subtitle_tracks=subtitle_tracks
+            )
+    
+    @staticmethod
+    def can_coalesce(subtitle_options: Dict, is_video_file: bool) -> bool:
+        """Whether adjacent sentences can share one encode.
+        
+        Only re-encoded video splits exactly: soft-subtitle clips are stream copies
+        (cut at existing keyframes) and still-background video has too few frames.
+        """
+        return is_video_file and subtitle_options.get('subtitle_mode') != 'soft'
+    
+    @staticmethod
+    def plan_coalesced_groups(sentences: List[Dict], max_gap: float) -> List[List[int]]:
+        """Group indices of sentences that follow each other within ``max_gap`` seconds
+        
+        Groups are in time order; overlapping sentences are never merged since the
+        split would cut one of them short.
+        """
+        groups = []
+        for index in sorted(range(len(sentences)), key=lambda i: sentences[i]['startTime']):
+            if groups:
+                previous = sentences[groups[-1][-1]]
+                gap = sentences[index]['startTime'] - previous['endTime']
+                if 0 <= gap < max_gap:
+                    groups[-1].append(index)
+                    continue
+            groups.append([index])
+        return groups
+    
+    def extract_sentence_group(self, input_file: str, output_files: List[str],
+                               sentences: List[Dict], subtitle_options: Dict,
+                               merge: bool = False, threads: Optional[int] = None) -> bool:
+        """Extract consecutive sentences of a video with one encode.
+        
+        Each sentence runs until the next one starts and the last one gets the
+        usual 0.5s pause, so the pause is added once per group instead of
+        overlapping the next clip. The subtitles of every sentence are timed to its
+        piece. With ``merge`` the group is written to ``output_files[0]``;
+        otherwise the encode is split losslessly into one file per sentence.
+        """
+        group_start = sentences[0]['startTime']
+        offsets = [sentence['startTime'] - group_start for sentence in sentences]
+        duration = sentences[-1]['endTime'] - group_start + 0.5  # 0.5초 정지 추가
+        ends = offsets[1:] + [duration]
+        
+        parts = []
+        for sentence, offset, end in zip(sentences, offsets, ends):
+            part = self._build_subtitle(sentence, end - offset, subtitle_options)
+            if part:
+                parts.append((part, offset))
+        subtitle_content = self.subtitle.merge_ass_subtitles(parts) if parts else None
+        
+        work_dir = os.path.dirname(output_files[0])
+        group_id = uuid.uuid4().hex
+        try:
+            with self.subtitle.memory_file(subtitle_content) as subtitle_file:
+                if merge:
+                    return self.ffmpeg.extract_video_segment(
+                        input_file, output_files[0], group_start, duration, subtitle_file, threads=threads
+                    )
+                
+                pattern = os.path.join(work_dir, f'temp_group_{group_id}_%03d.mp4')
+                if not self.ffmpeg.extract_video_segment(
+                    input_file, pattern, group_start, duration, subtitle_file,
+                    threads=threads, segment_times=offsets[1:]
+                ):
+                    return False
+            
+            pieces = [pattern % index for index in range(len(output_files))]
+            if not all(os.path.exists(piece) for piece in pieces):
+                logger.error(f"Split of sentence group produced too few pieces: {pattern}")
+                return False
+            for piece, output_file in zip(pieces, output_files):
+                os.replace(piece, output_file)
+            return True
         finally:
-            # Clean up subtitle file
-            if subtitle_file and os.path.exists(subtitle_file):
-                try:
-                    os.remove(subtitle_file)
-                except Exception as e:
-                    logger.warning(f"Failed to remove subtitle file {subtitle_file}: {e}")
+            for name in os.listdir(work_dir):
+                if name.startswith(f'temp_group_{group_id}_'):
+                    os.remove(os.path.join(work_dir, name))
+    
+    @staticmethod
+    def plan_decode_windows(sentences: List[Dict], max_gap: float,
+                            max_clips: int) -> List[List[int]]:
+        """Group indices of sentences whose clips can come from one decode.
+        
+        A window grows while the next sentence starts less than ``max_gap`` seconds
+        after the current window ends (overlaps included) and holds at most
+        ``max_clips`` clips, so little is decoded that no clip needs.
+        """
+        windows = []
+        window_end = None
+        for index in sorted(range(len(sentences)), key=lambda i: sentences[i]['startTime']):
+            sentence = sentences[index]
+            clip_end = sentence['endTime'] + 0.5  # 0.5초 정지 포함
+            if windows and len(windows[-1]) < max_clips and sentence['startTime'] - window_end < max_gap:
+                windows[-1].append(index)
+                window_end = max(window_end, clip_end)
+            else:
+                windows.append([index])
+                window_end = clip_end
+        return windows
+    
+    def extract_sentence_window(self, input_file: str, output_files: List[str],
+                                sentences: List[Dict], subtitle_options: Dict,
+                                threads: Optional[int] = None) -> List[bool]:
+        """Extract nearby sentences of a video from one shared decode.
+        
+        Every clip is the same as ``extract_sentence_with_subtitles`` would write
+        (own range, 0.5s pause, own subtitle overlay); only the decode is shared.
+        """
+        segments = []
+        with ExitStack() as stack:
+            for output_file, sentence in zip(output_files, sentences):
+                duration = sentence['endTime'] - sentence['startTime'] + 0.5  # 0.5초 정지 추가
+                subtitle_content = None
+                if any(subtitle_options.values()):
+                    subtitle_content = self._build_subtitle(sentence, duration, subtitle_options)
+                subtitle_file = stack.enter_context(self.subtitle.memory_file(subtitle_content))
+                segments.append((sentence['startTime'], duration, output_file, subtitle_file))
+            
+            return self.ffmpeg.extract_video_segments(input_file, segments, threads=threads)
+    
+    def plan_workers(self, job_count: int, max_workers: Optional[int] = None,
+                     encoders_per_job: int = 1) -> Tuple[int, int]:
+        """Pick (parallel jobs, ffmpeg threads per encoder) so the total fits the cores.
+        
+        A job may run up to ``encoders_per_job`` encoders in one process (a
+        shared-decode window), and each of them gets the returned thread count.
+        """
+        cores = os.cpu_count() or 1
+        workers = max_workers or max(1, cores // (self.THREADS_PER_ENCODE * encoders_per_job))
+        workers = max(1, min(workers, job_count))
+        return workers, max(1, cores // (workers * encoders_per_job))
+    
+    def extract_sentences_parallel(self, input_file: str, jobs: List[Tuple[str, Dict]],
+                                   subtitle_options: Dict, is_video_file: bool = True,
+                                   progress_callback: Optional[Callable[[int, int], None]] = None,
+                                   max_workers: Optional[int] = None,
+                                   groups: Optional[List[List[int]]] = None,
+                                   merge_groups: bool = False,
+                                   shared_decode: bool = False) -> List[bool]:
+        """Extract many sentences on a bounded pool of concurrent ffmpeg processes.
+        
+        ``jobs`` is a list of ``(output_file, sentence_data)``. Returns the success of
+        every job in input order; ``progress_callback(done, total)`` is called from the
+        calling thread as jobs finish.
+        
+        ``groups`` (from ``plan_coalesced_groups``) lets consecutive sentences share
+        one encode via ``extract_sentence_group``; with ``merge_groups`` a group is
+        written only to the output file of its first job.
+        
+        With ``shared_decode`` the sentences left on their own are batched into
+        windows (``plan_decode_windows``) that each decode the source once and
+        encode every clip from it (``extract_sentence_window``); only re-encoded
+        video with burned-in subtitles qualifies (see ``can_coalesce``). The pool is
+        sized by the most encoders one unit runs, so windows stay within the cores.
+        """
+        results = [False] * len(jobs)
+        if not jobs:
+            return results
+        
+        units = [(False, unit) for unit in groups or [[index] for index in range(len(jobs))]]
+        if shared_decode and self.can_coalesce(subtitle_options, is_video_file):
+            singles = [unit[0] for _, unit in units if len(unit) == 1]
+            windows = self.plan_decode_windows(
+                [jobs[index][1] for index in singles], self.SHARED_DECODE_MAX_GAP, self.SHARED_DECODE_MAX_CLIPS
+            )
+            units = [(False, unit) for _, unit in units if len(unit) > 1]
+            units += [(True, [singles[position] for position in window]) for window in windows]
+        encoders_per_unit = max(len(unit) if window else 1 for window, unit in units)
+        workers, threads = self.plan_workers(len(units), max_workers, encoders_per_unit)
+        logger.info(f"Extracting {len(jobs)} sentences in {len(units)} units with {workers} workers x "
+                    f"{encoders_per_unit} encoders x {threads} threads")
+        
+        def run(window: bool, unit: List[int]) -> List[bool]:
+            try:
+                if window:
+                    return self.extract_sentence_window(
+                        input_file, [jobs[index][0] for index in unit], [jobs[index][1] for index in unit],
+                        subtitle_options, threads
+                    )
+                if len(unit) == 1:
+                    output_file, sentence_data = jobs[unit[0]]
+                    return [self.extract_sentence_with_subtitles(
+                        input_file, output_file, sentence_data, subtitle_options, is_video_file, threads
+                    )]
+                success = self.extract_sentence_group(
+                    input_file, [jobs[index][0] for index in unit], [jobs[index][1] for index in unit],
+                    subtitle_options, merge_groups, threads
+                )
+                return [success] * len(unit)
+            except Exception as e:
+                logger.error(f"Error extracting sentences {[jobs[index][1].get('id') for index in unit]}: {e}")
+                return [False] * len(unit)
+        
+        done = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run, window, unit): unit for window, unit in units}
+            for future in as_completed(futures):
+                for index, success in zip(futures[future], future.result()):
+                    results[index] = success
+                done += len(futures[future])
+                if progress_callback:
+                    progress_callback(done, len(jobs))
+        
+        return results
     
-    def _create_subtitle_file(self, sentence_data: Dict, duration: float, 
-                            subtitle_options: Dict) -> Optional[str]:
-        """Create appropriate subtitle file based on options"""
+    @staticmethod
+    def plan_split_passes(ranges: List[Dict]) -> List[List[int]]:
+        """Group indices of ranges (chapters, scenes) into passes of the segment muxer.
+        
+        The muxer cuts one continuous encode, so a pass holds ranges in start order
+        that do not overlap; gaps between them are encoded and thrown away. Contiguous
+        structures (the usual case) need a single pass.
+        """
+        passes, pass_ends = [], []
+        for index in sorted(range(len(ranges)), key=lambda i: ranges[i]['startTime']):
+            start = ranges[index]['startTime']
+            for position, end in enumerate(pass_ends):
+                if start >= end - 0.001:
+                    passes[position].append(index)
+                    pass_ends[position] = ranges[index]['endTime']
+                    break
+            else:
+                passes.append([index])
+                pass_ends.append(ranges[index]['endTime'])
+        return passes
+    
+    def export_ranges(self, input_file: str, ranges: List[Dict], output_files: List[str],
+                      subtitle_options: Dict, is_video_file: bool = True, as_video: bool = True,
+                      progress_callback: Optional[ProgressCallback] = None) -> List[bool]:
+        """Export many chapters or scenes with one ffmpeg run per split pass.
+        
+        Every range is a dict with ``startTime``, ``endTime`` and its ``sentences``.
+        A pass encodes from its first range to its last and hands every boundary to
+        the segment muxer, instead of one run (and one seek) per range. With
+        ``as_video`` the pieces are MP4s whose subtitles are one event per sentence,
+        timed to the encode; otherwise MP3s. Returns the success of every range.
+        
+        The still background of an audio source has a frame only every
+        1/``still_fps`` seconds, too few to split at the range bounds (the same
+        reason ``can_coalesce`` leaves it out), so rendered as video every range of
+        an audio source gets its own run.
+        """
+        results = [False] * len(ranges)
+        if as_video and not is_video_file:
+            passes = [[index] for index in sorted(range(len(ranges)), key=lambda i: ranges[i]['startTime'])]
+        else:
+            passes = self.plan_split_passes(ranges)
+        total = sum(ranges[p[-1]]['endTime'] - ranges[p[0]]['startTime'] for p in passes) or 1.0
+        done = 0.0
+        for indices in passes:
+            span = ranges[indices[-1]]['endTime'] - ranges[indices[0]]['startTime']
+            
+            def report(fraction, eta, speed, done=done, span=span):
+                if progress_callback:
+                    progress_callback((done + fraction * span) / total, eta, speed)
+            
+            pass_results = self._export_pass(
+                input_file, [ranges[i] for i in indices], [output_files[i] for i in indices],
+                subtitle_options, is_video_file, as_video, report
+            )
+            for index, success in zip(indices, pass_results):
+                results[index] = success
+            done += span
+        return results
+    
+    def _export_pass(self, input_file: str, ranges: List[Dict], output_files: List[str],
+                     subtitle_options: Dict, is_video_file: bool, as_video: bool,
+                     progress_callback: ProgressCallback) -> List[bool]:
+        """Encode non-overlapping ranges (in start order) once and split at their bounds"""
+        pass_start = ranges[0]['startTime']
+        duration = ranges[-1]['endTime'] - pass_start
+        
+        # Piece boundaries: every range start and end; gap pieces are dropped
+        bounds = sorted({round(time - pass_start, 3) for r in ranges for time in (r['startTime'], r['endTime'])})
+        cuts = [t for t in bounds if 0 < t < round(duration, 3)]
+        pieces = [0.0] + cuts
+        
+        work_dir = os.path.dirname(output_files[0])
+        pass_id = uuid.uuid4().hex
+        pattern = os.path.join(work_dir, f'temp_export_{pass_id}_%03d.{"mp4" if as_video else "mp3"}')
+        # Without cut points ffmpeg writes a plain file, named like the only piece
+        target = pattern if cuts else pattern % 0
+        try:
+            if not as_video:
+                success = self.ffmpeg.split_audio_segment(
+                    input_file, target, pass_start, duration, cuts, progress_callback=progress_callback
+                )
+            else:
+                # Burned into the whole encode, so a sentence running past the end of
+                # its range stays on screen in the next piece
+                sentences = {id(sentence): sentence for r in ranges for sentence in r.get('sentences', [])}
+                subtitle_content = self.build_timed_subtitle(
+                    list(sentences.values()), pass_start, pass_start + duration, subtitle_options
+                )
+                
+                with self.subtitle.memory_file(subtitle_content) as subtitle_file:
+                    if is_video_file:
+                        success = self.ffmpeg.extract_video_segment(
+                            input_file, target, pass_start, duration, subtitle_file,
+                            segment_times=cuts, progress_callback=progress_callback
+                        )
+                    else:
+                        success = self.ffmpeg.create_video_from_audio(
+                            input_file, target, pass_start, duration, subtitle_file,
+                            progress_callback=progress_callback, segment_times=cuts
+                        )
+            if not success:
+                return [False] * len(ranges)
+            
+            results = []
+            for r, output_file in zip(ranges, output_files):
+                piece = pattern % pieces.index(round(r['startTime'] - pass_start, 3))
+                if os.path.exists(piece):
+                    os.replace(piece, output_file)
+                    results.append(True)
+                else:
+                    logger.error(f"Split pass produced no piece for range at {r['startTime']}s: {piece}")
+                    results.append(False)
+            return results
+        finally:
+            for name in os.listdir(work_dir):
+                if name.startswith(f'temp_export_{pass_id}_'):
+                    os.remove(os.path.join(work_dir, name))
+    
+    def build_timed_subtitle(self, sentences: List[Dict], start_time: float, end_time: float,
+                             subtitle_options: Dict) -> Optional[str]:
+        """ASS content of a stretch of media with one event per sentence.
+        
+        Event times are relative to ``start_time`` and clipped to the stretch; each
+        sentence keeps the styling of a single-sentence clip. Returns None when no
+        sentence has text to show.
+        """
+        parts = []
+        for sentence in sorted(sentences, key=lambda sentence: sentence['startTime']):
+            start = max(sentence['startTime'], start_time)
+            end = min(sentence['endTime'], end_time)
+            if end <= start:
+                continue
+            part = self._build_subtitle(sentence, end - start, subtitle_options)
+            if part:
+                parts.append((part, start - start_time))
+        return self.subtitle.merge_ass_subtitles(parts) if parts else None
+    
+    def _build_subtitle(self, sentence_data: Dict, duration: float,
+                        subtitle_options: Dict) -> Optional[str]:
+        """ASS content of a sentence clip based on options, or None without text"""
         # 디버깅 로그 추가
         import logging
         logger = logging.getLogger(__name__)
-        logger.info(f"_create_subtitle_file 호출됨")
+        logger.info(f"_build_subtitle 호출됨")
         logger.info(f"subtitle_options: {subtitle_options}")
         logger.info(f"sentence_data keys: {list(sentence_data.keys())}")
         logger.info(f"sentence_data['korean']: {sentence_data.get('korean', 'None')}")
@@ -739,22 +2125,21 @@ class MediaExtractor:
         if not english_text and not korean_text:
             return None
         
-        # Generate unique filename
-        subtitle_filename = f'temp_subtitle_{uuid.uuid4().hex}.ass'
-        subtitle_path = os.path.join(os.path.dirname(sentence_data.get('output_dir', '.')), subtitle_filename)
-        
         # Get font sizes and commentary option from options
         english_font_size = subtitle_options.get('english_font_size', 28)
         korean_font_size = subtitle_options.get('korean_font_size', 24)
         include_commentary = subtitle_options.get('include_commentary', False)
         commentary_style = subtitle_options.get('commentary_style', 'orange')
         
-        return self.subtitle.create_ass_subtitle_file(
-            english_text, korean_text, duration, subtitle_path,
+        return self.subtitle.build_ass_subtitle(
+            english_text, korean_text, duration,
             english_font_size, korean_font_size, include_commentary, commentary_style
         )
 
 # Singleton instances
-ffmpeg_processor = FFmpegProcessor()
+ffmpeg_processor = FFmpegProcessor(
+    still_size=os.environ.get('STILL_VIDEO_SIZE', '1920x1080'),
+    still_fps=float(os.environ.get('STILL_VIDEO_FPS', 2))
+)
 subtitle_processor = SubtitleProcessor()
 media_extractor = MediaExtractor(ffmpeg_processor, subtitle_processor)
\ No newline at end of file
@@ -5,16 +5,42 @@ import os
 import uuid
 import shutil
 import logging
+import zipfile
 from pathlib import Path
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple, List, Iterable, Iterator
 from werkzeug.utils import secure_filename
 from werkzeug.datastructures import FileStorage
 
 logger = logging.getLogger(__name__)
 
+class _ZipStreamBuffer:
+    """Write-only, unseekable sink for zipfile whose bytes are drained as they come.
+    
+    Without tell/seek zipfile writes each entry's sizes in a data descriptor after
+    its data, so an archive can be produced front to back.
+    """
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self) -> bytes:
+        """Bytes written since the last drain"""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
 class FileManager:
     """Centralized file operations manager"""
     
+    ZIP_CHUNK_SIZE = 64 * 1024
+    
     def __init__(self, upload_folder: str = 'upload', output_folder: str = 'output'):
         self.upload_folder = Path(upload_folder)
         self.output_folder = Path(output_folder)
@@ -124,6 +150,8 @@ class FileManager:
         """Generate suffix based on subtitle options"""
         english = subtitle_options.get('english', False)
         korean = subtitle_options.get('korean', False)
+        # Soft-subtitle clips must not overwrite burned-in ones
+        soft = '_soft' if subtitle_options.get('subtitle_mode') == 'soft' else ''
         
         # 디버깅 로그 추가
         import logging
@@ -134,16 +162,16 @@ class FileManager:
         
         if english and korean:
             logger.info("반환값: _eng_kor")
-            return '_eng_kor'
+            return '_eng_kor' + soft
         elif english:
             logger.info("반환값: _eng")
-            return '_eng'
+            return '_eng' + soft
         elif korean:
             logger.info("반환값: _kor")
-            return '_kor'
+            return '_kor' + soft
         else:
-            logger.info("반환값: '' (빈 문자열)")
-            return ''  # No suffix for no subtitles
+            logger.info(f"반환값: '{soft}'")
+            return soft  # No language suffix for no subtitles
     
     @staticmethod
     def get_clean_media_name(filename: str) -> str:
@@ -235,6 +263,44 @@ class FileManager:
             logger.error(f"Error cleaning up outputs for media {media_id}: {e}")
             return False
     
+    def count_media_output_files(self, media_id: str) -> int:
+        """Count output files of a media"""
+        count = 0
+        for dir_path in self.output_folder.glob(f"{media_id}_*"):
+            if dir_path.is_dir():
+                for _, _, files in os.walk(dir_path):
+                    count += len(files)
+        return count
+    
+    def cleanup_media_outputs_batch(self, media_id: str, limit: int = 200) -> int:
+        """Remove up to ``limit`` output files of a media, and directories left empty.
+        
+        Returns the number of files removed; 0 means nothing is left.
+        """
+        removed_count = 0
+        for dir_path in self.output_folder.glob(f"{media_id}_*"):
+            if not dir_path.is_dir():
+                continue
+            
+            # Bottom-up so each directory is empty by the time it is reached
+            for root, _, files in os.walk(dir_path, topdown=False):
+                for name in files:
+                    if removed_count >= limit:
+                        return removed_count
+                    try:
+                        os.unlink(os.path.join(root, name))
+                    except FileNotFoundError:
+                        continue
+                    removed_count += 1
+                try:
+                    os.rmdir(root)
+                except OSError as e:
+                    logger.warning(f"Could not remove output directory {root}: {e}")
+            
+            logger.info(f"Removed output directory: {dir_path}")
+        
+        return removed_count
+    
     def get_download_path(self, filename: str) -> Optional[str]:
         """Get path for downloadable file"""
         # Search in output directories
@@ -249,6 +315,29 @@ class FileManager:
         
         return None
     
+    def stream_zip(self, entries: Iterable[Tuple[str, str]],
+                   remove_files: bool = False) -> Iterator[bytes]:
+        """Yield a ZIP archive of ``(file_path, archive_name)`` entries as it is written.
+        
+        Entries are stored uncompressed (MP3/MP4 do not shrink) and read in
+        ``ZIP_CHUNK_SIZE`` pieces, so memory stays constant and nothing is staged on
+        disk. ``entries`` may be a generator that produces files while the archive
+        is being sent. With ``remove_files`` each file is deleted once archived.
+        """
+        buffer = _ZipStreamBuffer()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for file_path, archive_name in entries:
+                with open(file_path, 'rb') as source, archive.open(archive_name, 'w') as entry:
+                    for chunk in iter(lambda: source.read(self.ZIP_CHUNK_SIZE), b''):
+                        entry.write(chunk)
+                        yield buffer.drain()
+                # Data descriptor
+                yield buffer.drain()
+                if remove_files:
+                    os.remove(file_path)
+        # Central directory
+        yield buffer.drain()
+    
     def ensure_directory(self, directory: str) -> str:
         """Ensure directory exists and return path"""
         dir_path = Path(directory)
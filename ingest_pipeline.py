@@ -0,0 +1,241 @@
+"""
+Staged background ingest of new media: probe, audio track, loudness, PCM cache,
+waveform, subtitles
+"""
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from database import media_repo, structure_repo
+from ffmpeg_processor import ffmpeg_processor, subtitle_processor
+from pcm_cache import pcm_cache
+from waveform import waveform_store
+
+logger = logging.getLogger(__name__)
+
+class IngestPipeline:
+    """Runs the ingest stages of each new media on a small pool of background workers.
+    
+    Uploads and sync imports only put the bytes on disk and register the media with
+    status ``ingesting``; everything that reads the file happens here. Every stage
+    gets a job dict (``media_id``, ``media_path``, ``file_type``, optional
+    ``subtitle_path`` and ``transcribe``) that earlier stages add to (``probe``,
+    ``duration``, ``audio_path``). A failed required stage ends the ingest with status
+    ``error``; a failed optional stage is recorded and the rest still runs. The
+    keyframe scan of a video runs beside the stages on its own worker, so a long
+    movie is not held in ``ingesting`` while every packet is read.
+    """
+    
+    def __init__(self, max_workers: int = 2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ingest')
+        self._stages: List[Dict[str, Any]] = []
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._probe_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='probe')
+        self._probing = set()
+        
+        # Without a probe, extraction falls back to probing on demand
+        self.add_stage('probe', '미디어 정보 분석 중...', self._probe, required=False)
+        self.add_stage('audio', '오디오 트랙 추출 중...', self._extract_audio)
+        self.add_stage('loudness', '음량 분석 중...', self._measure_loudness, required=False)
+        self.add_stage('pcm', '오디오 분석용 디코딩 중...', self._decode_pcm, required=False)
+        self.add_stage('waveform', '파형 데이터 생성 중...', self._build_waveform, required=False)
+        self.add_stage('subtitles', '자막 가져오는 중...', self._import_subtitles, required=False)
+    
+    def add_stage(self, name: str, message: str, run: Callable[[Dict[str, Any], Callable[[float], None]], None],
+                  required: bool = True):
+        """Append a stage; ``run(job, report)`` may call ``report(fraction)`` as it goes"""
+        self._stages.append({'name': name, 'message': message, 'run': run, 'required': required})
+    
+    def submit(self, media_id: str, media_path: str, file_type: str,
+               subtitle_path: Optional[str] = None, transcribe: Optional[str] = None):
+        """Queue the ingest of a registered media
+        
+        The transcription choice is stored with the media so an ingest resumed
+        after a restart still runs it.
+        """
+        if transcribe:
+            media_repo.update_metadata(media_id, {'transcribe': transcribe})
+        job = {
+            'media_id': media_id,
+            'media_path': media_path,
+            'file_type': file_type,
+            'subtitle_path': subtitle_path,
+            'transcribe': transcribe
+        }
+        self._set_status(media_id, {
+            'stage': 'queued',
+            'progress': 0,
+            'message': '처리 대기 중...',
+            'stages': {stage['name']: 'pending' for stage in self._stages}
+        })
+        self._executor.submit(self._run, job)
+    
+    def probe_in_background(self, media_id: str, media_path: str, probe: Optional[Dict[str, Any]] = None) -> bool:
+        """Probe a media, or only scan the keyframes missing from ``probe``, on the probe worker
+        
+        The result is stored with the media and handed to the ffmpeg processor.
+        Returns False when a probe of the media is already queued.
+        """
+        with self._lock:
+            if media_id in self._probing:
+                return False
+            self._probing.add(media_id)
+        self._probe_executor.submit(self._probe_background, media_id, media_path, probe)
+        return True
+    
+    def _probe_background(self, media_id: str, media_path: str, probe: Optional[Dict[str, Any]]):
+        try:
+            if probe is None:
+                probe = ffmpeg_processor.probe_media(media_path, keyframes=False)
+                if not probe:
+                    logger.error(f"Background probe failed for media {media_id}")
+                    return
+                media_repo.update_metadata(media_id, {'probe': probe})
+                ffmpeg_processor.remember_probe(media_path, probe)
+            if 'keyframes' not in probe:
+                # None records a failed scan, so it is not retried on every request
+                probe = dict(probe, keyframes=ffmpeg_processor.probe_keyframes(media_path, probe))
+                media_repo.update_metadata(media_id, {'probe': probe})
+                ffmpeg_processor.remember_probe(media_path, probe)
+            logger.info(f"Background probe finished for media {media_id}")
+        except Exception as e:
+            logger.error(f"Background probe failed for media {media_id}: {e}")
+        finally:
+            with self._lock:
+                self._probing.discard(media_id)
+    
+    def status(self, media_id: str) -> Optional[Dict[str, Any]]:
+        """Current stage, overall progress and the state of every stage"""
+        with self._lock:
+            status = self._status.get(media_id)
+            return dict(status, stages=dict(status['stages'])) if status else None
+    
+    def _set_status(self, media_id: str, status: Dict[str, Any]):
+        with self._lock:
+            self._status[media_id] = status
+    
+    def _update_status(self, media_id: str, stage_states: Optional[Dict[str, str]] = None, **fields):
+        with self._lock:
+            status = self._status[media_id]
+            status.update(fields)
+            if stage_states:
+                status['stages'].update(stage_states)
+    
+    def _run(self, job: Dict[str, Any]):
+        media_id = job['media_id']
+        stage_count = len(self._stages)
+        
+        for position, stage in enumerate(self._stages):
+            name = stage['name']
+            
+            def report(fraction: float, position=position, stage=stage):
+                self._update_status(
+                    media_id,
+                    progress=int((position + min(max(fraction, 0.0), 1.0)) / stage_count * 100),
+                    message=stage['message']
+                )
+            
+            self._update_status(media_id, {name: 'running'}, stage=name,
+                                progress=int(position / stage_count * 100), message=stage['message'])
+            try:
+                skipped = stage['run'](job, report) is False
+                self._update_status(media_id, {name: 'skipped' if skipped else 'done'})
+            except Exception as e:
+                logger.error(f"Ingest stage {name} failed for media {media_id}: {e}")
+                self._update_status(media_id, {name: 'failed'})
+                if stage['required']:
+                    self._update_status(media_id, stage='error', progress=0,
+                                        message=f'처리 중 오류가 발생했습니다: {str(e)}')
+                    media_repo.update_status(media_id, 'error')
+                    return
+        
+        self._update_status(media_id, stage='completed', progress=100, message='처리가 완료되었습니다.')
+        # A transcription stage sets its own final status
+        media = media_repo.get_by_id(media_id)
+        if media and media['status'] == 'ingesting':
+            media_repo.update_status(media_id, 'uploaded')
+        logger.info(f"Ingest finished for media {media_id}")
+    
+    def _probe(self, job: Dict[str, Any], report: Callable[[float], None]):
+        """Read duration and codecs once; extraction uses the stored result
+        
+        Keyframes are scanned in the background and added to the stored probe.
+        """
+        probe = ffmpeg_processor.probe_media(job['media_path'], keyframes=False)
+        if not probe:
+            raise RuntimeError('Could not read the media file')
+        
+        job['probe'] = probe
+        job['duration'] = probe.get('duration')
+        media_repo.update_metadata(job['media_id'], {'probe': probe})
+        if job['duration']:
+            media_repo.update_duration(job['media_id'], job['duration'])
+        ffmpeg_processor.remember_probe(job['media_path'], probe)
+        if 'keyframes' not in probe:
+            self.probe_in_background(job['media_id'], job['media_path'], probe)
+    
+    def _extract_audio(self, job: Dict[str, Any], report: Callable[[float], None]):
+        """MP3 of a video's audio track, which playback, clips and analysis read"""
+        if job['file_type'] != 'video':
+            job['audio_path'] = job['media_path']
+            return False
+        
+        audio_path = os.path.join(os.path.dirname(job['media_path']), f"{job['media_id']}.mp3")
+        if not ffmpeg_processor.extract_audio_from_video(
+            job['media_path'], audio_path, job.get('duration'),
+            lambda fraction, eta, speed: report(fraction)
+        ):
+            raise RuntimeError('Audio extraction failed')
+        job['audio_path'] = audio_path
+    
+    def _measure_loudness(self, job: Dict[str, Any], report: Callable[[float], None]):
+        """One EBU R128 pass; clips then get a fixed gain instead of the old 3x boost"""
+        loudness = ffmpeg_processor.measure_loudness(
+            job['audio_path'], job.get('duration'), lambda fraction, eta, speed: report(fraction)
+        )
+        if not loudness:
+            raise RuntimeError('Loudness measurement failed')
+        
+        media_repo.update_metadata(job['media_id'], {'loudness': loudness})
+        for media_file in {job['media_path'], job['audio_path']}:
+            ffmpeg_processor.remember_loudness(media_file, loudness)
+    
+    def _decode_pcm(self, job: Dict[str, Any], report: Callable[[float], None]):
+        """Decode once into the PCM cache for analysis and clip slicing"""
+        pcm_cache.ensure_all(job['audio_path'])
+    
+    def _build_waveform(self, job: Dict[str, Any], report: Callable[[float], None]):
+        """Peaks the player draws instead of decoding the audio itself"""
+        waveform_store.build(job['media_id'], job['audio_path'])
+    
+    def _import_subtitles(self, job: Dict[str, Any], report: Callable[[float], None]):
+        """Sentences of an SRT that came with the media, in one chapter and scene"""
+        subtitle_path = job.get('subtitle_path')
+        if not subtitle_path or not os.path.exists(subtitle_path):
+            return False
+        
+        sentences = subtitle_processor.parse_srt_file(subtitle_path)
+        if not sentences:
+            return False
+        
+        end_time = job.get('duration') or max(sentence['endTime'] for sentence in sentences)
+        for order, sentence in enumerate(sentences, 1):
+            sentence['order'] = order
+        structure_repo.replace_structure(job['media_id'], [{
+            'title': 'Subtitles',
+            'startTime': 0.0,
+            'endTime': end_time,
+            'scenes': [{
+                'title': 'Main Scene',
+                'startTime': 0.0,
+                'endTime': end_time,
+                'sentences': sentences
+            }]
+        }])
+        logger.info(f"Imported {len(sentences)} subtitle sentences for media {job['media_id']}")
+
+# Singleton instance
+ingest_pipeline = IngestPipeline(max_workers=int(os.environ.get('INGEST_WORKERS', 2)))
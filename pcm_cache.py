@@ -0,0 +1,230 @@
+"""
+Raw PCM cache of decoded media, read through numpy.memmap for analysis and clip slicing
+"""
+import os
+import hashlib
+import logging
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class PCMCache:
+    """Each media decoded once into signed 16-bit little-endian PCM files.
+    
+    The analysis copy (16 kHz mono) serves silence detection and VAD, and the
+    optional full-rate copy serves clip extraction. Both are opened as memmaps, so a
+    sentence is a zero-copy view of the array and only the final encode runs ffmpeg.
+    Files are keyed by the identity of the source (path, size, mtime), so a replaced
+    file is decoded again.
+    """
+    
+    ANALYSIS_RATE = 16000
+    ANALYSIS_CHANNELS = 1
+    FULL_RATE = 44100
+    FULL_CHANNELS = 2
+    # Full-scale amplitude of int16, the 0 dBFS reference
+    FULL_SCALE = 32768.0
+    
+    def __init__(self, cache_dir: str = 'cache/pcm', keep_full_rate: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.keep_full_rate = keep_full_rate
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+    
+    def _path(self, media_file: str, sample_rate: int, channels: int) -> Path:
+        stat = os.stat(media_file)
+        identity = f"{os.path.realpath(media_file)}|{stat.st_size}|{stat.st_mtime_ns}"
+        digest = hashlib.sha256(identity.encode('utf-8')).hexdigest()[:32]
+        return self.cache_dir / f"{digest}_{sample_rate}_{channels}.s16le"
+    
+    def _lock_for(self, path: Path) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(str(path), threading.Lock())
+    
+    def ensure(self, media_file: str, sample_rate: int = ANALYSIS_RATE,
+               channels: int = ANALYSIS_CHANNELS, timeout: int = 1800) -> str:
+        """Decode media_file into the cache unless it is there; returns the PCM path"""
+        path = self._path(media_file, sample_rate, channels)
+        if path.exists():
+            return str(path)
+        
+        # One decode per file even when several callers ask at once
+        with self._lock_for(path):
+            if path.exists():
+                return str(path)
+            
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            partial_path = path.with_name(path.name + '.partial')
+            cmd = [
+                'ffmpeg',
+                '-i', media_file,
+                '-vn',
+                '-ac', str(channels),
+                '-ar', str(sample_rate),
+                '-f', 's16le',
+                '-y', str(partial_path)
+            ]
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+            if result.returncode != 0:
+                if partial_path.exists():
+                    partial_path.unlink()
+                raise RuntimeError(f"PCM decode failed for {media_file}: {result.stderr.strip()[-500:]}")
+            os.replace(partial_path, path)
+        
+        logger.info(f"PCM cache created: {path} ({path.stat().st_size} bytes)")
+        return str(path)
+    
+    def ensure_all(self, media_file: str) -> List[str]:
+        """Ingest step: the analysis copy, plus the full-rate copy when enabled"""
+        paths = [self.ensure(media_file)]
+        if self.keep_full_rate:
+            paths.append(self.ensure(media_file, self.FULL_RATE, self.FULL_CHANNELS))
+        return paths
+    
+    def has_full_rate(self, media_file: str) -> bool:
+        """Whether clips of media_file can be cut from the cache"""
+        return self.keep_full_rate and self._path(media_file, self.FULL_RATE, self.FULL_CHANNELS).exists()
+    
+    def load(self, media_file: str, sample_rate: int = ANALYSIS_RATE,
+             channels: int = ANALYSIS_CHANNELS) -> np.ndarray:
+        """Read-only memmap of the samples, shape (frames,) or (frames, channels)"""
+        path = self.ensure(media_file, sample_rate, channels)
+        frames = os.path.getsize(path) // (2 * channels)
+        if frames == 0:
+            return np.zeros((0,) if channels == 1 else (0, channels), dtype='<i2')
+        shape = (frames,) if channels == 1 else (frames, channels)
+        return np.memmap(path, dtype='<i2', mode='r', shape=shape)
+    
+    def duration(self, media_file: str) -> float:
+        """Length in seconds of the decoded audio"""
+        return len(self.load(media_file)) / self.ANALYSIS_RATE
+    
+    def slice(self, media_file: str, start_time: float, end_time: float,
+              full_rate: bool = False) -> np.ndarray:
+        """View of the samples between two times (no copy)"""
+        if full_rate:
+            samples, rate = self.load(media_file, self.FULL_RATE, self.FULL_CHANNELS), self.FULL_RATE
+        else:
+            samples, rate = self.load(media_file), self.ANALYSIS_RATE
+        start = max(0, int(round(start_time * rate)))
+        end = max(start, int(round(end_time * rate)))
+        return samples[start:end]
+    
+    def _frame_energy(self, media_file: str, frame_ms: int, block_frames: int = 60000) -> np.ndarray:
+        """Sum of squared samples of every frame_ms frame of the analysis copy.
+        
+        Computed a block at a time so a long file never has to be in memory.
+        """
+        samples = self.load(media_file)
+        frame_len = self.ANALYSIS_RATE * frame_ms // 1000
+        frame_count = len(samples) // frame_len
+        energy = np.empty(frame_count, dtype=np.float64)
+        for first in range(0, frame_count, block_frames):
+            last = min(frame_count, first + block_frames)
+            block = np.asarray(samples[first * frame_len:last * frame_len], dtype=np.float64)
+            energy[first:last] = np.square(block).reshape(-1, frame_len).sum(axis=1)
+        return energy
+    
+    def detect_silence(self, media_file: str, min_silence_len: int = 1000,
+                       silence_thresh: float = -16, seek_step: int = 1) -> List[Tuple[int, int]]:
+        """Silent ranges in milliseconds, like ``pydub.silence.detect_silence``.
+        
+        A range is silent where the RMS of every ``min_silence_len`` window stays
+        below ``silence_thresh`` dBFS; windows are tested every ``seek_step`` ms.
+        """
+        energy = self._frame_energy(media_file, 1)
+        if len(energy) < min_silence_len:
+            return []
+        
+        # Window energy at every start from a running sum of 1 ms frames
+        running = np.concatenate(([0.0], np.cumsum(energy)))
+        window_energy = running[min_silence_len:] - running[:-min_silence_len]
+        window_samples = min_silence_len * self.ANALYSIS_RATE // 1000
+        rms = np.sqrt(window_energy / window_samples)
+        threshold = self.FULL_SCALE * 10 ** (silence_thresh / 20)
+        
+        last_start = len(rms) - 1
+        starts = np.arange(0, last_start + 1, seek_step)
+        # The last window is always tested so the end of the audio is searched
+        if last_start % seek_step:
+            starts = np.append(starts, last_start)
+        # pydub compares the integer RMS of audioop
+        silent_starts = starts[np.floor(rms[starts]) <= threshold]
+        if len(silent_starts) == 0:
+            return []
+        
+        # Silent windows join into one range unless they are not consecutive and
+        # more than min_silence_len apart
+        steps = np.diff(silent_starts)
+        breaks = np.nonzero((steps != seek_step) & (steps > min_silence_len))[0]
+        range_starts = np.concatenate(([silent_starts[0]], silent_starts[breaks + 1]))
+        range_ends = np.concatenate((silent_starts[breaks], [silent_starts[-1]])) + min_silence_len
+        return [(int(start), int(end)) for start, end in zip(range_starts, range_ends)]
+    
+    def detect_nonsilent(self, media_file: str, min_silence_len: int = 1000,
+                         silence_thresh: float = -16, seek_step: int = 1) -> List[Tuple[int, int]]:
+        """Ranges in milliseconds between the silent ones, like ``pydub.silence.detect_nonsilent``"""
+        length = int(self.duration(media_file) * 1000)
+        silent_ranges = self.detect_silence(media_file, min_silence_len, silence_thresh, seek_step)
+        if not silent_ranges:
+            return [(0, length)] if length else []
+        if silent_ranges[0] == (0, length):
+            return []
+        
+        nonsilent_ranges = []
+        previous_end = 0
+        for start, end in silent_ranges:
+            if start > previous_end:
+                nonsilent_ranges.append((previous_end, start))
+            previous_end = end
+        if previous_end < length:
+            nonsilent_ranges.append((previous_end, length))
+        return nonsilent_ranges
+    
+    def encode_clip(self, media_file: str, output_file: str, start_time: float,
+                    duration: float, output_args: List[str], timeout: int = 120) -> bool:
+        """Encode a slice of the full-rate copy; ffmpeg only encodes, reading stdin"""
+        samples = self.slice(media_file, start_time, start_time + duration, full_rate=True)
+        if len(samples) == 0:
+            return False
+        
+        cmd = [
+            'ffmpeg',
+            '-f', 's16le',
+            '-ar', str(self.FULL_RATE),
+            '-ac', str(self.FULL_CHANNELS),
+            '-i', 'pipe:0'
+        ] + output_args + ['-y', output_file]
+        try:
+            result = subprocess.run(cmd, input=memoryview(samples).cast('B'),
+                                    capture_output=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            logger.error(f"FFmpeg timeout encoding {output_file} from PCM cache")
+            return False
+        
+        if result.returncode != 0:
+            logger.error(f"FFmpeg error encoding {output_file} from PCM cache: {result.stderr.decode(errors='replace')[-500:]}")
+            return False
+        return os.path.exists(output_file) and os.path.getsize(output_file) > 0
+    
+    def discard(self, media_file: str):
+        """Remove every cached decode of media_file"""
+        if not os.path.exists(media_file):
+            return
+        for sample_rate, channels in ((self.ANALYSIS_RATE, self.ANALYSIS_CHANNELS),
+                                      (self.FULL_RATE, self.FULL_CHANNELS)):
+            path = self._path(media_file, sample_rate, channels)
+            if path.exists():
+                path.unlink()
+                logger.info(f"PCM cache removed: {path}")
+
+# Singleton instance
+pcm_cache = PCMCache(
+    cache_dir=os.environ.get('PCM_CACHE_DIR', 'cache/pcm'),
+    keep_full_rate=os.environ.get('PCM_CACHE_FULL_RATE', '0') == '1'
+)
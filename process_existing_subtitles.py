@@ -3,10 +3,11 @@
 Process existing subtitle files for imported media
 """
 import os
-import sqlite3
 from pathlib import Path
 import re
 
+from database import structure_repo
+
 def parse_srt_time(time_str):
     """Parse SRT time format to seconds"""
     # Format: 00:01:11,518
@@ -92,38 +93,26 @@ def parse_srt_file(file_path):
 
 def process_subtitle_for_media(media_id, subtitle_path, duration=7200.0):
     """Process subtitle file for a specific media"""
-    db_path = '/home/kang/dev/english/dev.db'
+    # Parse sentences
+    sentences = parse_srt_file(subtitle_path)
+    print(f"Found {len(sentences)} sentences in {subtitle_path}")
+    
+    for i, sentence in enumerate(sentences):
+        sentence['order'] = i + 1
     
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        
-        # Create chapter
-        cursor.execute('''
-            INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (media_id, 'Subtitles', 0.0, duration, 1))
-        chapter_id = cursor.lastrowid
-        
-        # Create scene
-        cursor.execute('''
-            INSERT INTO Scene (chapterId, title, startTime, endTime, `order`)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (chapter_id, 'Main Scene', 0.0, duration, 1))
-        scene_id = cursor.lastrowid
-        
-        # Parse and insert sentences
-        sentences = parse_srt_file(subtitle_path)
-        print(f"Found {len(sentences)} sentences in {subtitle_path}")
-        
-        for i, sentence in enumerate(sentences):
-            cursor.execute('''
-                INSERT INTO Sentence (sceneId, english, startTime, endTime, `order`)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (scene_id, sentence['english'], sentence['startTime'], 
-                  sentence['endTime'], i + 1))
-        
-        conn.commit()
-        print(f"Processed {len(sentences)} sentences for media {media_id}")
+    # One chapter and scene, replacing any previous structure in one transaction
+    structure_repo.replace_structure(media_id, [{
+        'title': 'Subtitles',
+        'startTime': 0.0,
+        'endTime': duration,
+        'scenes': [{
+            'title': 'Main Scene',
+            'startTime': 0.0,
+            'endTime': duration,
+            'sentences': sentences
+        }]
+    }])
+    print(f"Processed {len(sentences)} sentences for media {media_id}")
 
 def main():
     upload_dir = Path('/home/kang/dev/english/upload')
@@ -0,0 +1,157 @@
+"""
+Pre-cut per-sentence audio files served as static, long-cacheable responses
+"""
+import os
+import re
+import shutil
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from ffmpeg_processor import ffmpeg_processor
+
+logger = logging.getLogger(__name__)
+
+class SentenceAudioStore:
+    """Every sentence of a media cut once into a small AAC file.
+    
+    Files live in ``<store_dir>/<media_id>/`` and are named
+    ``<sentence id>-<digest>.m4a``, where the digest covers the source identity,
+    the sentence timing and the clip gain. A name therefore never changes content,
+    so responses can be cached for good, and a sentence whose timing changed gets
+    a new name while the old file is removed on the next sync.
+    """
+    
+    # Bump when the encoding changes so stale files get new names
+    FORMAT_VERSION = 1
+    EXTENSION = '.m4a'
+    MIMETYPE = 'audio/mp4'
+    # Written as .partial first, so the muxer is given explicitly
+    ENCODE_ARGS = ['-c:a', 'aac', '-b:a', '96k', '-movflags', '+faststart', '-f', 'mp4']
+    
+    _NAME_PATTERN = re.compile(r'^(\d+)-[0-9a-f]{16}\.m4a$')
+    
+    def __init__(self, store_dir: str = 'cache/sentences', at_ingest: bool = True):
+        self.store_dir = Path(store_dir)
+        self.at_ingest = at_ingest
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+    
+    def _media_dir(self, media_id: str) -> Path:
+        return self.store_dir / media_id
+    
+    def _lock_for(self, media_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(media_id, threading.Lock())
+    
+    def filename(self, audio_file: str, sentence: Dict[str, Any], volume: Optional[float] = None) -> str:
+        """Name of the file of a sentence at its current timing and gain"""
+        volume = ffmpeg_processor.volume_for(audio_file) if volume is None else volume
+        stat = os.stat(audio_file)
+        identity = (f"{self.FORMAT_VERSION}|{os.path.realpath(audio_file)}|{stat.st_size}|{stat.st_mtime_ns}|"
+                    f"{float(sentence['startTime']):.3f}|{float(sentence['endTime']):.3f}|{round(volume, 3)}")
+        digest = hashlib.sha256(identity.encode('utf-8')).hexdigest()[:16]
+        return f"{sentence['id']}-{digest}{self.EXTENSION}"
+    
+    def path(self, media_id: str, filename: str) -> Optional[str]:
+        """Stored file of a name produced by ``filename``, or None"""
+        if not self._NAME_PATTERN.match(filename):
+            return None
+        path = self._media_dir(media_id) / filename
+        return str(path) if path.exists() else None
+    
+    def _stored(self, media_id: str) -> List[Path]:
+        media_dir = self._media_dir(media_id)
+        if not media_dir.exists():
+            return []
+        return [path for path in media_dir.iterdir() if self._NAME_PATTERN.match(path.name)]
+    
+    def _cut(self, media_id: str, audio_file: str, sentences: List[Dict[str, Any]],
+             filenames: List[str], volume: float) -> List[bool]:
+        """Encode sentences in one decode per pass, publishing each file atomically"""
+        media_dir = self._media_dir(media_id)
+        media_dir.mkdir(parents=True, exist_ok=True)
+        segments = [
+            (sentence['startTime'], sentence['endTime'] - sentence['startTime'],
+             str(media_dir / (filename + '.partial')))
+            for sentence, filename in zip(sentences, filenames)
+        ]
+        results = ffmpeg_processor.extract_audio_segments(audio_file, segments, volume, self.ENCODE_ARGS)
+        for (_, _, partial_path), filename, success in zip(segments, filenames, results):
+            if success:
+                os.replace(partial_path, media_dir / filename)
+            elif os.path.exists(partial_path):
+                os.remove(partial_path)
+        return results
+    
+    def ensure(self, media_id: str, audio_file: str, sentence: Dict[str, Any]) -> Optional[str]:
+        """Name of the current file of one sentence, cutting it when missing"""
+        volume = ffmpeg_processor.volume_for(audio_file)
+        filename = self.filename(audio_file, sentence, volume)
+        if self.path(media_id, filename):
+            return filename
+        if sentence['endTime'] <= sentence['startTime']:
+            return None
+        
+        with self._lock_for(media_id):
+            if not self.path(media_id, filename):
+                if not self._cut(media_id, audio_file, [sentence], [filename], volume)[0]:
+                    return None
+                # Files of the sentence's previous timing
+                for path in self._stored(media_id):
+                    if path.name != filename and path.name.startswith(f"{sentence['id']}-"):
+                        path.unlink()
+        return filename
+    
+    def sync(self, media_id: str, audio_file: str, sentences: List[Dict[str, Any]],
+             report: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+        """Bring the files of a media in line with its sentences.
+        
+        Only sentences without a file at their current timing are cut; files of
+        changed or deleted sentences are removed. ``report(done, total)`` is called
+        after every pass. Returns the counts of kept, cut, failed and removed files.
+        """
+        volume = ffmpeg_processor.volume_for(audio_file)
+        with self._lock_for(media_id):
+            wanted = {}
+            for sentence in sentences:
+                if sentence['endTime'] > sentence['startTime']:
+                    wanted[self.filename(audio_file, sentence, volume)] = sentence
+            
+            stored = {path.name: path for path in self._stored(media_id)}
+            removed = 0
+            for name, path in stored.items():
+                if name not in wanted:
+                    path.unlink()
+                    removed += 1
+            
+            missing = sorted((name for name in wanted if name not in stored),
+                             key=lambda name: wanted[name]['startTime'])
+            cut = 0
+            pass_size = ffmpeg_processor.MAX_CLIPS_PER_PASS
+            for first in range(0, len(missing), pass_size):
+                names = missing[first:first + pass_size]
+                cut += sum(self._cut(media_id, audio_file, [wanted[name] for name in names], names, volume))
+                if report:
+                    report(first + len(names), len(missing))
+        
+        counts = {
+            'kept': len(wanted) - len(missing),
+            'cut': cut,
+            'failed': len(missing) - cut,
+            'removed': removed
+        }
+        logger.info(f"Sentence audio synced for media {media_id}: {counts}")
+        return counts
+    
+    def delete(self, media_id: str):
+        """Remove every sentence file of a media"""
+        shutil.rmtree(self._media_dir(media_id), ignore_errors=True)
+
+# Singleton instance
+sentence_audio_store = SentenceAudioStore(
+    store_dir=os.environ.get('SENTENCE_AUDIO_DIR', 'cache/sentences'),
+    at_ingest=os.environ.get('SENTENCE_AUDIO_AT_INGEST', '1') == '1'
+)
@@ -1,8 +1,8 @@
 from faster_whisper import WhisperModel
 from deep_translator import GoogleTranslator
-import sqlite3
 from pydub import AudioSegment
 from pydub.silence import detect_silence
+from database import media_repo, structure_repo
 
 # Whisper 모델 초기화 (base 모델로 정확도와 속도 균형)
 model = None  # 지연 로딩
@@ -70,28 +70,24 @@ def process_audio_file_realtime(filepath, media_id, progress_callback=None):
         
         segments, info = model.transcribe(filepath, beam_size=1)
         
-        # DB 연결
-        conn = sqlite3.connect('dev.db')
-        cursor = conn.cursor()
-        
         # 미디어 정보 업데이트
-        cursor.execute(
-            "UPDATE Media SET duration = ? WHERE id = ?",
-            (info.duration, media_id)
-        )
-        
-        # 기본 챕터/씬 생성 (나중에 재구성 가능)
-        cursor.execute(
-            "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (media_id, "Chapter 1", 0, info.duration, 1)
-        )
-        chapter_id = cursor.lastrowid
-        
-        cursor.execute(
-            "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (chapter_id, "Scene 1", 0, info.duration, 1)
-        )
-        scene_id = cursor.lastrowid
+        media_repo.update_duration(media_id, info.duration)
+        
+        # 기본 챕터/씬 하나 (나중에 재구성 가능); 기존 구조는 한 트랜잭션으로 교체
+        sentences = []
+        
+        def save_structure():
+            structure_repo.replace_structure(media_id, [{
+                'title': "Chapter 1",
+                'startTime': 0,
+                'endTime': info.duration,
+                'scenes': [{
+                    'title': "Scene 1",
+                    'startTime': 0,
+                    'endTime': info.duration,
+                    'sentences': sentences
+                }]
+            }])
         
         # 실시간으로 문장 처리
         sentence_count = 0
@@ -108,20 +104,21 @@ def process_audio_file_realtime(filepath, media_id, progress_callback=None):
             except:
                 korean_text = english_text
             
-            # DB에 즉시 저장
-            cursor.execute(
-                """INSERT INTO Sentence 
-                (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (scene_id, english_text, korean_text, segment.start, segment.end, 0, sentence_count)
-            )
+            sentences.append({
+                'english': english_text,
+                'korean': korean_text,
+                'startTime': segment.start,
+                'endTime': segment.end,
+                'order': sentence_count
+            })
             
-            # 실시간 커밋 (매 문장마다)
-            conn.commit()
+            # 진행 중에도 보이도록 10문장마다 저장 (id는 유지됨)
+            if sentence_count % 10 == 0:
+                save_structure()
             
             print(f"Added sentence {sentence_count}: {english_text}")
         
-        conn.close()
+        save_structure()
         
         if progress_callback:
             progress_callback(f"완료! 총 {sentence_count}개 문장 추출")
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
-import sqlite3
 import re
+from database import sentence_repo, structure_repo
 
 def find_toeic_part_boundaries(sentences):
     """토익 파트 경계를 Directions 기준으로 찾기"""
@@ -45,27 +45,16 @@ def find_toeic_part_boundaries(sentences):
 def apply_directions_based_structure(media_id):
     """Directions 기반으로 토익 구조 적용"""
     
-    conn = sqlite3.connect('dev.db')
-    cursor = conn.cursor()
-    
     # 기존 문장들 로드
-    cursor.execute('''
-        SELECT s.english, s.korean, s.startTime, s.endTime, s.`order`
-        FROM Sentence s
-        JOIN Scene sc ON s.sceneId = sc.id
-        JOIN Chapter c ON sc.chapterId = c.id
-        WHERE c.mediaId = ?
-        ORDER BY s.`order`
-    ''', (media_id,))
-    
     sentences = []
-    for row in cursor.fetchall():
+    for row in sentence_repo.get_by_media_id(media_id):
         sentences.append({
-            'english': row[0],
-            'korean': row[1] or '',
-            'start_time': row[2],
-            'end_time': row[3],
-            'order': row[4]
+            'id': row['id'],
+            'english': row['english'],
+            'korean': row['korean'] or '',
+            'start_time': row['startTime'],
+            'end_time': row['endTime'],
+            'order': row['order']
         })
     
     print(f"총 {len(sentences)}개 문장 분석...")
@@ -82,11 +71,6 @@ def apply_directions_based_structure(media_id):
         print(f"  Directions: {boundary['directions_text'][:60]}...")
         print()
     
-    # 기존 구조 삭제
-    cursor.execute("DELETE FROM Sentence WHERE sceneId IN (SELECT id FROM Scene WHERE chapterId IN (SELECT id FROM Chapter WHERE mediaId = ?))", (media_id,))
-    cursor.execute("DELETE FROM Scene WHERE chapterId IN (SELECT id FROM Chapter WHERE mediaId = ?)", (media_id,))
-    cursor.execute("DELETE FROM Chapter WHERE mediaId = ?", (media_id,))
-    
     # 파트별 구조 정의
     part_structures = {
         1: {
@@ -112,31 +96,24 @@ def apply_directions_based_structure(media_id):
     }
     
     # 새 구조 생성
+    chapters = []
     for boundary in boundaries:
         part_num = boundary['part']
         part_structure = part_structures.get(part_num, {})
         
         part_sentences = sentences[boundary['start_index']:boundary['end_index']+1]
         
-        # 챕터 생성
-        chapter_title = part_structure.get('title', f'Part {part_num}')
-        cursor.execute(
-            "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (media_id, chapter_title, boundary['start_time'], boundary['end_time'], part_num)
-        )
-        chapter_id = cursor.lastrowid
-        
         # 씬 생성
         sentences_per_scene = part_structure.get('sentences_per_scene', 20)
         scene_pattern = part_structure.get('scene_pattern', 'section')
         
-        scene_count = 0
+        scenes = []
         for i in range(0, len(part_sentences), sentences_per_scene):
             scene_sentences = part_sentences[i:i+sentences_per_scene]
             if not scene_sentences:
                 continue
                 
-            scene_count += 1
+            scene_count = len(scenes) + 1
             
             # 씬 제목 생성
             if scene_pattern == 'photograph':
@@ -152,27 +129,24 @@ def apply_directions_based_structure(media_id):
             else:
                 scene_title = f"섹션 {scene_count}"
             
-            scene_start = scene_sentences[0]['start_time']
-            scene_end = scene_sentences[-1]['end_time']
-            
-            cursor.execute(
-                "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                (chapter_id, scene_title, scene_start, scene_end, scene_count)
-            )
-            scene_id = cursor.lastrowid
-            
-            # 문장들 추가
-            for sentence in scene_sentences:
-                cursor.execute(
-                    """INSERT INTO Sentence 
-                    (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (scene_id, sentence['english'], sentence['korean'], 
-                     sentence['start_time'], sentence['end_time'], 0, sentence['order'])
-                )
+            scenes.append({
+                'title': scene_title,
+                'start_time': scene_sentences[0]['start_time'],
+                'end_time': scene_sentences[-1]['end_time'],
+                'sentences': scene_sentences
+            })
+        
+        # 챕터 생성
+        chapters.append({
+            'title': part_structure.get('title', f'Part {part_num}'),
+            'start_time': boundary['start_time'],
+            'end_time': boundary['end_time'],
+            'order': part_num,
+            'scenes': scenes
+        })
     
-    conn.commit()
-    conn.close()
+    # 기존 구조를 한 트랜잭션으로 교체
+    structure_repo.replace_structure(media_id, chapters)
     
     print(f"✅ Directions 기반 토익 구조 적용 완료: {len(boundaries)}개 파트")
     return boundaries
@@ -181,28 +155,13 @@ if __name__ == "__main__":
     boundaries = apply_directions_based_structure(9)
     
     # 결과 확인
-    conn = sqlite3.connect('dev.db')
-    cursor = conn.cursor()
-    
     print("\\n=== 최종 구조 확인 ===")
-    cursor.execute('''
-        SELECT c.title, c.startTime, c.endTime,
-               COUNT(DISTINCT sc.id) as scene_count,
-               COUNT(s.id) as sentence_count
-        FROM Chapter c
-        LEFT JOIN Scene sc ON c.id = sc.chapterId
-        LEFT JOIN Sentence s ON sc.id = s.sceneId
-        WHERE c.mediaId = 9
-        GROUP BY c.id
-        ORDER BY c.`order`
-    ''')
-    
-    for row in cursor.fetchall():
-        title, start_time, end_time, scene_count, sentence_count = row
+    for chapter in structure_repo.get_structure(9):
+        start_time, end_time = chapter['startTime'], chapter['endTime']
+        scene_count = len(chapter['scenes'])
+        sentence_count = sum(len(scene['sentences']) for scene in chapter['scenes'])
         duration = end_time - start_time
-        print(f"{title}")
+        print(f"{chapter['title']}")
         print(f"  시간: {start_time//60:.0f}:{start_time%60:02.0f} - {end_time//60:.0f}:{end_time%60:02.0f} ({duration/60:.1f}분)")
         print(f"  구성: {scene_count}개 씬, {sentence_count}개 문장")
         print()
-    
-    conn.close()
\ No newline at end of file
@@ -4,7 +4,6 @@
 실제 토익 구조를 반영한 정확한 Scene 분할 시스템
 """
 
-import sqlite3
 import re
 
 class TOEICSmartTemplate:
@@ -231,92 +230,69 @@ class TOEICSmartTemplate:
         
         return scenes
 
-def apply_toeic_smart_template(media_id):
-    """토익 스마트 템플릿 적용"""
-    
+def build_toeic_smart_structure(chapters):
+    """Part별 문장들을 토익 스마트 템플릿 Scene 구조로 변환 (DB 접근 없음)"""
     template = TOEICSmartTemplate()
+    structure = []
     
-    # 데이터베이스 연결
-    conn = sqlite3.connect('dev.db')
-    cursor = conn.cursor()
-    
-    print("=== 토익 스마트 템플릿 적용 ===")
-    
-    # 현재 Part별 문장들 가져오기
-    cursor.execute('''
-        SELECT c.id, c.title, c.`order`, c.startTime, c.endTime
-        FROM Chapter c
-        WHERE c.mediaId = ?
-        ORDER BY c.`order`
-    ''', (media_id,))
-    
-    chapters = cursor.fetchall()
-    
-    for chapter_id, chapter_title, chapter_order, chapter_start, chapter_end in chapters:
-        part_num = chapter_order  # Part 번호
+    for chapter in chapters:
+        part_num = chapter['order']  # Part 번호
+        sentences = chapter['sentences']
         
-        print(f"\n📝 {chapter_title} (Part {part_num}) 처리 중...")
-        
-        # 해당 Part의 모든 문장 가져오기
-        cursor.execute('''
-            SELECT s.english, s.korean, s.startTime, s.endTime, s.`order`, s.id
-            FROM Sentence s
-            JOIN Scene sc ON s.sceneId = sc.id
-            WHERE sc.chapterId = ?
-            ORDER BY s.`order`
-        ''', (chapter_id,))
-        
-        sentences = []
-        for row in cursor.fetchall():
-            sentences.append({
-                'english': row[0],
-                'korean': row[1] or '',
-                'start_time': row[2],
-                'end_time': row[3],
-                'order': row[4],
-                'id': row[5]
-            })
+        print(f"\n📝 {chapter['title']} (Part {part_num}) 처리 중...")
         
         if not sentences:
             print(f"  ⚠️ Part {part_num}: 문장이 없음")
-            continue
-        
-        print(f"  총 {len(sentences)}개 문장")
-        
-        # Scene 경계 찾기
-        scene_boundaries = template.find_scene_boundaries(sentences, part_num)
-        
-        # Scene별로 그룹화
-        scenes = template.group_sentences_by_scenes(sentences, scene_boundaries)
-        
-        print(f"  → {len(scenes)}개 Scene 생성")
-        
-        # 기존 Scene들 삭제
-        cursor.execute("DELETE FROM Sentence WHERE sceneId IN (SELECT id FROM Scene WHERE chapterId = ?)", (chapter_id,))
-        cursor.execute("DELETE FROM Scene WHERE chapterId = ?", (chapter_id,))
-        
-        # 새 Scene들 생성
-        for scene_order, scene_data in enumerate(scenes):
-            cursor.execute(
-                "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                (chapter_id, scene_data['title'], scene_data['start_time'], scene_data['end_time'], scene_order + 1)
-            )
-            scene_id = cursor.lastrowid
+            scenes = []
+        else:
+            print(f"  총 {len(sentences)}개 문장")
+            
+            # Scene 경계 찾기
+            scene_boundaries = template.find_scene_boundaries(sentences, part_num)
             
-            # Scene에 문장들 추가
-            for sentence in scene_data['sentences']:
-                cursor.execute(
-                    """INSERT INTO Sentence 
-                    (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (scene_id, sentence['english'], sentence['korean'], 
-                     sentence['start_time'], sentence['end_time'], 0, sentence['order'])
-                )
+            # Scene별로 그룹화
+            scenes = template.group_sentences_by_scenes(sentences, scene_boundaries)
             
-            print(f"    Scene {scene_order+1}: '{scene_data['title']}' - {len(scene_data['sentences'])}개 문장")
+            print(f"  → {len(scenes)}개 Scene 생성")
+            for scene_order, scene_data in enumerate(scenes):
+                print(f"    Scene {scene_order+1}: '{scene_data['title']}' - {len(scene_data['sentences'])}개 문장")
+        
+        structure.append({
+            'title': chapter['title'],
+            'start_time': chapter['start_time'],
+            'end_time': chapter['end_time'],
+            'order': chapter['order'],
+            'scenes': scenes
+        })
+    
+    return structure
+
+def apply_toeic_smart_template(media_id):
+    """토익 스마트 템플릿 적용"""
+    from database import structure_repo
+    
+    print("=== 토익 스마트 템플릿 적용 ===")
     
-    conn.commit()
-    conn.close()
+    # 현재 Part별 문장들 가져오기
+    chapters = []
+    for chapter in structure_repo.get_structure(media_id):
+        chapters.append({
+            'title': chapter['title'],
+            'start_time': chapter['startTime'],
+            'end_time': chapter['endTime'],
+            'order': chapter['order'],
+            'sentences': sorted([{
+                'english': s['english'],
+                'korean': s['korean'] or '',
+                'start_time': s['startTime'],
+                'end_time': s['endTime'],
+                'order': s['order'],
+                'id': s['id']
+            } for scene in chapter['scenes'] for s in scene['sentences']], key=lambda s: s['order'])
+        })
+    
+    # 전체 구조를 한 번에 교체
+    structure_repo.replace_structure(media_id, build_toeic_smart_structure(chapters))
     
     print("\n✅ 토익 스마트 템플릿 적용 완료!")
     
@@ -325,59 +301,29 @@ def apply_toeic_smart_template(media_id):
 
 def print_final_structure(media_id):
     """최종 구조 출력"""
-    conn = sqlite3.connect('dev.db')
-    cursor = conn.cursor()
+    from database import structure_repo
     
     print("\n=== 최종 구조 ===")
     
-    cursor.execute('''
-        SELECT c.title, c.startTime, c.endTime
-        FROM Chapter c
-        WHERE c.mediaId = ?
-        ORDER BY c.`order`
-    ''', (media_id,))
-    
-    chapters = cursor.fetchall()
-    
-    for chapter_title, chapter_start, chapter_end in chapters:
-        duration = chapter_end - chapter_start
-        print(f"\n📚 {chapter_title} ({duration/60:.1f}분)")
+    for chapter in structure_repo.get_structure(media_id):
+        duration = chapter['endTime'] - chapter['startTime']
+        print(f"\n📚 {chapter['title']} ({duration/60:.1f}분)")
         
-        cursor.execute('''
-            SELECT sc.title, sc.startTime, sc.endTime, COUNT(s.id) as sentence_count
-            FROM Scene sc
-            LEFT JOIN Sentence s ON sc.id = s.sceneId
-            JOIN Chapter c ON sc.chapterId = c.id
-            WHERE c.title = ? AND c.mediaId = ?
-            GROUP BY sc.id
-            ORDER BY sc.`order`
-        ''', (chapter_title, media_id))
-        
-        scenes = cursor.fetchall()
-        for scene_title, scene_start, scene_end, sentence_count in scenes:
-            scene_duration = scene_end - scene_start
-            print(f"  🎬 {scene_title} ({scene_duration/60:.1f}분) - {sentence_count}개 문장")
-    
-    conn.close()
+        for scene in chapter['scenes']:
+            scene_duration = scene['endTime'] - scene['startTime']
+            print(f"  🎬 {scene['title']} ({scene_duration/60:.1f}분) - {len(scene['sentences'])}개 문장")
 
 def test_pattern_detection(media_id):
     """패턴 감지 테스트"""
-    conn = sqlite3.connect('dev.db')
-    cursor = conn.cursor()
+    from database import sentence_repo
     
     print("=== 패턴 감지 테스트 ===")
     
     # 모든 문장에서 패턴 찾기
-    cursor.execute('''
-        SELECT s.english, s.startTime, c.title
-        FROM Sentence s
-        JOIN Scene sc ON s.sceneId = sc.id
-        JOIN Chapter c ON sc.chapterId = c.id
-        WHERE c.mediaId = ?
-        ORDER BY s.`order`
-    ''', (media_id,))
-    
-    sentences = cursor.fetchall()
+    sentences = [
+        (s['english'], s['startTime'], s['chapterTitle'])
+        for s in sentence_repo.get_by_media_id(media_id)
+    ]
     
     # Number 패턴
     print("\n🔍 Number 패턴:")
@@ -396,8 +342,6 @@ def test_pattern_detection(media_id):
         if match:
             start_q, end_q = match.group(1), match.group(2)
             print(f"  {chapter_title}: Questions {start_q}-{end_q} at {start_time/60:.1f}m - {text[:50]}...")
-    
-    conn.close()
 
 if __name__ == "__main__":
     print("토익 스마트 템플릿 시작...")
@@ -1,31 +1,20 @@
 #!/usr/bin/env python3
-import sqlite3
 import re
+from database import sentence_repo, structure_repo
 
 def analyze_toeic_structure(media_id):
     """토익 LC 구조 분석 및 재구성"""
     
-    conn = sqlite3.connect('dev.db')
-    cursor = conn.cursor()
-    
     # 모든 문장 가져오기
-    cursor.execute('''
-        SELECT s.english, s.korean, s.startTime, s.endTime, s.`order`
-        FROM Sentence s
-        JOIN Scene sc ON s.sceneId = sc.id
-        JOIN Chapter c ON sc.chapterId = c.id
-        WHERE c.mediaId = ?
-        ORDER BY s.`order`
-    ''', (media_id,))
-    
     sentences = []
-    for row in cursor.fetchall():
+    for row in sentence_repo.get_by_media_id(media_id):
         sentences.append({
-            'english': row[0],
-            'korean': row[1] or '',
-            'start_time': row[2],
-            'end_time': row[3],
-            'order': row[4]
+            'id': row['id'],
+            'english': row['english'],
+            'korean': row['korean'] or '',
+            'start_time': row['startTime'],
+            'end_time': row['endTime'],
+            'order': row['order']
         })
     
     print(f"총 {len(sentences)}개 문장 분석 중...")
@@ -33,11 +22,6 @@ def analyze_toeic_structure(media_id):
     # 토익 파트별 특성 분석
     part_boundaries = detect_toeic_parts(sentences)
     
-    # 기존 구조 삭제
-    cursor.execute("DELETE FROM Sentence WHERE sceneId IN (SELECT id FROM Scene WHERE chapterId IN (SELECT id FROM Chapter WHERE mediaId = ?))", (media_id,))
-    cursor.execute("DELETE FROM Scene WHERE chapterId IN (SELECT id FROM Chapter WHERE mediaId = ?)", (media_id,))
-    cursor.execute("DELETE FROM Chapter WHERE mediaId = ?", (media_id,))
-    
     # 토익 구조로 재생성
     toeic_parts = [
         {'title': 'Part 1 - 사진 묘사', 'description': '6-10문제'},
@@ -46,6 +30,7 @@ def analyze_toeic_structure(media_id):
         {'title': 'Part 4 - 담화', 'description': '30문제 (10세트)'}
     ]
     
+    chapters = []
     for part_idx, (start_idx, end_idx) in enumerate(part_boundaries):
         if part_idx >= len(toeic_parts):
             break
@@ -55,15 +40,6 @@ def analyze_toeic_structure(media_id):
             continue
             
         part_info = toeic_parts[part_idx]
-        chapter_start = part_sentences[0]['start_time']
-        chapter_end = part_sentences[-1]['end_time']
-        
-        # 챕터 생성
-        cursor.execute(
-            "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (media_id, part_info['title'], chapter_start, chapter_end, part_idx + 1)
-        )
-        chapter_id = cursor.lastrowid
         
         # 파트별 씬 구성
         if part_idx == 0:  # Part 1: 사진별로 씬 구성
@@ -75,26 +51,16 @@ def analyze_toeic_structure(media_id):
         else:  # Part 4: 담화별로 씬 구성
             scenes = create_part4_scenes(part_sentences)
         
-        # 씬들 생성
-        for scene_idx, scene_data in enumerate(scenes):
-            cursor.execute(
-                "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                (chapter_id, scene_data['title'], scene_data['start_time'], scene_data['end_time'], scene_idx + 1)
-            )
-            scene_id = cursor.lastrowid
-            
-            # 문장들 추가
-            for sentence in scene_data['sentences']:
-                cursor.execute(
-                    """INSERT INTO Sentence 
-                    (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (scene_id, sentence['english'], sentence['korean'], 
-                     sentence['start_time'], sentence['end_time'], 0, sentence['order'])
-                )
-    
-    conn.commit()
-    conn.close()
+        chapters.append({
+            'title': part_info['title'],
+            'start_time': part_sentences[0]['start_time'],
+            'end_time': part_sentences[-1]['end_time'],
+            'order': part_idx + 1,
+            'scenes': scenes
+        })
+    
+    # 기존 구조를 한 트랜잭션으로 교체
+    structure_repo.replace_structure(media_id, chapters)
     
     print(f"✅ 토익 LC 구조로 재구성 완료: {len(toeic_parts)}개 파트")
     return part_boundaries
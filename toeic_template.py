@@ -172,37 +172,24 @@ class TOEICTemplate:
 
 def apply_toeic_template_to_media(media_id):
     """미디어에 토익 템플릿 적용"""
-    import sqlite3
+    from database import media_repo, sentence_repo, structure_repo
     
     template = TOEICTemplate()
     
-    # 데이터 로드
-    conn = sqlite3.connect('dev.db')
-    cursor = conn.cursor()
-    
     # 미디어 정보
-    cursor.execute('SELECT duration FROM Media WHERE id = ?', (media_id,))
-    duration_result = cursor.fetchone()
-    total_duration = duration_result[0] if duration_result else 2735  # 기본값
+    media = media_repo.get_by_id(media_id)
+    total_duration = (media or {}).get('duration') or 2735  # 기본값
     
     # 문장들 로드
-    cursor.execute('''
-        SELECT s.english, s.korean, s.startTime, s.endTime, s.`order`
-        FROM Sentence s
-        JOIN Scene sc ON s.sceneId = sc.id
-        JOIN Chapter c ON sc.chapterId = c.id
-        WHERE c.mediaId = ?
-        ORDER BY s.`order`
-    ''', (media_id,))
-    
     sentences = []
-    for row in cursor.fetchall():
+    for row in sentence_repo.get_by_media_id(media_id):
         sentences.append({
-            'english': row[0],
-            'korean': row[1] or '',
-            'start_time': row[2],
-            'end_time': row[3],
-            'order': row[4]
+            'id': row['id'],
+            'english': row['english'],
+            'korean': row['korean'] or '',
+            'start_time': row['startTime'],
+            'end_time': row['endTime'],
+            'order': row['order']
         })
     
     print(f"총 문장 수: {len(sentences)}개, 오디오 길이: {total_duration//60}분 {total_duration%60:.0f}초")
@@ -210,44 +197,23 @@ def apply_toeic_template_to_media(media_id):
     # 템플릿 적용
     structured_data = template.apply_template_to_sentences(sentences, total_duration)
     
-    # 기존 데이터 삭제
-    cursor.execute("DELETE FROM Sentence WHERE sceneId IN (SELECT id FROM Scene WHERE chapterId IN (SELECT id FROM Chapter WHERE mediaId = ?))", (media_id,))
-    cursor.execute("DELETE FROM Scene WHERE chapterId IN (SELECT id FROM Chapter WHERE mediaId = ?)", (media_id,))
-    cursor.execute("DELETE FROM Chapter WHERE mediaId = ?", (media_id,))
-    
     # 새 구조 생성
+    chapters = []
     for part_order, (part_name, part_data) in enumerate(structured_data.items()):
         if not part_data['scenes']:
             continue
             
-        # 챕터 생성
         boundary = part_data['boundary']
-        cursor.execute(
-            "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-            (media_id, part_data['info']['title'], boundary['start'], boundary['end'], part_order + 1)
-        )
-        chapter_id = cursor.lastrowid
-        
-        # 씬들 생성
-        for scene_order, scene_data in enumerate(part_data['scenes']):
-            cursor.execute(
-                "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                (chapter_id, scene_data['title'], scene_data['start_time'], scene_data['end_time'], scene_order + 1)
-            )
-            scene_id = cursor.lastrowid
-            
-            # 문장들 추가
-            for sentence in scene_data['sentences']:
-                cursor.execute(
-                    """INSERT INTO Sentence 
-                    (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (scene_id, sentence['english'], sentence['korean'], 
-                     sentence['start_time'], sentence['end_time'], 0, sentence['order'])
-                )
+        chapters.append({
+            'title': part_data['info']['title'],
+            'start_time': boundary['start'],
+            'end_time': boundary['end'],
+            'order': part_order + 1,
+            'scenes': part_data['scenes']
+        })
     
-    conn.commit()
-    conn.close()
+    # 기존 데이터를 한 트랜잭션으로 교체
+    structure_repo.replace_structure(media_id, chapters)
     
     # 결과 출력
     print("\n=== 토익 템플릿 적용 결과 ===")
@@ -1,6 +1,5 @@
-from pydub import AudioSegment
-from pydub.silence import detect_silence
 import re
+from pcm_cache import pcm_cache
 
 def apply_time_filters(sentences, min_duration=1.0, max_duration=15.0):
     """시간 기반 필터 적용"""
@@ -114,11 +113,9 @@ def apply_content_filters(sentences, min_words=2):
 def detect_natural_breaks(sentences, audio_file, silence_thresh=-40, min_silence_len=2000):
     """자연스러운 브레이크 포인트 감지"""
     try:
-        audio = AudioSegment.from_file(audio_file)
-        
-        # 무음 구간 감지
-        silence_ranges = detect_silence(
-            audio, 
+        # 무음 구간 감지 (PCM 캐시 memmap에서, 재디코딩 없음)
+        silence_ranges = pcm_cache.detect_silence(
+            audio_file,
             min_silence_len=min_silence_len,  # 2초 이상
             silence_thresh=silence_thresh     # -40dB 이하
         )
@@ -6,9 +6,9 @@ Voice Activity Detection (VAD) 프로세서
 
 import numpy as np
 from pydub import AudioSegment
-from pydub.silence import detect_nonsilent
-import sqlite3
 import json
+from pcm_cache import pcm_cache
+from database import media_repo, sentence_repo
 
 class VADProcessor:
     def __init__(self, silence_thresh=-40, min_silence_len=500, chunk_size=10):
@@ -35,12 +35,9 @@ class VADProcessor:
             list: [(start_ms, end_ms), ...] 음성 구간 리스트
         """
         try:
-            # 오디오 로드
-            audio = AudioSegment.from_file(audio_file_path)
-            
-            # 음성이 있는 구간 감지 (무음이 아닌 구간)
-            nonsilent_ranges = detect_nonsilent(
-                audio,
+            # 음성이 있는 구간 감지 (무음이 아닌 구간, PCM 캐시 memmap에서)
+            nonsilent_ranges = pcm_cache.detect_nonsilent(
+                audio_file_path,
                 min_silence_len=self.min_silence_len,
                 silence_thresh=self.silence_thresh,
                 seek_step=self.chunk_size
@@ -72,31 +69,13 @@ class VADProcessor:
         Returns:
             list: 필터링된 문장 리스트
         """
-        conn = sqlite3.connect('dev.db')
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         # 미디어 파일 경로 가져오기
-        cursor.execute("SELECT filename FROM Media WHERE id = ?", (media_id,))
-        media = cursor.fetchone()
-        
+        media = media_repo.get_by_id(media_id)
         if not media:
-            conn.close()
             return []
         
         # 모든 문장 가져오기
-        cursor.execute("""
-            SELECT s.*, sc.title as scene_title, c.title as chapter_title
-            FROM Sentence s
-            JOIN Scene sc ON s.sceneId = sc.id
-            JOIN Chapter c ON sc.chapterId = c.id
-            WHERE c.mediaId = ?
-            ORDER BY s.startTime
-        """, (media_id,))
-        
-        sentences = cursor.fetchall()
-        conn.close()
-        
+        sentences = sorted(sentence_repo.get_by_media_id(media_id), key=lambda s: s['startTime'])
         if not sentences:
             return []
         
@@ -109,7 +88,8 @@ class VADProcessor:
         filtered_sentences = []
         
         for sentence in sentences:
-            sentence_dict = dict(sentence)
+            sentence_dict = dict(sentence, scene_title=sentence['sceneTitle'],
+                                 chapter_title=sentence['chapterTitle'])
             sentence_start = sentence['startTime']
             sentence_end = sentence['endTime']
             sentence_duration = sentence_end - sentence_start
@@ -0,0 +1,135 @@
+"""
+Precomputed multi-resolution waveform peaks for drawing media without its audio
+"""
+import os
+import json
+import math
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from pcm_cache import pcm_cache
+
+logger = logging.getLogger(__name__)
+
+class WaveformStore:
+    """Min/max peaks of the PCM analysis copy at a few zoom levels.
+    
+    Each level is a binary file of int8 ``(min, max)`` pairs, one pair per bucket of
+    ``samples_per_bucket`` samples at ``PCMCache.ANALYSIS_RATE`` (the int16 samples
+    keep their top 8 bits). Levels are nested (each one a multiple of the next), so
+    they are built in one pass over the memmap, coarser ones from finer ones. A time
+    window of a level maps to a byte range: bucket ``i`` is at bytes ``2*i, 2*i+1``.
+    """
+    
+    # Coarsest first: overview, normal view, sentence zoom
+    LEVELS = (2048, 256, 32)
+    # Samples per pass; a multiple of the coarsest level
+    CHUNK_SAMPLES = 2048 * 512
+    
+    def __init__(self, waveform_dir: str = 'cache/waveform'):
+        self.waveform_dir = Path(waveform_dir)
+    
+    def _path(self, media_id: str, samples_per_bucket: int) -> Path:
+        return self.waveform_dir / f"{media_id}_{samples_per_bucket}.peaks"
+    
+    def _meta_path(self, media_id: str) -> Path:
+        return self.waveform_dir / f"{media_id}.json"
+    
+    def exists(self, media_id: str) -> bool:
+        return self._meta_path(media_id).exists()
+    
+    @staticmethod
+    def _reduce(mins: np.ndarray, maxs: np.ndarray, factor: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Merge every ``factor`` buckets (the last one may be partial)"""
+        pad = -len(mins) % factor
+        if pad:
+            mins = np.pad(mins, (0, pad), mode='edge')
+            maxs = np.pad(maxs, (0, pad), mode='edge')
+        return mins.reshape(-1, factor).min(axis=1), maxs.reshape(-1, factor).max(axis=1)
+    
+    def build(self, media_id: str, audio_file: str) -> Dict[str, Any]:
+        """Compute every level from the PCM cache of audio_file; returns the metadata"""
+        samples = pcm_cache.load(audio_file)
+        finest = self.LEVELS[-1]
+        
+        self.waveform_dir.mkdir(parents=True, exist_ok=True)
+        partial_paths = {level: self._path(media_id, level).with_suffix('.partial') for level in self.LEVELS}
+        outputs = {level: open(path, 'wb') for level, path in partial_paths.items()}
+        try:
+            for first in range(0, len(samples), self.CHUNK_SAMPLES):
+                chunk = np.asarray(samples[first:first + self.CHUNK_SAMPLES])
+                # Keep the top byte of each int16 sample
+                chunk = (chunk >> 8).astype(np.int8)
+                mins, maxs = self._reduce(chunk, chunk, finest)
+                previous_level = finest
+                for level in reversed(self.LEVELS):
+                    if level != previous_level:
+                        mins, maxs = self._reduce(mins, maxs, level // previous_level)
+                        previous_level = level
+                    outputs[level].write(np.column_stack((mins, maxs)).astype(np.int8).tobytes())
+        finally:
+            for output in outputs.values():
+                output.close()
+        
+        for level, path in partial_paths.items():
+            os.replace(path, self._path(media_id, level))
+        
+        meta = {
+            'sample_rate': pcm_cache.ANALYSIS_RATE,
+            'duration': len(samples) / pcm_cache.ANALYSIS_RATE,
+            'levels': {
+                str(level): {
+                    'samples_per_bucket': level,
+                    'buckets_per_second': pcm_cache.ANALYSIS_RATE / level,
+                    'buckets': math.ceil(len(samples) / level)
+                }
+                for level in self.LEVELS
+            }
+        }
+        with open(self._meta_path(media_id), 'w') as f:
+            json.dump(meta, f)
+        logger.info(f"Waveform peaks built for media {media_id}: {len(samples)} samples, levels {self.LEVELS}")
+        return meta
+    
+    def get_meta(self, media_id: str) -> Optional[Dict[str, Any]]:
+        """Levels, bucket counts and duration, or None when not built"""
+        try:
+            with open(self._meta_path(media_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+    
+    def level_path(self, media_id: str, samples_per_bucket: int) -> Optional[str]:
+        """Peaks file of a level, for serving it whole (HTTP Range requests)"""
+        path = self._path(media_id, samples_per_bucket)
+        return str(path) if path.exists() else None
+    
+    def byte_range(self, media_id: str, samples_per_bucket: int,
+                   start_time: float, end_time: Optional[float] = None) -> Tuple[int, int, int]:
+        """(first bucket, byte offset, byte length) of a time window of a level"""
+        meta = self.get_meta(media_id)
+        buckets = meta['levels'][str(samples_per_bucket)]['buckets']
+        buckets_per_second = meta['sample_rate'] / samples_per_bucket
+        first = min(buckets, max(0, int(start_time * buckets_per_second)))
+        last = buckets if end_time is None else min(buckets, max(first, math.ceil(end_time * buckets_per_second)))
+        return first, first * 2, (last - first) * 2
+    
+    def read_window(self, media_id: str, samples_per_bucket: int,
+                    start_time: float, end_time: Optional[float] = None) -> Tuple[int, bytes]:
+        """First bucket and the (min, max) int8 pairs of a time window"""
+        first, offset, length = self.byte_range(media_id, samples_per_bucket, start_time, end_time)
+        with open(self._path(media_id, samples_per_bucket), 'rb') as f:
+            f.seek(offset)
+            return first, f.read(length)
+    
+    def delete(self, media_id: str):
+        """Remove the peaks of a media"""
+        for path in [self._meta_path(media_id)] + [self._path(media_id, level) for level in self.LEVELS]:
+            if path.exists():
+                path.unlink()
+
+# Singleton instance
+waveform_store = WaveformStore(os.environ.get('WAVEFORM_DIR', 'cache/waveform'))
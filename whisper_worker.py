@@ -3,12 +3,12 @@ from faster_whisper import WhisperModel
 import os
 import json
 from deep_translator import GoogleTranslator
-import sqlite3
 from datetime import datetime
 import librosa
 import numpy as np
 from pydub import AudioSegment
 from pydub.silence import detect_silence
+from database import media_repo, structure_repo
 
 # Celery 설정
 celery_app = Celery('whisper_worker', broker='redis://localhost:6379/0')
@@ -106,15 +106,8 @@ def process_audio_file(filepath, media_id):
         # 무음 구간 분석으로 챕터 분할점 찾기
         chapter_points = detect_silence_gaps(filepath)
         
-        # DB 연결
-        conn = sqlite3.connect('dev.db')
-        cursor = conn.cursor()
-        
         # 미디어 정보 업데이트
-        cursor.execute(
-            "UPDATE Media SET duration = ? WHERE id = ?",
-            (info.duration, media_id)
-        )
+        media_repo.update_duration(media_id, info.duration)
         
         # 모든 문장 먼저 수집
         all_sentences = []
@@ -137,41 +130,23 @@ def process_audio_file(filepath, media_id):
             })
             sentence_order += 1
         
-        # 챕터별로 처리
+        # 챕터별로 씬 구성
+        chapters = []
         for i, (chapter_start, chapter_end) in enumerate(zip(chapter_points[:-1], chapter_points[1:])):
-            # 챕터 생성
-            cursor.execute(
-                "INSERT INTO Chapter (mediaId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                (media_id, f"Chapter {i+1}", chapter_start, chapter_end, i+1)
-            )
-            chapter_id = cursor.lastrowid
-            
             # 해당 챕터의 문장들로 씬 생성
             chapter_sentences = [s for s in all_sentences 
                                if s['startTime'] >= chapter_start and s['endTime'] <= chapter_end]
             
             scenes = group_sentences_into_scenes(chapter_sentences, chapter_start, chapter_end)
-            
-            # 씬 저장
-            for j, scene in enumerate(scenes):
-                cursor.execute(
-                    "INSERT INTO Scene (chapterId, title, startTime, endTime, `order`) VALUES (?, ?, ?, ?, ?)",
-                    (chapter_id, f"Scene {j+1}", scene['start_time'], scene['end_time'], j+1)
-                )
-                scene_id = cursor.lastrowid
-                
-                # 씬의 문장들 저장
-                for sentence in scene['sentences']:
-                    cursor.execute(
-                        """INSERT INTO Sentence 
-                        (sceneId, english, korean, startTime, endTime, bookmark, `order`) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                        (scene_id, sentence['english'], sentence['korean'], 
-                         sentence['startTime'], sentence['endTime'], 0, sentence['order'])
-                    )
+            chapters.append({
+                'title': f"Chapter {i+1}",
+                'startTime': chapter_start,
+                'endTime': chapter_end,
+                'scenes': [dict(scene, title=f"Scene {j+1}") for j, scene in enumerate(scenes)]
+            })
         
-        conn.commit()
-        conn.close()
+        # 기존 구조를 한 트랜잭션으로 교체
+        structure_repo.replace_structure(media_id, chapters)
         
         return {
             'success': True,